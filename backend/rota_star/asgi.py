@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rota_star.settings")
 
 application = get_asgi_application()
+
+# Start the solver workers now, so the first rota request finds them warm
+from scheduler.jobs import start_solver_workers
+
+start_solver_workers()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -132,4 +133,93 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React frontend
     "https://rota-star.vercel.app",  #Production frontend url
-]
\ No newline at end of file
+]
+# Let the frontend read the employee list's validators and send If-Match
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified"]
+CORS_ALLOW_HEADERS = (*default_headers, "if-match", "if-none-match")
+# Rota solver job queue
+# Solves run in a process pool; requests beyond workers + queue depth get a 429.
+ROTA_SOLVER_WORKERS = int(os.getenv('ROTA_SOLVER_WORKERS', '2'))
+ROTA_SOLVER_QUEUE_DEPTH = int(os.getenv('ROTA_SOLVER_QUEUE_DEPTH', '8'))
+ROTA_JOB_RETENTION_SECONDS = int(os.getenv('ROTA_JOB_RETENTION_SECONDS', '3600'))
+ROTA_SYNC_TIMEOUT_SECONDS = int(os.getenv('ROTA_SYNC_TIMEOUT_SECONDS', '120'))
+# /api/generate-rota/ and /api/rota-streams/ hold a web worker for the whole
+# solve, so they refuse solver time limits above this; longer solves go to
+# /api/rota-jobs/. Keep it below ROTA_SYNC_TIMEOUT_SECONDS, and that below
+# gunicorn's --timeout (150s in the Procfile).
+ROTA_SYNC_MAX_SOLVE_SECONDS = float(os.getenv('ROTA_SYNC_MAX_SOLVE_SECONDS', '90'))
+ROTA_MAX_SCENARIOS = int(os.getenv('ROTA_MAX_SCENARIOS', '50'))
+
+# Solver workers import OR-Tools and run a tiny warm-up solve as they start.
+# ROTA_SOLVER_PREWARM starts them all when the web server boots instead of
+# on the first rota requests; /health returns 503 until they are warm. With
+# ROTA_SOLVER_WORKER_ADDRESS ("host:port" or a Unix socket path), solves go
+# to a long-lived `manage.py runsolverworkers` process listening there
+# instead of a pool inside each web process. Prewarming starts processes
+# from wsgi.py/asgi.py, so do not combine it with gunicorn --preload.
+# That channel carries pickled solves, so the address must be a Unix socket
+# or a localhost port, and both ends need ROTA_SOLVER_WORKER_AUTHKEY: a
+# secret of at least 16 characters used for nothing else. It has no default.
+ROTA_SOLVER_PREWARM = os.getenv('ROTA_SOLVER_PREWARM', 'True').lower() == 'true'
+ROTA_SOLVER_WORKER_ADDRESS = os.getenv('ROTA_SOLVER_WORKER_ADDRESS', '')
+ROTA_SOLVER_WORKER_AUTHKEY = os.getenv('ROTA_SOLVER_WORKER_AUTHKEY', '')
+
+# Streamed solves (/api/rota-streams/) are jobs on the solver queue whose
+# workers send progress back as it happens; the queue's limits apply to them.
+ROTA_STREAM_PREVIEW_SECONDS = float(os.getenv('ROTA_STREAM_PREVIEW_SECONDS', '1.0'))
+ROTA_STREAM_HEARTBEAT_SECONDS = int(os.getenv('ROTA_STREAM_HEARTBEAT_SECONDS', '15'))
+
+# Solver profile used when a request does not pick one ("fast", "balanced" or "thorough")
+ROTA_SOLVER_DEFAULT_PROFILE = os.getenv('ROTA_SOLVER_DEFAULT_PROFILE', 'balanced')
+
+# Shift templates: per-day shifts, times and headcounts for each site variant
+ROTA_SHIFT_TEMPLATES_PATH = os.getenv('ROTA_SHIFT_TEMPLATES_PATH', str(BASE_DIR / 'scheduler' / 'shift_templates.json'))
+ROTA_DEFAULT_SHIFT_TEMPLATE = os.getenv('ROTA_DEFAULT_SHIFT_TEMPLATE', 'default')
+
+# Rota fairness
+# Balancing evenings, weekends and hours against each employee's history from
+# accepted rotas changes the objective, so it is opt-in: a request sends
+# "fairness": true (or weights), or this turns it on for requests that leave it
+# out. History is multiplied by ROTA_HISTORY_DECAY for every week of each newly
+# accepted rota.
+ROTA_FAIRNESS_ENABLED = os.getenv('ROTA_FAIRNESS_ENABLED', 'False').lower() == 'true'
+ROTA_HISTORY_DECAY = float(os.getenv('ROTA_HISTORY_DECAY', '0.9'))
+
+# Rota result cache
+# BACKEND is 'memory' (per-process LRU), 'django' (the CACHES alias below) or 'none'.
+ROTA_RESULT_CACHE = {
+    "BACKEND": os.getenv('ROTA_RESULT_CACHE_BACKEND', 'memory'),
+    "MAX_ENTRIES": int(os.getenv('ROTA_RESULT_CACHE_MAX_ENTRIES', '256')),
+    "TTL_SECONDS": int(os.getenv('ROTA_RESULT_CACHE_TTL_SECONDS', '3600')) or None,
+    "CACHE_ALIAS": "default",
+}
+
+# Rota telemetry
+# Solves are logged as one JSON object per line on the "scheduler" logger,
+# and aggregated at /metrics. Set ROTA_PROFILING_ENABLED to let requests
+# ask for a cProfile report with "profile": true.
+ROTA_PROFILING_ENABLED = os.getenv('ROTA_PROFILING_ENABLED', 'False').lower() == 'true'
+# /metrics answers 404 unless ROTA_METRICS_ENABLED is set. Scrapers then send
+# ROTA_METRICS_TOKEN as "Authorization: Bearer <token>"; staff users
+# (basic or session auth) can read it without one. /health stays open for
+# load balancers.
+ROTA_METRICS_ENABLED = os.getenv('ROTA_METRICS_ENABLED', 'False').lower() == 'true'
+ROTA_METRICS_TOKEN = os.getenv('ROTA_METRICS_TOKEN', '')
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "scheduler": {
+            "handlers": ["console"],
+            "level": os.getenv('ROTA_LOG_LEVEL', 'INFO'),
+            "propagate": False,
+        },
+    },
+}
@@ -15,7 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path, include
+from scheduler.views import HealthView, MetricsView
 
 urlpatterns = [
     path("api/", include("scheduler.urls")),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("health", HealthView.as_view(), name="health"),
 ]
\ No newline at end of file
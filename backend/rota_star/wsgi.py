@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rota_star.settings")
 
 application = get_wsgi_application()
+
+# Start the solver workers now, so the first rota request finds them warm
+from scheduler.jobs import start_solver_workers
+
+start_solver_workers()
@@ -1,3 +1,34 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Employee, EmployeeConstraint, EmployeeHistory, Rota, RotaAssignment
+
+
+class EmployeeConstraintInline(admin.TabularInline):
+    model = EmployeeConstraint
+    extra = 0
+
+
+@admin.register(Employee)
+class EmployeeAdmin(admin.ModelAdmin):
+    list_display = ["name", "is_supervisor", "max_shifts", "updated_at"]
+    inlines = [EmployeeConstraintInline]
+
+
+@admin.register(Rota)
+class RotaAdmin(admin.ModelAdmin):
+    list_display = ["id", "created_at", "status", "template", "start_date", "days", "accepted_at"]
+    list_filter = ["status"]
+    exclude = ["result"]
+
+
+@admin.register(RotaAssignment)
+class RotaAssignmentAdmin(admin.ModelAdmin):
+    list_display = ["rota", "employee_name", "day", "date", "shift"]
+    list_filter = ["date"]
+    search_fields = ["employee_name"]
+
+
+@admin.register(EmployeeHistory)
+class EmployeeHistoryAdmin(admin.ModelAdmin):
+    list_display = ["employee_name", "evenings", "weekends", "hours", "rotas", "updated_at"]
+    search_fields = ["employee_name"]
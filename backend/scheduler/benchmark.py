@@ -0,0 +1,388 @@
+import gc
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from ortools import __version__ as ortools_version
+
+from .legacy_model import build_legacy_model
+from .rota_solver import build_model, prepare_problem, solve_rota
+from .shift_templates import DAY_NAMES, compile_template
+from .solver_options import resolve_horizon, resolve_solver_options
+
+# Share of everyone's weekly shift allowance the generated coverage uses;
+# below 1 so feasible workloads leave the solver room to optimise
+TARGET_UTILISATION = 0.6
+
+INFEASIBLE_MODES = ("precheck", "solver")
+
+# Named sets of workloads. Each case fixes its seed, so results from two
+# runs of the same suite are comparable.
+SUITES = {
+    "quick": [
+        {"employees": 5},
+        {"employees": 20},
+        {"employees": 50},
+        {"employees": 20, "infeasible": "precheck"},
+        {"employees": 20, "infeasible": "solver"},
+    ],
+    "full": [
+        {"employees": 5},
+        {"employees": 20},
+        {"employees": 50},
+        {"employees": 100},
+        {"employees": 200},
+        {"employees": 500},
+        {"employees": 50, "days": 28},
+        {"employees": 50, "holiday_density": 0.15, "must_work_density": 0.08},
+        {"employees": 50, "supervisor_ratio": 0.1},
+        {"employees": 200, "days": 28, "must_work_density": 0.05},
+        {"employees": 20, "infeasible": "precheck"},
+        {"employees": 20, "infeasible": "solver"},
+        {"employees": 200, "infeasible": "solver"},
+    ],
+    # Staff with no personal constraints, so most employees are
+    # interchangeable; for measuring symmetry breaking
+    "symmetry": [
+        {"employees": 20, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0},
+        {"employees": 50, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0, "days": 28},
+        {"employees": 200, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0},
+        {"employees": 200, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0, "days": 28},
+        {"employees": 50, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0, "infeasible": "solver"},
+        {"employees": 200, "holiday_density": 0, "days_off_density": 0, "must_work_density": 0, "infeasible": "solver"},
+    ],
+}
+
+CASE_DEFAULTS = {
+    "employees": 20,
+    "days": 7,
+    "supervisor_ratio": 0.25,
+    "holiday_density": 0.05,
+    "days_off_density": 0.2,
+    "must_work_density": 0.02,
+    "infeasible": None,
+    "seed": 1,
+}
+
+
+def case_name(case):
+    """Stable identifier used to match a case against a baseline run"""
+    parts = [f"e{case['employees']}", f"d{case['days']}"]
+    for key, short in (("supervisor_ratio", "sup"), ("holiday_density", "hol"),
+                       ("days_off_density", "off"), ("must_work_density", "must")):
+        if case[key] != CASE_DEFAULTS[key]:
+            parts.append(f"{short}{case[key]:g}")
+    if case["infeasible"]:
+        parts.append(f"infeasible-{case['infeasible']}")
+    if case["seed"] != CASE_DEFAULTS["seed"]:
+        parts.append(f"s{case['seed']}")
+    return "-".join(parts)
+
+
+def resolve_case(case):
+    """Fill in defaults for a case and check its parameters"""
+    unknown = set(case) - set(CASE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark parameter '{sorted(unknown)[0]}'")
+    case = {**CASE_DEFAULTS, **case}
+    if case["employees"] < 2:
+        raise ValueError("A workload needs at least 2 employees")
+    if case["infeasible"] not in (None,) + INFEASIBLE_MODES:
+        raise ValueError(f"infeasible must be one of: {', '.join(INFEASIBLE_MODES)}")
+    for key in ("supervisor_ratio", "holiday_density", "days_off_density", "must_work_density"):
+        if not 0 <= case[key] <= 1:
+            raise ValueError(f"{key} must be between 0 and 1")
+    return case
+
+
+def generate_template(num_employees, num_supervisors, name="benchmark"):
+    """
+    Two shifts a day with coverage scaled to the staff list
+
+    Headcounts are sized so the shifts use about TARGET_UTILISATION of the
+    staff's weekly allowance, so every size gets a comparably tight rota.
+    """
+    shifts_per_week = 2 * len(DAY_NAMES)
+    min_staff = max(1, round(num_employees * 4.5 * TARGET_UTILISATION / shifts_per_week))
+    min_supervisors = min(min_staff, round(num_supervisors * 5 * TARGET_UTILISATION / shifts_per_week))
+    shift = {"min_staff": min_staff, "max_staff": min_staff + min_staff // 4, "min_supervisors": min_supervisors}
+    definition = {"days": {"default": [
+        {"name": "Morning", "start": "09:00", "end": "17:30", **shift},
+        {"name": "Evening", "start": "17:30", "end": "02:15", "evening": True, **shift},
+    ]}}
+    return compile_template(name, definition, 1)
+
+
+def generate_workload(case):
+    """
+    Build a reproducible synthetic rota problem
+
+    Args:
+        case: Benchmark parameters (see CASE_DEFAULTS). Densities are the
+            chance that a given employee-day is a holiday or a must-work
+            shift, or that an employee has a weekday off.
+
+    Returns:
+        (employees_data, solve_rota keyword arguments)
+
+    Must-work shifts are only placed where the employee is free and within
+    their weekly cap, so feasible cases are not broken by chance. An
+    "infeasible" case adds one deliberate conflict: "precheck" puts a
+    must-work shift on a holiday, which the counting checks catch;
+    "solver" gives a supervisor a one-shift week already filled by a
+    morning, which only the model can rule out.
+    """
+    case = resolve_case(case)
+    rng = random.Random(case["seed"])
+    num_employees = case["employees"]
+    num_days = case["days"]
+    num_supervisors = max(1, round(num_employees * case["supervisor_ratio"]))
+    template = generate_template(num_employees, num_supervisors, f"benchmark-{case_name(case)}")
+    # Keep a place on the first morning for the deliberate conflict
+    shift_staff = {(0, 0): 1} if case["infeasible"] else {}
+
+    employees = []
+    for i in range(num_employees):
+        supervisor = i < num_supervisors
+        max_shifts = 5 if supervisor else rng.choice([3, 4, 5, 5, 5])
+        days_off = [rng.randrange(7)] if rng.random() < case["days_off_density"] else []
+        holidays = [d for d in range(num_days) if rng.random() < case["holiday_density"]]
+
+        must_work = []
+        for week_start in range(0, num_days, 7):
+            week = range(week_start, min(week_start + 7, num_days))
+            allowance = max_shifts - sum(1 for d in week if d in holidays)
+            for d in week:
+                if allowance <= 1 or d in holidays or d % 7 in days_off:
+                    continue
+                if rng.random() < case["must_work_density"]:
+                    s = rng.randrange(2)
+                    if shift_staff.get((d, s), 0) < template["days"][d % 7][s]["min_staff"]:
+                        shift_staff[(d, s)] = shift_staff.get((d, s), 0) + 1
+                        must_work.append([d, s])
+                        allowance -= 1
+
+        employees.append({
+            "name": f"Employee {i + 1:03d}",
+            "is_supervisor": supervisor,
+            "max_shifts": max_shifts,
+            "days_off": days_off,
+            "holidays": holidays,
+            "unavailable_shifts": [],
+            "must_work_shifts": must_work,
+        })
+
+    if case["infeasible"] == "precheck":
+        employees[-1]["holidays"] = sorted(set(employees[-1]["holidays"]) | {0})
+        employees[-1]["must_work_shifts"] = [[0, 0]]
+    elif case["infeasible"] == "solver":
+        supervisor = employees[0]
+        supervisor.update({"max_shifts": 1, "days_off": [], "holidays": [], "must_work_shifts": [[0, 0]]})
+
+    options = {
+        "horizon": resolve_horizon({"days": num_days}),
+        "template": template,
+    }
+    return employees, options
+
+
+def run_case(case, solver_options, repeat=1):
+    """
+    Solve one workload and measure it
+
+    Timings come from the solve's telemetry: "build" covers preparing,
+    pre-checking and building the model, "solve" the CP-SAT search and any
+    infeasibility diagnosis, "render" reading the rota back out of the
+    solver. With repeat > 1 the timings are medians.
+    Peak memory is measured in one extra solve under tracemalloc, since
+    tracing slows the model build; it covers the Python heap only, not
+    memory used inside CP-SAT's C++ code.
+
+    Returns:
+        Dictionary of the case parameters and its measurements
+    """
+    case = resolve_case(case)
+    employees, options = generate_workload(case)
+
+    # The case's seed also fixes CP-SAT's, unless the run set one
+    seeded = solver_options
+    if seeded.get("random_seed") is None:
+        seeded = {**solver_options, "random_seed": case["seed"]}
+
+    def solve():
+        return solve_rota(employees, solver_options=seeded, **options)
+
+    builds, solves, renders, totals = [], [], [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = solve()
+        totals.append(time.perf_counter() - started)
+        phases = result.get("telemetry", {}).get("phases", {})
+        builds.append(sum(phases.get(p, 0.0) for p in ("prepare", "precheck", "build")))
+        solves.append(sum(phases.get(p, 0.0) for p in ("solve", "diagnose")))
+        renders.append(phases.get("render", 0.0))
+
+    tracemalloc.start()
+    try:
+        solve()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    stats = result.get("solver_stats") or {}
+    model = result.get("telemetry", {}).get("model") or {}
+    symmetry = result.get("telemetry", {}).get("symmetry") or {}
+    return {
+        "name": case_name(case),
+        "params": case,
+        "expected": "no_solution" if case["infeasible"] else "solution",
+        "status": result["status"],
+        "build_seconds": statistics.median(builds),
+        "solve_seconds": statistics.median(solves),
+        "render_seconds": statistics.median(renders),
+        "total_seconds": statistics.median(totals),
+        "peak_memory_bytes": peak_memory,
+        "variables": model.get("variables"),
+        "constraints": model.get("constraints"),
+        "objective": stats.get("objective"),
+        "best_bound": stats.get("best_bound"),
+        "gap": stats.get("gap"),
+        "conflicts": len(result.get("conflicts") or []),
+        "symmetric_employees": symmetry.get("employees", 0),
+        "strategy": stats.get("strategy"),
+    }
+
+
+def run_suite(cases, solver_options=None, repeat=1, progress=None):
+    """
+    Run benchmark cases in order
+
+    Args:
+        cases: List of case parameter dicts
+        solver_options: From resolve_solver_options; "balanced" by default
+        repeat: Times to solve each case
+        progress: Optional callable given each case's result as it finishes
+
+    Returns:
+        Serialisable run record with environment details and per-case results
+    """
+    solver_options = solver_options or resolve_solver_options()
+    results = []
+    for case in cases:
+        result = run_case(case, solver_options, repeat)
+        results.append(result)
+        if progress:
+            progress(result)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "ortools": ortools_version,
+        "machine": platform.machine(),
+        "solver_options": solver_options,
+        "repeat": repeat,
+        "cases": results,
+    }
+
+
+def compare_solve_times(without, with_option):
+    """
+    Pair up two runs of the same cases that differ in one solver option
+
+    Returns:
+        List of {"name", "status", "without", "with", "speedup"} per case,
+        where speedup is the ratio of solve times (above 1 is faster)
+    """
+    rows = []
+    for before, after in zip(without["cases"], with_option["cases"]):
+        rows.append({
+            "name": before["name"],
+            "status": after["status"],
+            "without": before["solve_seconds"],
+            "with": after["solve_seconds"],
+            "speedup": before["solve_seconds"] / max(after["solve_seconds"], 1e-6),
+        })
+    return rows
+
+
+def compare_builders(cases, repeat=1, progress=None):
+    """
+    Time build_model against the old builder on the same workloads
+
+    Each case's problem is prepared once, then built by both
+    (legacy_model.build_legacy_model first) `repeat` times; times are
+    medians and include build_model's own build_matrices call. As with
+    timeit, the garbage collector is off while a build is timed, so
+    collecting the previous build's model does not land on the next.
+
+    Returns:
+        List of {"name", "variables", "constraints", "legacy_variables",
+        "legacy_constraints", "legacy_seconds", "seconds", "speedup"} per
+        case, where speedup is legacy_seconds / seconds
+    """
+    rows = []
+    for case in cases:
+        case = resolve_case(case)
+        employees, options = generate_workload(case)
+        problem = prepare_problem(employees, options["horizon"], options["template"])
+        measured = {}
+        for name, build in (("legacy", build_legacy_model), ("current", build_model)):
+            seconds = []
+            for _ in range(repeat):
+                built = None
+                gc.collect()
+                gc.disable()
+                try:
+                    started = time.perf_counter()
+                    built = build(problem)
+                    seconds.append(time.perf_counter() - started)
+                finally:
+                    gc.enable()
+            proto = built["model"].Proto()
+            measured[name] = (statistics.median(seconds), len(proto.variables), len(proto.constraints))
+        row = {
+            "name": case_name(case),
+            "variables": measured["current"][1],
+            "constraints": measured["current"][2],
+            "legacy_variables": measured["legacy"][1],
+            "legacy_constraints": measured["legacy"][2],
+            "legacy_seconds": measured["legacy"][0],
+            "seconds": measured["current"][0],
+            "speedup": measured["legacy"][0] / max(measured["current"][0], 1e-6),
+        }
+        rows.append(row)
+        if progress:
+            progress(row)
+    return rows
+
+
+def compare_runs(current, baseline, threshold=0.25, min_seconds=0.05):
+    """
+    Find cases that got slower, or changed outcome, since a baseline run
+
+    A timing counts as a regression when it is more than `threshold`
+    (a fraction) slower and at least `min_seconds` slower, so noise on
+    millisecond cases is ignored.
+
+    Returns:
+        List of {"name", "metric", "baseline", "current"} regressions
+    """
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current["cases"]:
+        before = previous.get(case["name"])
+        if before is None:
+            continue
+        if case["status"] != before["status"]:
+            regressions.append({"name": case["name"], "metric": "status",
+                                "baseline": before["status"], "current": case["status"]})
+        for metric in ("build_seconds", "solve_seconds"):
+            old, new = before[metric], case[metric]
+            if new > old * (1 + threshold) and new - old >= min_seconds:
+                regressions.append({"name": case["name"], "metric": metric, "baseline": old, "current": new})
+        if before["objective"] is not None and case["objective"] is not None and case["objective"] > before["objective"]:
+            regressions.append({"name": case["name"], "metric": "objective",
+                                "baseline": before["objective"], "current": case["objective"]})
+    return regressions
@@ -0,0 +1,350 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+
+from . import telemetry
+from .models import Employee, EmployeeConstraint
+
+# Only definitive answers are cached; solver errors are worth retrying
+CACHEABLE_STATUSES = {"optimal", "feasible", "no_solution"}
+
+
+def _day(value):
+    # Days are horizon indices or ISO date strings
+    try:
+        return int(value)
+    except ValueError:
+        return str(value)
+
+
+def _day_list(values):
+    return sorted((_day(v) for v in values or []), key=lambda d: (isinstance(d, str), d))
+
+
+def _slot_list(slots):
+    return sorted(([_day(d), int(s)] for d, s in slots or []), key=lambda slot: (isinstance(slot[0], str), slot))
+
+
+def canonicalize_employees(employees_data):
+    """
+    Normalise employee configuration so equivalent inputs compare equal
+
+    Employees are sorted, day and slot lists are sorted and coerced to
+    ints, max_shifts is coerced to int and fields the solver ignores are
+    dropped. Duplicates are kept because the solver counts holidays.
+    """
+    employees = [
+        {
+            "name": emp["name"],
+            "is_supervisor": bool(emp.get("is_supervisor", False)),
+            "max_shifts": int(emp["max_shifts"]),
+            "max_shifts_horizon": int(emp["max_shifts_horizon"]) if emp.get("max_shifts_horizon") not in (None, "") else None,
+            "days_off": _day_list(emp.get("days_off")),
+            "holidays": _day_list(emp.get("holidays")),
+            "unavailable_shifts": _slot_list(emp.get("unavailable_shifts")),
+            "must_work_shifts": _slot_list(emp.get("must_work_shifts")),
+            "floater": bool(emp.get("floater", False)),
+            "max_evenings": [int(n) for n in emp["max_evenings"]] if emp.get("max_evenings") is not None else None,
+        }
+        for emp in employees_data
+    ]
+    employees.sort(key=lambda emp: (emp["name"], json.dumps(emp, sort_keys=True)))
+    return employees
+
+
+def canonicalize_options(options):
+    """Normalise the non-employee solve inputs (solver options, previous rota)"""
+    options = dict(options or {})
+    previous = options.get("previous")
+    if previous:
+        options["previous"] = {
+            "assignments": sorted(
+                [a["employee"], int(a["day"]), int(a["shift"])]
+                for a in previous.get("assignments", [])
+            ),
+            "minimal_change": bool(previous.get("minimal_change")),
+        }
+    return options
+
+
+def make_cache_key(employees_data, options=None):
+    """
+    Content hash of the canonicalised employee configuration and the other
+    solve_rota arguments, since a tighter time limit or a different
+    previous rota can give a different answer
+    """
+    payload = json.dumps(
+        {"employees": canonicalize_employees(employees_data), "options": canonicalize_options(options)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def match_input_order(result, employees_data):
+    """
+    Reorder a cached result's per-employee data to follow the caller's
+    employee order, as a fresh solve would
+
+    Covers the table rows, the totals and fairness dictionaries, and the
+    assignment and conflict lists. Sorting is stable, so each employee's
+    assignments stay in day and shift order.
+    """
+    position = {}
+    for i, emp in enumerate(employees_data):
+        position.setdefault(emp["name"], i)
+
+    def order(name):
+        return position.get(name, len(position))
+
+    def by_employee(totals):
+        return dict(sorted(totals.items(), key=lambda item: order(item[0])))
+
+    result["table"] = sorted(result.get("table", []), key=lambda row: order(row[0]))
+    for field in ("shift_totals", "evening_totals", "weekly_totals"):
+        if field in result:
+            result[field] = by_employee(result[field])
+    if result.get("fairness"):
+        result["fairness"] = {metric: by_employee(totals) for metric, totals in result["fairness"].items()}
+    for field in ("assignments", "conflicts"):
+        if result.get(field):
+            result[field] = sorted(result[field], key=lambda record: order(record.get("employee")))
+    return result
+
+
+class InProcessBackend:
+    """LRU cache held in this process, with optional per-entry TTL"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(value), expires_at)
+            self._entries.move_to_end(key)
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """
+    Stores results in a Django cache so they are shared between processes
+
+    Results share the cache with other data, so clear() cannot empty it.
+    Instead every result is stored under the current generation (passed
+    as the cache's key version), and clearing starts a new generation;
+    the old entries are never read again and expire with their TTL.
+    """
+
+    name = "django"
+    key_prefix = "rota-result:"
+    generation_key = "rota-result-generation"
+
+    def __init__(self, alias="default", ttl=None):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def _generation(self):
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            # Start from the clock, so a generation evicted from the cache
+            # never brings back results cleared under an earlier one
+            self.cache.add(self.generation_key, int(time.time()), timeout=None)
+            generation = self.cache.get(self.generation_key, int(time.time()))
+        return generation
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key, version=self._generation())
+
+    def set(self, key, value):
+        self.cache.set(self.key_prefix + key, value, timeout=self.ttl, version=self._generation())
+
+    def clear(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            # No generation yet, so nothing to forget
+            self._generation()
+
+
+class RotaResultCache:
+    """
+    Result cache for solve_rota keyed on the canonical employee config and
+    the keyword arguments passed alongside it
+
+    Hit and miss counters are kept per process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, employees_data, options=None):
+        """Return the cached result for employees_data, or None"""
+        result = self.backend.get(make_cache_key(employees_data, options))
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if result is None:
+            return None
+        return match_input_order(result, employees_data)
+
+    def set(self, employees_data, result, options=None):
+        # A search stopped early says nothing about what a full one finds
+        if result.get("status") in CACHEABLE_STATUSES and not result.get("stopped"):
+            self.backend.set(make_cache_key(employees_data, options), result)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        data = {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+        if hasattr(self.backend, "__len__"):
+            data["entries"] = len(self.backend)
+        return data
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Return the process-wide result cache built from ROTA_RESULT_CACHE,
+    or None when caching is disabled
+    """
+    global _result_cache
+    config = settings.ROTA_RESULT_CACHE
+    if config["BACKEND"] == "none":
+        return None
+
+    with _result_cache_lock:
+        if _result_cache is None:
+            if config["BACKEND"] == "django":
+                backend = DjangoCacheBackend(config["CACHE_ALIAS"], config["TTL_SECONDS"])
+            elif config["BACKEND"] == "memory":
+                backend = InProcessBackend(config["MAX_ENTRIES"], config["TTL_SECONDS"])
+            else:
+                raise ValueError(f"Unknown rota result cache backend: {config['BACKEND']}")
+            _result_cache = RotaResultCache(backend)
+        return _result_cache
+
+
+class EmployeeConfigCache:
+    """
+    The serialised staff list, rebuilt only when the employee tables change
+
+    Each read runs one aggregate query for a version token (row counts and
+    latest change), which is far cheaper than loading and serialising
+    every employee. Changes saved by other processes or the admin change
+    the token, so they are picked up without explicit invalidation; a bulk
+    QuerySet.update() that skips updated_at is not noticed.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        employees = Employee.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+        constraints = EmployeeConstraint.objects.aggregate(count=Count("id"), last=Max("id"))
+        return (employees["count"], employees["updated"], constraints["count"], constraints["last"])
+
+    def get(self):
+        """
+        Return the current staff list as
+        {"body": JSON bytes, "etag": quoted ETag, "last_modified": datetime or None}
+        """
+        version = self._current_version()
+        with self._lock:
+            if self._entry is not None and self._version == version:
+                return self._entry
+
+        data = [emp.to_config() for emp in Employee.objects.prefetch_related("constraints")]
+        body = json.dumps(data).encode()
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            "last_modified": version[1],
+        }
+        with self._lock:
+            self._version = version
+            self._entry = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._entry = None
+
+
+_employee_config_cache = EmployeeConfigCache()
+
+
+def get_employee_config_cache():
+    """Return the process-wide employee configuration cache"""
+    return _employee_config_cache
+
+
+def _cache_lookups():
+    cache = _result_cache
+    if cache is None:
+        return None
+    return {("hit",): cache.hits, ("miss",): cache.misses}
+
+
+def _cache_entries():
+    cache = _result_cache
+    if cache is None or not hasattr(cache.backend, "__len__"):
+        return None
+    return len(cache.backend)
+
+
+telemetry.REGISTRY.callback(
+    "rota_cache_lookups_total", "Result cache lookups by outcome", "counter", _cache_lookups, labels=("result",))
+telemetry.REGISTRY.callback(
+    "rota_cache_entries", "Rotas held in the in-process result cache", "gauge", _cache_entries)
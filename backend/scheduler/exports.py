@@ -0,0 +1,269 @@
+import csv
+import hashlib
+import io
+import zipfile
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+from django.utils.dateparse import parse_time
+
+from .shift_templates import DAY_NAMES, get_shift_template
+
+# Content type and whether browsers should download rather than show it
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", True),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", True),
+    "ics": ("text/calendar; charset=utf-8", False),
+}
+
+COLUMNS = ["Rota", "Employee", "Date", "Day", "Shift", "Start", "End", "Hours", "Evening"]
+
+# Rows written between flushes of a streamed export
+CHUNK_ROWS = 500
+
+ASSIGNMENT_FIELDS = (
+    "rota_id", "rota__template", "employee_name", "date", "day", "weekday",
+    "shift", "shift_name", "start", "minutes", "evening",
+)
+
+
+def export_rows(assignments, template_path=None):
+    """
+    Turn RotaAssignment rows into export rows with real shift times
+
+    Args:
+        assignments: RotaAssignment queryset, already filtered and ordered.
+            It is read in chunks, so exports never hold every row at once.
+        template_path: Shift templates file, used for assignments saved
+            before shift times were stored with them
+
+    Yields:
+        Dicts with rota_id, employee, date, day, shift, start, end (times,
+        or datetimes when the rota is dated), minutes and evening
+    """
+    templates = {}
+
+    def template_shift(name, weekday, shift):
+        if name not in templates:
+            try:
+                templates[name] = get_shift_template(name, template_path)
+            except (OSError, ValueError):
+                templates[name] = None
+        try:
+            return templates[name]["days"][weekday][shift]
+        except (TypeError, IndexError):
+            return None
+
+    for a in assignments.values(*ASSIGNMENT_FIELDS).iterator(chunk_size=2000):
+        start, minutes, name = a["start"], a["minutes"], a["shift_name"]
+        if start is None:
+            shift = template_shift(a["rota__template"], a["weekday"], a["shift"])
+            if shift:
+                start, minutes, name = parse_time(shift["start"]), shift["minutes"], shift["name"]
+
+        begin = end = None
+        if start is not None:
+            begin = datetime.combine(a["date"] or datetime.min.date(), start)
+            end = begin + timedelta(minutes=minutes)
+            if a["date"] is None:
+                # Undated rotas only have times of day
+                begin, end = begin.time(), end.time()
+        yield {
+            "rota_id": a["rota_id"],
+            "employee": a["employee_name"],
+            "date": a["date"],
+            "day": DAY_NAMES[a["weekday"]],
+            "shift": name or f"Shift {a['shift'] + 1}",
+            "start": begin,
+            "end": end,
+            "minutes": minutes,
+            "evening": a["evening"],
+        }
+
+
+def _row_values(row):
+    """The COLUMNS values for an export row, as text or numbers"""
+    def clock(value):
+        return value.strftime("%H:%M") if value is not None else ""
+
+    return [
+        row["rota_id"],
+        row["employee"],
+        row["date"].isoformat() if row["date"] else "",
+        row["day"],
+        row["shift"],
+        clock(row["start"]),
+        clock(row["end"]),
+        round(row["minutes"] / 60, 2),
+        "yes" if row["evening"] else "no",
+    ]
+
+
+def stream_csv(rows):
+    """Yield a CSV document of export rows, CHUNK_ROWS lines at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(_row_values(row))
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable sink for zipfile that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Rota" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(number, values):
+    """One <row> of a worksheet, with inline strings so no shared string table is needed"""
+    cells = []
+    for column, value in enumerate(values):
+        ref = f"{chr(ord('A') + column)}{number}"
+        if isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        elif value != "":
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(rows):
+    """
+    Yield an XLSX workbook of export rows with a single "Rota" sheet
+
+    The zip is written to an unseekable stream, so each part carries a data
+    descriptor and the sheet is compressed and sent as rows are produced.
+    """
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, COLUMNS).encode())
+            for number, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(number, _row_values(row)).encode())
+                if number % CHUNK_ROWS == 0:
+                    yield sink.take()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.take()
+
+
+def _ics_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets, as RFC 5545 requires"""
+    data = line.encode("utf-8")
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a UTF-8 sequence
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def stream_ics(rows, calendar_name):
+    """
+    Yield an iCalendar feed with one event per dated shift
+
+    Times are floating local times, as shifts are planned in the site's own
+    time zone. Shifts from undated rotas cannot be placed and are left out.
+    Event UIDs are stable across exports, so calendar apps update shifts
+    in place when a feed is re-fetched.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "".join(_ics_line(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Rota Star//Rota export//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_ics_text(calendar_name)}",
+    ])
+    chunk = []
+    for row in rows:
+        if not isinstance(row["start"], datetime):
+            continue
+        who = hashlib.sha1(row["employee"].encode("utf-8")).hexdigest()[:12]
+        summary = _ics_text(row["shift"] + " shift")
+        description = _ics_text(f"{row['employee']}, rota {row['rota_id']}")
+        chunk.append("".join(_ics_line(line) for line in [
+            "BEGIN:VEVENT",
+            f"UID:rota{row['rota_id']}-{row['start']:%Y%m%dT%H%M}-{who}@rota-star",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{row['start']:%Y%m%dT%H%M%S}",
+            f"DTEND:{row['end']:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{summary}",
+            f"DESCRIPTION:{description}",
+            "END:VEVENT",
+        ]))
+        if len(chunk) == CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk) + "END:VCALENDAR\r\n"
@@ -0,0 +1,458 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from . import telemetry
+from .cache import get_result_cache
+from .workers import RemoteSolverPool, WarmPool, check_authkey, parse_address, run_solve
+
+
+class QueueFullError(Exception):
+    """Raised when every worker is busy and the waiting queue is full"""
+
+
+class QueueUnavailableError(Exception):
+    """Raised when the worker pool has died and cannot accept work"""
+
+
+class SolveJobQueue:
+    """
+    Bounded queue of rota solves backed by a process pool
+
+    Solves run in separate processes so a slow CP-SAT search never holds a
+    web worker. At most `max_workers` solves run at once and at most
+    `max_queued` more may wait for a free worker; anything beyond that is
+    rejected with QueueFullError. Job records live in this process only and
+    are dropped `retention` seconds after they finish.
+
+    Results are looked up in the result cache first; a hit completes the job
+    immediately without using a worker.
+
+    A job's `finish` hook, if given, runs once in this process when its
+    solve completes (or at once for a cache hit) and may replace the result,
+    e.g. to save the rota. The job only counts as finished after that, and
+    the finished result is what gets cached.
+
+    Streamed solves are jobs too: given a ProgressChannel from
+    progress_channel(), the worker reports each improving rota to it as the
+    search runs, and stop() ends the search early.
+
+    The pool's workers import OR-Tools and run a warm-up solve as they
+    start (see workers.WarmPool); with `prewarm` they all start as soon as
+    the pool is created. With a `worker_address`, solves go instead to a
+    runsolverworkers process listening there, and this process never
+    imports OR-Tools for them.
+    """
+
+    def __init__(self, max_workers, max_queued, retention, prewarm=False, worker_address=None, authkey=None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.prewarm = prewarm
+        self.worker_address = worker_address
+        self.authkey = authkey
+        self._executor = None
+        self._coordinator = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.worker_address:
+                self._executor = RemoteSolverPool(self.worker_address, self.authkey)
+            else:
+                self._executor = WarmPool(self.max_workers)
+                if self.prewarm:
+                    self._executor.start()
+        return self._executor
+
+    def start(self):
+        """Create the worker pool now and start warming its workers, rather than on the first solve"""
+        with self._lock:
+            self._get_executor().start()
+
+    def health(self):
+        """
+        Readiness of the solver workers, for the health endpoint
+
+        Returns:
+            The pool's health (see WarmPool.health) plus "mode", "local" or
+            "remote"; a pool that has not been created yet is "cold"
+        """
+        with self._lock:
+            executor = self._executor
+            if executor is None and self.worker_address:
+                executor = self._get_executor()
+        mode = "remote" if self.worker_address else "local"
+        if executor is None:
+            return {"status": "cold", "mode": mode, "workers": self.max_workers, "warm": 0}
+        return {**executor.health(), "mode": mode}
+
+    def _active_count(self, coordinated=False):
+        return sum(
+            1 for job in self._jobs.values()
+            if not job["done"].is_set() and job.get("coordinated", False) == coordinated
+        )
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _new_job(self, future, executor, finish, **fields):
+        return {
+            "id": uuid.uuid4().hex,
+            "future": future,
+            "executor": executor,
+            "finish": finish,
+            "done": threading.Event(),
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+            **fields,
+        }
+
+    def _finish(self, job, future, store=None, on_pool_thread=True):
+        """Run the job's finish hook on its result, cache that, and mark the job done"""
+        try:
+            if future.cancelled():
+                job["error"] = CancelledError()
+            elif future.exception() is not None:
+                job["error"] = future.exception()
+            else:
+                result = future.result()
+                if job["finish"] is not None:
+                    try:
+                        result = job["finish"](result, job["id"])
+                    except Exception as e:
+                        job["error"] = e
+                    finally:
+                        if on_pool_thread:
+                            # Pool threads never see a request end, so nothing else closes these
+                            connections.close_all()
+                if job["error"] is None:
+                    job["result"] = result
+                    if store is not None:
+                        cache, employees_data, solve_options = store
+                        cache.set(employees_data, result, solve_options)
+        finally:
+            # Whatever went wrong, nobody waiting on the job should hang
+            job["finished_at"] = time.time()
+            job["done"].set()
+
+    def _on_done(self, job, future, store=None):
+        self._finish(job, future, store)
+        error = job["error"]
+        if job.get("coordinated"):
+            # Its solves went through submit and were recorded there
+            telemetry.JOBS.inc(outcome="coordinated" if error is None else "failed")
+            return
+        if future.cancelled():
+            telemetry.JOBS.inc(outcome="cancelled")
+            return
+        if error is not None:
+            telemetry.JOBS.inc(outcome="failed")
+            telemetry.log_event("rota_job_failed", level=logging.ERROR, job_id=job["id"], error=repr(error))
+        else:
+            telemetry.JOBS.inc(outcome="solved")
+            telemetry.observe_solve(
+                future.result(),
+                job_seconds=job["finished_at"] - job["submitted_at"],
+                job_id=job["id"],
+                employees=job["employees"],
+            )
+        if isinstance(error, BrokenProcessPool):
+            # A worker died; let the next submit start a fresh pool
+            with self._lock:
+                if self._executor is job["executor"]:
+                    self._executor = None
+
+    def _cached_job(self, result, employees, finish, store):
+        future = Future()
+        future.set_result(result)
+        job = self._new_job(future, None, finish, employees=employees)
+        # A result finished before was cached with whatever finish added,
+        # so the hook sees it again and can leave it as it is
+        self._finish(job, future, store if finish is not None else None, on_pool_thread=False)
+        with self._lock:
+            self._prune()
+            self._jobs[job["id"]] = job
+        telemetry.JOBS.inc(outcome="cached")
+        return job
+
+    def progress_channel(self, preview_interval=1.0):
+        """A workers.ProgressChannel to submit a streamed solve with"""
+        with self._lock:
+            executor = self._get_executor()
+        return executor.progress_channel(preview_interval)
+
+    def submit(self, employees_data, finish=None, progress=None, **solve_options):
+        """
+        Queue a solve and return its job record
+
+        solve_options are passed through to solve_rota as keyword arguments,
+        except profile=True, which runs the solve under cProfile and
+        bypasses the result cache. finish, if given, is called as
+        finish(result, job_id) once the solve completes and returns the
+        result the job keeps. progress, a ProgressChannel, streams the
+        search's progress; a cache hit finishes without any.
+
+        Raises:
+            QueueFullError: if max_workers + max_queued solves are in flight
+            QueueUnavailableError: if the worker pool is broken
+        """
+        profile = solve_options.pop("profile", False)
+        cache = None if profile else get_result_cache()
+        store = None if cache is None else (cache, employees_data, solve_options)
+        if cache is not None:
+            cached = cache.get(employees_data, solve_options)
+            if cached is not None:
+                return self._cached_job(cached, len(employees_data), finish, store)
+
+        with self._lock:
+            self._prune()
+            if self._active_count() >= self.max_workers + self.max_queued:
+                telemetry.QUEUE_REJECTIONS.inc(reason="full")
+                raise QueueFullError(
+                    "The rota solver is busy. Please try again shortly."
+                )
+
+            executor = self._get_executor()
+            try:
+                future = executor.submit(run_solve, "profile_solve_rota" if profile else "solve_rota",
+                                         employees_data, progress=progress, **solve_options)
+            except BrokenProcessPool:
+                # Drop the dead pool so the next request starts a fresh one
+                self._executor = None
+                telemetry.QUEUE_REJECTIONS.inc(reason="unavailable")
+                raise QueueUnavailableError("The rota solver is unavailable.")
+
+            job = self._new_job(future, executor, finish, employees=len(employees_data), progress=progress)
+            self._jobs[job["id"]] = job
+
+        future.add_done_callback(lambda f: self._on_done(job, f, store))
+        return job
+
+    def call(self, name, *args, **kwargs):
+        """
+        Run one of workers.SOLVE_FUNCTIONS on the solver workers and block for its result
+
+        For work a coordinating job needs before it fans out, such as the
+        floater master model: it runs where solves run, so this process
+        never imports OR-Tools for it. It is not a job of its own, is not
+        cached and does not count towards the queue's limits; the
+        coordinating job that waits for it already does.
+
+        Raises:
+            QueueUnavailableError: if the worker pool is broken
+        """
+        with self._lock:
+            executor = self._get_executor()
+        try:
+            return executor.submit(run_solve, name, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # Drop the dead pool so the next request starts a fresh one
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise QueueUnavailableError("The rota solver is unavailable.")
+
+    def submit_coordinated(self, func, *args, finish=None, **kwargs):
+        """
+        Run func(self, *args, **kwargs) on a web-process thread as a job
+
+        For requests that fan out into several solves, such as per-team
+        rotas: func submits those through this queue, so they share its
+        workers and limits, and combines their results. The coordinating
+        job does not hold a solver worker while it waits. finish works as
+        for submit.
+
+        Raises:
+            QueueFullError: if max_workers + max_queued coordinating jobs
+                are already in flight
+        """
+        with self._lock:
+            self._prune()
+            if self._active_count(coordinated=True) >= self.max_workers + self.max_queued:
+                telemetry.QUEUE_REJECTIONS.inc(reason="full")
+                raise QueueFullError(
+                    "The rota solver is busy. Please try again shortly."
+                )
+            if self._coordinator is None:
+                self._coordinator = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="rota-coordinator",
+                )
+            future = self._coordinator.submit(func, self, *args, **kwargs)
+            job = self._new_job(future, None, finish, coordinated=True)
+            self._jobs[job["id"]] = job
+
+        future.add_done_callback(lambda f: self._on_done(job, f))
+        return job
+
+    def get(self, job_id):
+        """Return the job record for job_id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stop(self, job):
+        """
+        End a streamed job's search early, keeping the best rota found so far
+
+        Returns:
+            False if the job is not streamed or has already finished
+        """
+        if job.get("progress") is None or job["done"].is_set():
+            return False
+        job["progress"].stop()
+        return True
+
+    def wait(self, job, timeout=None):
+        """Block until the job finishes or timeout seconds pass"""
+        job["done"].wait(timeout)
+
+    def run(self, employees_data, timeout=None, **solve_options):
+        """
+        Solve through the queue and block for the result
+
+        Used by the synchronous endpoint so both APIs share the same pool
+        and limits. Raises concurrent.futures.TimeoutError if the solve
+        does not finish within timeout seconds.
+        """
+        return self.result(self.submit(employees_data, **solve_options), timeout)
+
+    def result(self, job, timeout=None):
+        """Block for a job's result, as run does"""
+        if not job["done"].wait(timeout):
+            raise FutureTimeoutError()
+        error = job["error"]
+        if isinstance(error, BrokenProcessPool):
+            raise QueueUnavailableError("The rota solver process crashed. Please try again.")
+        if error is not None:
+            raise error
+        return job["result"]
+
+    def describe(self, job):
+        """Serialisable view of a job record for API responses"""
+        if job["done"].is_set():
+            state = "failed" if job["error"] is not None else "finished"
+        elif job["future"].running():
+            state = "running"
+        else:
+            state = "queued"
+
+        data = {
+            "job_id": job["id"],
+            "status": state,
+            "submitted_at": job["submitted_at"],
+            "finished_at": job["finished_at"],
+        }
+        if state == "finished":
+            data["result"] = job["result"]
+        elif state == "failed":
+            data["error"] = f"Solver process failed: {job['error']}"
+        return data
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def solver_worker_settings():
+    """
+    ROTA_SOLVER_WORKER_ADDRESS and ROTA_SOLVER_WORKER_AUTHKEY, checked for
+    both ends of the runsolverworkers channel
+
+    Returns:
+        (address, authkey as bytes)
+
+    Raises:
+        ImproperlyConfigured: if the address is not local, or the key is
+            missing, too short or the same as SECRET_KEY
+    """
+    address = settings.ROTA_SOLVER_WORKER_ADDRESS
+    authkey = settings.ROTA_SOLVER_WORKER_AUTHKEY
+    if authkey == settings.SECRET_KEY:
+        raise ImproperlyConfigured("ROTA_SOLVER_WORKER_AUTHKEY must be its own secret, not SECRET_KEY")
+    try:
+        check_authkey(authkey.encode())
+        if address:
+            parse_address(address)
+    except ValueError as e:
+        raise ImproperlyConfigured(str(e))
+    return address, authkey.encode()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it from settings on first use"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            worker_address, authkey = None, None
+            if settings.ROTA_SOLVER_WORKER_ADDRESS:
+                worker_address, authkey = solver_worker_settings()
+            _job_queue = SolveJobQueue(
+                max_workers=settings.ROTA_SOLVER_WORKERS,
+                max_queued=settings.ROTA_SOLVER_QUEUE_DEPTH,
+                retention=settings.ROTA_JOB_RETENTION_SECONDS,
+                prewarm=settings.ROTA_SOLVER_PREWARM,
+                worker_address=worker_address,
+                authkey=authkey,
+            )
+        return _job_queue
+
+
+def start_solver_workers():
+    """Warm the solver workers at server start when ROTA_SOLVER_PREWARM is set"""
+    if settings.ROTA_SOLVER_PREWARM:
+        get_job_queue().start()
+
+
+def _queue_counts():
+    queue = _job_queue
+    if queue is None:
+        return None
+    with queue._lock:
+        jobs = [job for job in queue._jobs.values() if not job.get("coordinated")]
+    return {
+        ("running",): sum(1 for job in jobs if job["future"].running()),
+        ("queued",): sum(1 for job in jobs if not job["future"].done() and not job["future"].running()),
+    }
+
+
+def _active_streams():
+    queue = _job_queue
+    if queue is None:
+        return None
+    with queue._lock:
+        return sum(1 for job in queue._jobs.values() if job.get("progress") and not job["done"].is_set())
+
+
+def _queue_capacity():
+    queue = _job_queue
+    return None if queue is None else queue.max_workers + queue.max_queued
+
+
+def _warm_workers():
+    queue = _job_queue
+    return None if queue is None else queue.health().get("warm", 0)
+
+
+telemetry.REGISTRY.callback(
+    "rota_queue_jobs", "Jobs currently in the solver queue", "gauge", _queue_counts, labels=("state",))
+telemetry.REGISTRY.callback(
+    "rota_streams_active", "Rota solves currently streaming progress", "gauge", _active_streams)
+telemetry.REGISTRY.callback(
+    "rota_solver_workers_warm", "Solver worker processes that have finished warming up", "gauge", _warm_workers)
+telemetry.REGISTRY.callback(
+    "rota_queue_capacity", "Jobs the solver queue accepts before returning 429", "gauge", _queue_capacity)
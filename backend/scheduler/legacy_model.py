@@ -0,0 +1,163 @@
+from ortools.sat.python import cp_model
+
+
+def build_legacy_model(problem):
+    """
+    Build the same model as rota_solver.build_model, the old way
+
+    One BoolVar per (employee, day, shift) in a dict, sums as Python
+    sum() chains, equalities for coverage, one `<= 1` per employee-day
+    and one guarded `var == 0` per blocked variable. The rules, their
+    assumption literals and descriptions are the current ones, so only
+    the way the model is built differs. Kept so the benchmark can measure
+    build_model against it (see benchmark.compare_builders) and the tests
+    can check both build the same model; solves never use it.
+
+    Returns:
+        As build_model, except that index is None: the old solve read
+        each variable back with solver.Value
+    """
+    days = problem["days"]
+    weeks = problem["weeks"]
+    day_shifts = problem["day_shifts"]
+    employees = problem["employees"]
+    is_supervisor = problem["is_supervisor"]
+    floater = problem["floater"]
+    max_evenings = problem["max_evenings"]
+    max_shifts_per_employee = problem["max_shifts"]
+    max_shifts_horizon = problem["max_shifts_horizon"]
+    days_off = problem["days_off"]
+    holidays = problem["holidays"]
+    unavailable_shifts = problem["unavailable_shifts"]
+    must_work_shifts = problem["must_work_shifts"]
+
+    model = cp_model.CpModel()
+
+    shift_assignments = {}
+    for e in range(len(employees)):
+        for d in range(len(days)):
+            for s in range(len(day_shifts[d])):
+                shift_assignments[(e, d, s)] = model.NewBoolVar(f'emp{e}_day{d}_shift{s}')
+
+    worked = {
+        (e, d): [shift_assignments[(e, d, s)] for s in range(len(day_shifts[d]))]
+        for e in range(len(employees))
+        for d in range(len(days))
+    }
+    evenings = {
+        (e, d): [shift_assignments[(e, d, s)] for s, shift in enumerate(day_shifts[d]) if shift["evening"]]
+        for e in range(len(employees))
+        for d in range(len(days))
+    }
+    supervisors = [e for e in range(len(employees)) if is_supervisor[e]]
+
+    def check_slot(e, d, s):
+        if (e, d, s) not in shift_assignments:
+            raise ValueError(f"{employees[e]} refers to shift {s} on {days[d]}, which does not exist")
+
+    for d in range(len(days)):
+        for s, shift in enumerate(day_shifts[d]):
+            staff = sum(shift_assignments[(e, d, s)] for e in range(len(employees)))
+            if shift["min_staff"] == shift["max_staff"]:
+                model.Add(staff == shift["min_staff"])
+            else:
+                model.Add(staff >= shift["min_staff"])
+                model.Add(staff <= shift["max_staff"])
+
+    assumptions = []
+
+    def guard(e, constraint, description, d=None, s=None):
+        lit = model.NewBoolVar(f'assume_{constraint}_emp{e}_{len(assumptions)}')
+        assumptions.append((lit, {
+            "employee": employees[e],
+            "constraint": constraint,
+            "day": days[d] if d is not None else None,
+            "shift": day_shifts[d][s]["name"] if s is not None else None,
+            "description": f"{employees[e]} {description}",
+        }))
+        return lit
+
+    for e in range(len(employees)):
+        employee_holidays = holidays.get(e, set())
+        max_lit = guard(e, "max_shifts", f"can work at most {max_shifts_per_employee[e]} shifts a week")
+        min_lit = None
+        if is_supervisor[e] and not floater[e]:
+            min_lit = guard(e, "supervisor_rules", "must work at least 1 shift a week as a supervisor")
+        for week in weeks:
+            actual_shifts = sum(var for d in week for var in worked[(e, d)])
+            holiday_count = sum(1 for d in week if d in employee_holidays)
+            model.Add(actual_shifts + holiday_count <= max_shifts_per_employee[e]).OnlyEnforceIf(max_lit)
+            if min_lit is not None and len(week) == 7:
+                model.Add(actual_shifts + holiday_count >= 1).OnlyEnforceIf(min_lit)
+        if max_shifts_horizon[e] is not None:
+            lit = guard(e, "max_shifts_horizon", f"can work at most {max_shifts_horizon[e]} shifts over the horizon")
+            total_shifts = sum(var for d in range(len(days)) for var in worked[(e, d)])
+            model.Add(total_shifts + len(employee_holidays) <= max_shifts_horizon[e]).OnlyEnforceIf(lit)
+
+    for e in range(len(employees)):
+        for d in range(len(days)):
+            model.Add(sum(worked[(e, d)]) <= 1)
+
+    for e in range(len(employees)):
+        for d in days_off[e]:
+            lit = guard(e, "days_off", f"has {days[d]} as a day off", d)
+            for var in worked[(e, d)]:
+                model.Add(var == 0).OnlyEnforceIf(lit)
+
+    for d in range(len(days)):
+        for s, shift in enumerate(day_shifts[d]):
+            if shift["min_supervisors"]:
+                model.Add(sum(shift_assignments[(e, d, s)] for e in supervisors) >= shift["min_supervisors"])
+
+    for e, restricted_slots in unavailable_shifts.items():
+        for d, s in restricted_slots:
+            if (e, d, s) in shift_assignments:
+                lit = guard(e, "unavailable_shifts", f"is unavailable for {days[d]} {day_shifts[d][s]['name']}", d, s)
+                model.Add(shift_assignments[(e, d, s)] == 0).OnlyEnforceIf(lit)
+
+    for e, required_slots in must_work_shifts.items():
+        for d, s in required_slots:
+            check_slot(e, d, s)
+            lit = guard(e, "must_work_shifts", f"must work {days[d]} {day_shifts[d][s]['name']}", d, s)
+            model.Add(shift_assignments[(e, d, s)] == 1).OnlyEnforceIf(lit)
+
+    for e, holiday_days in holidays.items():
+        for d in holiday_days:
+            lit = guard(e, "holidays", f"is on holiday on {days[d]}", d)
+            for var in worked[(e, d)]:
+                model.Add(var == 0).OnlyEnforceIf(lit)
+
+    for e in supervisors:
+        if floater[e]:
+            lit = guard(e, "supervisor_rules",
+                        "can work at most this team's share of 3 evening shifts a week as a supervisor")
+        else:
+            lit = guard(e, "supervisor_rules", "must work 1 to 3 evening shifts a week as a supervisor")
+        for w, week in enumerate(weeks):
+            evening_shifts = sum(var for d in week for var in evenings[(e, d)])
+            if len(week) == 7 and not floater[e]:
+                model.Add(evening_shifts >= 1).OnlyEnforceIf(lit)
+            model.Add(evening_shifts <= max_evenings[e][w]).OnlyEnforceIf(lit)
+
+    max_consecutive = problem["max_consecutive_days"]
+    if max_consecutive is not None and max_consecutive < len(days):
+        for e in range(len(employees)):
+            lit = guard(e, "max_consecutive_days", f"can work at most {max_consecutive} days in a row")
+            for first in range(len(days) - max_consecutive):
+                window = range(first, first + max_consecutive + 1)
+                model.Add(sum(var for d in window for var in worked[(e, d)]) <= max_consecutive).OnlyEnforceIf(lit)
+
+    max_evening_shifts = None
+    if supervisors:
+        max_evening_shifts = model.NewIntVar(0, len(days), 'max_evening_shifts')
+        for e in supervisors:
+            model.Add(sum(var for d in range(len(days)) for var in evenings[(e, d)]) <= max_evening_shifts)
+
+    return {
+        "model": model,
+        "x": [[worked[(e, d)] for d in range(len(days))] for e in range(len(employees))],
+        "index": None,
+        "evenings": [[evenings[(e, d)] for d in range(len(days))] for e in range(len(employees))],
+        "assumptions": assumptions,
+        "max_evening_shifts": max_evening_shifts,
+    }
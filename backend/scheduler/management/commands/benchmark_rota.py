@@ -0,0 +1,139 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from tabulate import tabulate
+
+from scheduler.benchmark import (
+    SUITES, compare_builders, compare_runs, compare_solve_times, resolve_case, run_suite,
+)
+from scheduler.solver_options import SOLVER_PROFILES, resolve_solver_options
+
+
+class Command(BaseCommand):
+    help = "Benchmark solve_rota on synthetic workloads and compare against a baseline run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", choices=sorted(SUITES), default="quick",
+                            help="Named set of workloads to run (default: quick)")
+        parser.add_argument("--case", action="append", default=[], metavar="JSON",
+                            help='Run a custom case instead, e.g. \'{"employees": 80, "days": 14}\'. Repeatable.')
+        parser.add_argument("--profile", choices=sorted(SOLVER_PROFILES), default="balanced",
+                            help="Solver profile to benchmark (default: balanced)")
+        parser.add_argument("--workers", type=int, help="Override the profile's num_workers")
+        parser.add_argument("--portfolio", type=int, metavar="RUNS",
+                            help="Race this many seeds and search strategies per solve")
+        parser.add_argument("--seed", type=int, help="CP-SAT seed for every case (default: each case's own)")
+        parser.add_argument("--repeat", type=int, default=1, help="Solve each case this many times and report medians")
+        parser.add_argument("--output", help="Write the run as JSON to this path")
+        parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Fractional slowdown that counts as a regression (default: 0.25)")
+        parser.add_argument("--compare-symmetry", action="store_true",
+                            help="Run every case with symmetry breaking off and on and report the speedup")
+        parser.add_argument("--compare-builders", action="store_true",
+                            help="Time building each case's model with the old and the current builder, without solving")
+
+    def handle(self, *args, **options):
+        try:
+            if options["case"]:
+                cases = [resolve_case(json.loads(case)) for case in options["case"]]
+            else:
+                cases = SUITES[options["suite"]]
+            overrides = {"profile": options["profile"]}
+            if options["workers"]:
+                overrides["num_workers"] = options["workers"]
+            if options["portfolio"]:
+                overrides["portfolio_runs"] = options["portfolio"]
+            if options["seed"] is not None:
+                overrides["random_seed"] = options["seed"]
+            solver_options = resolve_solver_options(overrides)
+        except (ValueError, json.JSONDecodeError) as e:
+            raise CommandError(str(e))
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        def progress(result):
+            self.stdout.write(f"{result['name']}: {result['status']} in {result['total_seconds']:.3f}s")
+
+        if options["compare_builders"]:
+            self.compare_builders(cases, options["repeat"])
+            return
+
+        if options["compare_symmetry"]:
+            self.compare_symmetry(cases, solver_options, options["repeat"], progress)
+            return
+
+        run = run_suite(cases, solver_options, options["repeat"], progress)
+
+        rows = [
+            [
+                case["name"], case["status"], case["variables"], case["constraints"],
+                f"{case['build_seconds']:.3f}", f"{case['solve_seconds']:.3f}",
+                f"{case.get('render_seconds', 0.0):.3f}",
+                f"{case['peak_memory_bytes'] / 2**20:.1f}",
+                case["objective"], case["gap"] if case["gap"] is None else f"{case['gap']:.3f}",
+                case.get("strategy"),
+            ]
+            for case in run["cases"]
+        ]
+        self.stdout.write(tabulate(rows, headers=[
+            "Case", "Status", "Vars", "Constraints", "Build s", "Solve s", "Render s", "Peak MiB", "Objective", "Gap",
+            "Strategy",
+        ]))
+
+        unexpected = [
+            case["name"] for case in run["cases"]
+            if (case["status"] == "no_solution") != (case["expected"] == "no_solution")
+        ]
+        for name in unexpected:
+            self.stderr.write(self.style.WARNING(f"{name}: outcome differs from what the workload was built for"))
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+            regressions = compare_runs(run, baseline, options["threshold"])
+            if regressions:
+                self.stdout.write(tabulate(
+                    [[r["name"], r["metric"], r["baseline"], r["current"]] for r in regressions],
+                    headers=["Case", "Metric", "Baseline", "Current"],
+                ))
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def compare_symmetry(self, cases, solver_options, repeat, progress):
+        runs = {}
+        for enabled in (False, True):
+            self.stdout.write(f"Symmetry breaking {'on' if enabled else 'off'}:")
+            runs[enabled] = run_suite(cases, {**solver_options, "symmetry_breaking": enabled}, repeat, progress)
+        symmetric = {case["name"]: case["symmetric_employees"] for case in runs[True]["cases"]}
+        self.stdout.write(tabulate(
+            [
+                [row["name"], row["status"], symmetric[row["name"]],
+                 f"{row['without']:.3f}", f"{row['with']:.3f}", f"{row['speedup']:.2f}x"]
+                for row in compare_solve_times(runs[False], runs[True])
+            ],
+            headers=["Case", "Status", "Symmetric staff", "Solve s (off)", "Solve s (on)", "Speedup"],
+        ))
+
+    def compare_builders(self, cases, repeat):
+        rows = compare_builders(cases, repeat, lambda row: self.stdout.write(
+            f"{row['name']}: {row['legacy_seconds']:.3f}s -> {row['seconds']:.3f}s"))
+        self.stdout.write(tabulate(
+            [
+                [row["name"], row["legacy_variables"], row["variables"], row["legacy_constraints"], row["constraints"],
+                 f"{row['legacy_seconds']:.3f}", f"{row['seconds']:.3f}", f"{row['speedup']:.2f}x"]
+                for row in rows
+            ],
+            headers=["Case", "Vars (old)", "Vars", "Constraints (old)", "Constraints", "Build s (old)", "Build s",
+                     "Speedup"],
+        ))
+        total = sum(row["legacy_seconds"] for row in rows) / max(sum(row["seconds"] for row in rows), 1e-6)
+        self.stdout.write(f"Overall: {total:.2f}x faster")
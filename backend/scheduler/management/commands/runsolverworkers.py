@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.jobs import solver_worker_settings
+from scheduler.workers import SolverWorkerServer, parse_address
+
+
+class Command(BaseCommand):
+    help = "Run warm rota solver workers for web processes to send solves to (ROTA_SOLVER_WORKER_ADDRESS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--address", default=settings.ROTA_SOLVER_WORKER_ADDRESS,
+                            help='Unix socket path, or localhost "host:port", to listen on '
+                                 '(default: ROTA_SOLVER_WORKER_ADDRESS)')
+        parser.add_argument("--workers", type=int, default=settings.ROTA_SOLVER_WORKERS,
+                            help="Solver processes to run (default: ROTA_SOLVER_WORKERS)")
+
+    def handle(self, *args, **options):
+        if not options["address"]:
+            raise CommandError("Set ROTA_SOLVER_WORKER_ADDRESS or pass --address")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+        try:
+            _, authkey = solver_worker_settings()
+            parse_address(options["address"])
+        except (ImproperlyConfigured, ValueError) as e:
+            raise CommandError(str(e))
+
+        def ready(health):
+            self.stdout.write(self.style.SUCCESS(
+                f"{health['warm']} of {health['workers']} solver workers warm "
+                f"({', '.join(f'{s:.2f}s' for s in health['warm_up_seconds'])}); "
+                f"listening on {options['address']}"
+            ))
+
+        server = SolverWorkerServer(options["address"], authkey, options["workers"])
+        try:
+            server.serve_forever(ready)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,159 @@
+from ortools.sat.python import cp_model
+
+from .precheck import build_matrices
+from .problem import MAX_SUPERVISOR_EVENINGS, floater_teams, prepare_problem
+
+# Master model time limit; it only has a floaters × days × teams grid
+MASTER_TIME_LIMIT = 5.0
+
+# Weight of one uncovered staff or supervisor need against one unused floater day
+SHORTFALL_WEIGHT = 1000
+
+
+def allocate_floaters(teams, floaters, horizon, template, time_limit=MASTER_TIME_LIMIT):
+    """
+    Master model: decide which team each floater may work at on each day
+
+    Each team's shortfall is estimated from its home staff alone: staff and
+    supervisors available each day, and weekly capacity within everyone's
+    shift caps. Floater days are placed to cover as much of those
+    shortfalls as possible, within each floater's own availability and
+    weekly caps. Remaining days go to any allowed team, since an allocated
+    day only lets that team's rota use the floater.
+
+    A supervisor works at most MAX_SUPERVISOR_EVENINGS evenings a week in
+    total, so each supervisor floater's weekly evenings are shared out
+    between teams too, towards the teams whose own supervisors cannot
+    cover their evenings.
+
+    Returns:
+        {"allocation": {name: {day: team}},
+         "evening_shares": {name: {team: [evenings per week]}} for
+         supervisor floaters, "shortfall": uncovered need,
+         "status": CP-SAT status name}
+    """
+    team_names = list(teams)
+    problem = prepare_problem(floaters, horizon, template)
+    num_days = len(problem["days"])
+    fm = build_matrices(problem)
+    available = (~fm["blocked"]).any(axis=2)
+    evening_available = (~fm["blocked"] & fm["evening"][None, :, :]).any(axis=2)
+    must_evenings = (fm["must"] & fm["evening"][None, :, :]).sum(axis=2)
+
+    model = cp_model.CpModel()
+    shares = {}
+    x = {}
+    for f, emp in enumerate(floaters):
+        allowed = floater_teams(emp, team_names)
+        for d in range(num_days):
+            if not available[f, d]:
+                continue
+            for t in allowed:
+                x[(f, d, t)] = model.NewBoolVar(f"float{f}_day{d}_{t}")
+            model.AddAtMostOne(x[(f, d, t)] for t in allowed if (f, d, t) in x)
+
+        holidays = problem["holidays"].get(f, set())
+        for week in problem["weeks"]:
+            allowance = problem["max_shifts"][f] - sum(1 for d in week if d in holidays)
+            model.Add(sum(x[(f, d, t)] for d in week for t in allowed if (f, d, t) in x) <= max(allowance, 0))
+        if problem["max_shifts_horizon"][f] is not None:
+            model.Add(sum(var for (g, _, _), var in x.items() if g == f)
+                      <= max(problem["max_shifts_horizon"][f] - len(holidays), 0))
+
+        # Must-work shifts are worked at the home team
+        for d, _ in problem["must_work_shifts"].get(f, []):
+            if (f, d, allowed[0]) in x:
+                model.Add(x[(f, d, allowed[0])] == 1)
+
+        # Each team's rota may use this floater for its share of the
+        # supervisor's weekly evenings, one per evening-capable day there
+        if problem["is_supervisor"][f]:
+            for w, week in enumerate(problem["weeks"]):
+                for t in allowed:
+                    shares[(f, w, t)] = model.NewIntVar(0, MAX_SUPERVISOR_EVENINGS, f"evenings{f}_week{w}_{t}")
+                    model.Add(shares[(f, w, t)] <= sum(
+                        x[(f, d, t)] for d in week if (f, d, t) in x and evening_available[f, d]))
+                model.Add(sum(shares[(f, w, t)] for t in allowed) <= MAX_SUPERVISOR_EVENINGS)
+                model.Add(shares[(f, w, allowed[0])] >= int(must_evenings[f, week].sum()))
+
+    shortfalls = []
+    for t in team_names:
+        home = prepare_problem(teams[t], horizon, template)
+        m = build_matrices(home)
+        home_available = (~m["blocked"]).any(axis=2)
+        supervisor = [bool(s) for s in home["is_supervisor"]]
+        staff_need = m["min_staff"].sum(axis=1)
+        supervisor_need = m["min_supervisors"].sum(axis=1)
+        staff_on_day = home_available.sum(axis=0)
+        supervisors_on_day = home_available[supervisor].sum(axis=0)
+
+        def placed(days, supervisors_only=False):
+            return sum(
+                var for (f, d, team), var in x.items()
+                if team == t and d in days and (not supervisors_only or problem["is_supervisor"][f])
+            )
+
+        for d in range(num_days):
+            for need, have, supervisors_only in ((staff_need[d], staff_on_day[d], False),
+                                                 (supervisor_need[d], supervisors_on_day[d], True)):
+                gap = int(need) - int(have)
+                if gap > 0:
+                    short = model.NewIntVar(0, gap, f"short_{t}_day{d}_{int(supervisors_only)}")
+                    model.Add(short >= gap - placed({d}, supervisors_only))
+                    shortfalls.append(short)
+
+        for w, week in enumerate(home["weeks"]):
+            holidays_in_week = m["holiday"][:, week].sum(axis=1)
+            allowance = [max(int(cap) - int(h), 0) for cap, h in zip(home["max_shifts"], holidays_in_week)]
+            capacity = sum(min(a, int(n)) for a, n in zip(allowance, home_available[:, week].sum(axis=1)))
+            gap = int(m["min_staff"][week].sum()) - capacity
+            if gap > 0:
+                short = model.NewIntVar(0, gap, f"short_{t}_week{w}")
+                model.Add(short >= gap - placed(set(week)))
+                shortfalls.append(short)
+
+            # Supervisor evenings the home supervisors cannot work within their weekly cap
+            evening_need = int((m["min_supervisors"][week] * m["evening"][week]).sum())
+            home_evenings = (~m["blocked"][:, week] & m["evening"][week][None, :, :]).any(axis=2).sum(axis=1)
+            gap = evening_need - sum(min(MAX_SUPERVISOR_EVENINGS, int(n))
+                                     for n, s in zip(home_evenings, supervisor) if s)
+            if gap > 0:
+                short = model.NewIntVar(0, gap, f"short_{t}_week{w}_evenings")
+                model.Add(short >= gap - sum(var for (_, v, team), var in shares.items() if team == t and v == w))
+                shortfalls.append(short)
+
+    model.Minimize(SHORTFALL_WEIGHT * sum(shortfalls) - sum(x.values()) - sum(shares.values()))
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = 1
+    status = solver.Solve(model)
+
+    allocation = {emp["name"]: {} for emp in floaters}
+    evening_shares = {
+        emp["name"]: {t: [0] * len(problem["weeks"]) for t in floater_teams(emp, team_names)}
+        for f, emp in enumerate(floaters) if problem["is_supervisor"][f]
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        for (f, d, t), var in x.items():
+            if solver.Value(var):
+                allocation[floaters[f]["name"]][d] = t
+        for (f, w, t), var in shares.items():
+            evening_shares[floaters[f]["name"]][t][w] = solver.Value(var)
+        shortfall = int(sum(solver.Value(short) for short in shortfalls))
+    else:
+        # Caps the floater cannot meet anyway (e.g. too many must-work
+        # shifts); keep them at home and let that team's rota report it
+        for f, emp in enumerate(floaters):
+            allowed = floater_teams(emp, team_names)
+            for d in range(num_days):
+                if available[f, d]:
+                    allocation[emp["name"]][d] = allowed[0]
+            if emp["name"] in evening_shares:
+                evening_shares[emp["name"]][allowed[0]] = [MAX_SUPERVISOR_EVENINGS] * len(problem["weeks"])
+        shortfall = None
+    return {
+        "allocation": allocation,
+        "evening_shares": evening_shares,
+        "shortfall": shortfall,
+        "status": solver.StatusName(status),
+    }
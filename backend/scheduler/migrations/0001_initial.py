@@ -0,0 +1,80 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('is_supervisor', models.BooleanField(default=False)),
+                ('max_shifts', models.PositiveSmallIntegerField()),
+                ('max_shifts_horizon', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Rota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(blank=True, max_length=32, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('status', models.CharField(max_length=20)),
+                ('template', models.CharField(blank=True, max_length=100)),
+                ('start_date', models.DateField(blank=True, db_index=True, null=True)),
+                ('days', models.PositiveSmallIntegerField()),
+                ('objective', models.FloatField(blank=True, null=True)),
+                ('result', models.JSONField()),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeConstraint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('days_off', 'Day off'), ('holidays', 'Holiday'), ('unavailable_shifts', 'Unavailable shift'), ('must_work_shifts', 'Must-work shift')], max_length=20)),
+                ('day', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('shift', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='constraints', to='scheduler.employee')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['employee', 'kind'], name='scheduler_e_employe_d41c25_idx'), models.Index(fields=['date'], name='scheduler_e_date_b682f7_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RotaAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_name', models.CharField(max_length=100)),
+                ('day', models.PositiveSmallIntegerField()),
+                ('date', models.DateField(blank=True, null=True)),
+                ('week', models.PositiveSmallIntegerField()),
+                ('shift', models.PositiveSmallIntegerField()),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assignments', to='scheduler.employee')),
+                ('rota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='scheduler.rota')),
+            ],
+            options={
+                'ordering': ['rota', 'day', 'shift', 'employee_name'],
+                'indexes': [models.Index(fields=['date', 'employee_name'], name='scheduler_r_date_4128d5_idx'), models.Index(fields=['employee_name', 'rota'], name='scheduler_r_employe_869eeb_idx'), models.Index(fields=['rota', 'day'], name='scheduler_r_rota_id_10df73_idx')],
+            },
+        ),
+    ]
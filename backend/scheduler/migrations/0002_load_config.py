@@ -0,0 +1,65 @@
+import json
+import os
+from datetime import date
+
+from django.db import migrations
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
+
+SLOT_KINDS = {"unavailable_shifts", "must_work_shifts"}
+KINDS = ["days_off", "holidays", "unavailable_shifts", "must_work_shifts"]
+
+
+def split_day(value):
+    try:
+        return int(value), None
+    except ValueError:
+        return None, date.fromisoformat(value)
+
+
+def load_config(apps, schema_editor):
+    """Import the staff list from config.json, which the API used to read and rewrite"""
+    Employee = apps.get_model("scheduler", "Employee")
+    EmployeeConstraint = apps.get_model("scheduler", "EmployeeConstraint")
+    if Employee.objects.exists() or not os.path.exists(CONFIG_PATH):
+        return
+
+    with open(CONFIG_PATH) as f:
+        employees = json.load(f)
+
+    constraints = []
+    for position, emp in enumerate(employees):
+        horizon_cap = emp.get("max_shifts_horizon")
+        employee = Employee.objects.create(
+            name=emp["name"],
+            is_supervisor=bool(emp["is_supervisor"]),
+            max_shifts=int(emp["max_shifts"]),
+            max_shifts_horizon=int(horizon_cap) if horizon_cap not in (None, "") else None,
+            position=position,
+        )
+        for kind in KINDS:
+            for value in emp.get(kind, []):
+                shift = None
+                if kind in SLOT_KINDS:
+                    value, shift = value
+                day, on_date = split_day(value)
+                constraints.append(EmployeeConstraint(
+                    employee=employee, kind=kind, day=day, date=on_date,
+                    shift=None if shift is None else int(shift),
+                ))
+    EmployeeConstraint.objects.bulk_create(constraints)
+
+
+def unload_config(apps, schema_editor):
+    apps.get_model("scheduler", "Employee").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(load_config, unload_config),
+    ]
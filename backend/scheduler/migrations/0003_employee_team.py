@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0002_load_config'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='float_teams',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='team',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
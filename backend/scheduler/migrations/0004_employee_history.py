@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_weekdays(apps, schema_editor):
+    """Weekdays for assignments saved before the column existed, as build_calendar numbers them"""
+    RotaAssignment = apps.get_model("scheduler", "RotaAssignment")
+    assignments = list(RotaAssignment.objects.all())
+    for assignment in assignments:
+        assignment.weekday = assignment.date.weekday() if assignment.date else assignment.day % 7
+    RotaAssignment.objects.bulk_update(assignments, ["weekday"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0003_employee_team'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rota',
+            name='accepted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rotaassignment',
+            name='evening',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='rotaassignment',
+            name='minutes',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rotaassignment',
+            name='weekday',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='EmployeeHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_name', models.CharField(max_length=100, unique=True)),
+                ('evenings', models.FloatField(default=0)),
+                ('weekends', models.FloatField(default=0)),
+                ('hours', models.FloatField(default=0)),
+                ('rotas', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='scheduler.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'employee histories',
+                'ordering': ['employee_name'],
+            },
+        ),
+        migrations.RunPython(backfill_weekdays, migrations.RunPython.noop),
+    ]
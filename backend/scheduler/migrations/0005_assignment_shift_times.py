@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_employee_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rotaassignment',
+            name='shift_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='rotaassignment',
+            name='start',
+            field=models.TimeField(blank=True, null=True),
+        ),
+    ]
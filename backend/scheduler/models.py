@@ -1,3 +1,425 @@
-from django.db import models
+import math
+from datetime import date
 
-# Create your models here.
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+
+def parse_day(value):
+    """
+    Split a day reference into (horizon day, date)
+
+    Days are horizon indices or ISO date strings, as in the rota request.
+
+    Raises:
+        ValueError: if value is neither
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"'{value}' is not a day")
+    try:
+        day = int(value)
+    except (TypeError, ValueError):
+        try:
+            return None, date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"'{value}' is not a day number or ISO date")
+    if day < 0:
+        raise ValueError(f"Day {day} is negative")
+    return day, None
+
+
+def parse_constraints(name, config):
+    """
+    Check the constraint lists present in an employee's config
+
+    Args:
+        name: Employee name, for error messages
+        config: Employee dict; only the EmployeeConstraint kinds it has
+            are read
+
+    Returns:
+        List of (kind, day, date, shift), one per constraint
+
+    Raises:
+        ValueError: for a malformed day or shift slot
+    """
+    rows = []
+    for kind in EmployeeConstraint.Kind.values:
+        if kind not in config:
+            continue
+        values = config[kind] or []
+        if not isinstance(values, list):
+            raise ValueError(f"{name}: {kind} must be a list")
+        for value in values:
+            shift = None
+            if kind in EmployeeConstraint.SLOT_KINDS:
+                if not isinstance(value, (list, tuple)) or len(value) != 2:
+                    raise ValueError(f"{name}: {kind} entries must be [day, shift] pairs")
+                value, shift = value
+                try:
+                    shift = int(shift)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name}: shift '{shift}' in {kind} is not a number")
+                if shift < 0:
+                    raise ValueError(f"{name}: shift {shift} in {kind} is negative")
+            try:
+                day, on_date = parse_day(value)
+            except ValueError as e:
+                raise ValueError(f"{name}: {kind}: {e}")
+            if kind == EmployeeConstraint.Kind.DAY_OFF and (on_date is not None or day > 6):
+                raise ValueError(f"{name}: days_off are weekdays from 0 (Mon) to 6 (Sun)")
+            rows.append((kind, day, on_date, shift))
+    return rows
+
+
+class Employee(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    is_supervisor = models.BooleanField(default=False)
+    max_shifts = models.PositiveSmallIntegerField()
+    max_shifts_horizon = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Home site or team; floaters list the other teams they can cover
+    team = models.CharField(max_length=100, blank=True, db_index=True)
+    float_teams = models.JSONField(default=list, blank=True)
+    # Order of the staff list as last saved
+    position = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["position", "id"]
+
+    def __str__(self):
+        return self.name
+
+    def to_config(self):
+        """
+        The employee in the config.json shape the solver and frontend use
+
+        Uses prefetched constraints when available, so prefetch
+        "constraints" when serialising a list.
+        """
+        data = {
+            "name": self.name,
+            "is_supervisor": self.is_supervisor,
+            "max_shifts": self.max_shifts,
+            "days_off": [],
+            "holidays": [],
+            "unavailable_shifts": [],
+            "must_work_shifts": [],
+        }
+        if self.max_shifts_horizon is not None:
+            data["max_shifts_horizon"] = self.max_shifts_horizon
+        if self.team:
+            data["team"] = self.team
+        if self.float_teams:
+            data["float_teams"] = self.float_teams
+        for constraint in self.constraints.all():
+            day = constraint.date.isoformat() if constraint.date else constraint.day
+            if constraint.kind in EmployeeConstraint.SLOT_KINDS:
+                data[constraint.kind].append([day, constraint.shift])
+            else:
+                data[constraint.kind].append(day)
+        return data
+
+    def set_constraints(self, config):
+        """
+        Replace this employee's constraints of every kind present in config
+
+        Kinds missing from config are left alone, so a partial update only
+        touches the lists it sends.
+
+        Raises:
+            ValueError: for a malformed day or shift slot
+        """
+        kinds = [kind for kind in EmployeeConstraint.Kind.values if kind in config]
+        rows = [
+            EmployeeConstraint(employee=self, kind=kind, day=day, date=on_date, shift=shift)
+            for kind, day, on_date, shift in parse_constraints(self.name, config)
+        ]
+        self.constraints.filter(kind__in=kinds).delete()
+        EmployeeConstraint.objects.bulk_create(rows)
+
+
+class EmployeeConstraint(models.Model):
+    """
+    One day off, holiday, unavailable shift or must-work shift
+
+    A day is either a horizon day index (a weekday for days off) or a
+    calendar date; exactly one of `day` and `date` is set. `shift` is only
+    set for the shift-slot kinds.
+    """
+
+    class Kind(models.TextChoices):
+        DAY_OFF = "days_off", "Day off"
+        HOLIDAY = "holidays", "Holiday"
+        UNAVAILABLE_SHIFT = "unavailable_shifts", "Unavailable shift"
+        MUST_WORK_SHIFT = "must_work_shifts", "Must-work shift"
+
+    SLOT_KINDS = {Kind.UNAVAILABLE_SHIFT, Kind.MUST_WORK_SHIFT}
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="constraints")
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    day = models.PositiveSmallIntegerField(null=True, blank=True)
+    date = models.DateField(null=True, blank=True)
+    shift = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["employee", "kind"]),
+            models.Index(fields=["date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} {self.kind} {self.date or self.day} {'' if self.shift is None else self.shift}".strip()
+
+
+class Rota(models.Model):
+    """A generated rota; the full solve result is kept in `result`"""
+
+    job_id = models.CharField(max_length=32, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    status = models.CharField(max_length=20)
+    template = models.CharField(max_length=100, blank=True)
+    start_date = models.DateField(null=True, blank=True, db_index=True)
+    days = models.PositiveSmallIntegerField()
+    objective = models.FloatField(null=True, blank=True)
+    result = models.JSONField()
+    # Set once the rota is adopted and counted into EmployeeHistory
+    accepted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"Rota {self.pk} ({self.start_date or 'undated'}, {self.days} days)"
+
+    @classmethod
+    def save_result(cls, result, job_id=None):
+        """
+        Store a successful solve_rota result and its assignments
+
+        A result already saved under job_id is returned instead of being
+        stored twice.
+        """
+        calendar = result.get("calendar") or []
+        assignments = result.get("assignments") or []
+        names = {a["employee"] for a in assignments}
+        employee_ids = dict(Employee.objects.filter(name__in=names).values_list("name", "id"))
+
+        fields = {
+            "status": result["status"],
+            "template": result.get("template") or "",
+            "start_date": calendar[0]["date"] if calendar else None,
+            "days": len(calendar),
+            "objective": (result.get("solver_stats") or {}).get("objective"),
+            "result": result,
+        }
+        with transaction.atomic():
+            if job_id:
+                rota, created = cls.objects.get_or_create(job_id=job_id, defaults=fields)
+                if not created:
+                    return rota
+            else:
+                rota = cls.objects.create(**fields)
+            RotaAssignment.objects.bulk_create([
+                RotaAssignment(
+                    rota=rota,
+                    employee_id=employee_ids.get(a["employee"]),
+                    employee_name=a["employee"],
+                    day=a["day"],
+                    date=a.get("date"),
+                    week=calendar[a["day"]]["week"],
+                    weekday=calendar[a["day"]]["weekday"],
+                    shift=a["shift"],
+                    shift_name=a.get("shift_name") or "",
+                    start=parse_time(a["start"]) if a.get("start") else None,
+                    evening=bool(a.get("evening")),
+                    minutes=a.get("minutes") or 0,
+                )
+                for a in assignments
+            ], batch_size=500)
+        return rota
+
+    def summary(self):
+        """The rota's metadata without the stored result"""
+        return {
+            "id": self.id,
+            "job_id": self.job_id,
+            "created_at": self.created_at,
+            "status": self.status,
+            "template": self.template,
+            "start_date": self.start_date,
+            "days": self.days,
+            "objective": self.objective,
+            "accepted_at": self.accepted_at,
+        }
+
+    def accept(self, decay):
+        """
+        Adopt this rota and add its shifts to its employees' history
+
+        The history of everyone in this rota, including those given no
+        shifts, is first decayed by `decay` per week of this rota, then each
+        employee's evenings, weekend shifts and hours here are added, so the
+        aggregates stay a rolling window without replaying earlier rotas.
+        Other employees' history is left alone, so accepting one team's rota
+        does not age another team's.
+
+        Returns:
+            Number of employees whose history gained shifts
+
+        Raises:
+            ValueError: if the rota was already accepted
+        """
+        totals = {}
+        for name, employee_id, evening, weekday, minutes in self.assignments.values_list(
+            "employee_name", "employee_id", "evening", "weekday", "minutes"
+        ):
+            entry = totals.setdefault(name, {"employee_id": employee_id, "evenings": 0, "weekends": 0, "hours": 0.0})
+            entry["evenings"] += evening
+            entry["weekends"] += weekday >= 5
+            entry["hours"] += minutes / 60
+        # shift_totals lists every employee solved for, worked or not
+        names = set(totals) | set(self.result.get("shift_totals") or {})
+
+        factor = decay ** math.ceil(self.days / 7)
+        with transaction.atomic():
+            rota = Rota.objects.select_for_update().get(pk=self.pk)
+            if rota.accepted_at is not None:
+                raise ValueError(f"Rota {self.pk} was already accepted")
+            EmployeeHistory.objects.filter(employee_name__in=names).update(
+                evenings=F("evenings") * factor,
+                weekends=F("weekends") * factor,
+                hours=F("hours") * factor,
+            )
+            existing = {
+                h.employee_name: h
+                for h in EmployeeHistory.objects.select_for_update().filter(employee_name__in=totals)
+            }
+            created = []
+            for name, entry in totals.items():
+                history = existing.get(name)
+                if history is None:
+                    history = EmployeeHistory(employee_name=name)
+                    created.append(history)
+                history.employee_id = entry["employee_id"] or history.employee_id
+                history.evenings += entry["evenings"]
+                history.weekends += entry["weekends"]
+                history.hours += entry["hours"]
+                history.rotas += 1
+                history.updated_at = timezone.now()
+            EmployeeHistory.objects.bulk_update(
+                list(existing.values()),
+                ["employee", "evenings", "weekends", "hours", "rotas", "updated_at"],
+                batch_size=500,
+            )
+            EmployeeHistory.objects.bulk_create(created, batch_size=500)
+            self.accepted_at = rota.accepted_at = timezone.now()
+            rota.save(update_fields=["accepted_at"])
+        return len(totals)
+
+
+class RotaAssignment(models.Model):
+    """
+    One shift worked in a saved rota
+
+    Kept as rows, rather than only inside Rota.result, so rotas can be
+    searched by week and employee in the database. The employee's name is
+    stored as solved; `employee` links to the saved employee when there is
+    one.
+    """
+
+    rota = models.ForeignKey(Rota, on_delete=models.CASCADE, related_name="assignments")
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name="assignments")
+    employee_name = models.CharField(max_length=100)
+    day = models.PositiveSmallIntegerField()
+    date = models.DateField(null=True, blank=True)
+    week = models.PositiveSmallIntegerField()
+    weekday = models.PositiveSmallIntegerField(default=0)
+    shift = models.PositiveSmallIntegerField()
+    # The shift as defined in the template it was solved with, for exports
+    # and EmployeeHistory; `start` is empty for rotas saved before it was kept
+    shift_name = models.CharField(max_length=100, blank=True)
+    start = models.TimeField(null=True, blank=True)
+    evening = models.BooleanField(default=False)
+    minutes = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ["rota", "day", "shift", "employee_name"]
+        indexes = [
+            models.Index(fields=["date", "employee_name"]),
+            models.Index(fields=["employee_name", "rota"]),
+            models.Index(fields=["rota", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_name} day {self.day} shift {self.shift}"
+
+    def to_dict(self):
+        return {
+            "employee": self.employee_name,
+            "day": self.day,
+            "date": self.date,
+            "week": self.week,
+            "shift": self.shift,
+            "shift_name": self.shift_name,
+            "start": self.start,
+            "minutes": self.minutes,
+        }
+
+
+class EmployeeHistory(models.Model):
+    """
+    Rolling totals of what an employee has worked in accepted rotas
+
+    Kept as decayed aggregates (see Rota.accept) rather than rebuilt from
+    assignments, so reading everyone's history for a solve is one row per
+    employee however many rotas have been accepted. Keyed by name like
+    RotaAssignment, so history survives an employee being re-created.
+    """
+
+    employee_name = models.CharField(max_length=100, unique=True)
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name="history")
+    evenings = models.FloatField(default=0)
+    weekends = models.FloatField(default=0)
+    hours = models.FloatField(default=0)
+    # Accepted rotas the employee has worked in
+    rotas = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["employee_name"]
+        verbose_name_plural = "employee histories"
+
+    def __str__(self):
+        return f"{self.employee_name} history"
+
+    @classmethod
+    def snapshot(cls, names):
+        """
+        The fairness history solve_rota takes for these employees
+
+        Values are rounded so small decay differences don't defeat the
+        result cache. Employees without history are left out.
+        """
+        return {
+            h.employee_name: {
+                "evenings": round(h.evenings, 1),
+                "weekends": round(h.weekends, 1),
+                "hours": round(h.hours, 1),
+            }
+            for h in cls.objects.filter(employee_name__in=names)
+        }
+
+    def to_dict(self):
+        return {
+            "employee": self.employee_name,
+            "evenings": self.evenings,
+            "weekends": self.weekends,
+            "hours": self.hours,
+            "rotas": self.rotas,
+            "updated_at": self.updated_at,
+        }
@@ -0,0 +1,238 @@
+import copy
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .jobs import QueueFullError
+from .problem import prepare_problem
+
+STATUS_ORDER = ["optimal", "feasible", "timeout", "no_solution", "error"]
+
+
+def split_teams(employees_data):
+    """
+    Group employees by their "team" for per-site solving
+
+    Employees with "float_teams" are floaters: they may also be placed at
+    the listed teams, and need not have a home team of their own.
+
+    Returns:
+        (teams, floaters): teams maps every team name (home or float
+        target) to its home staff who do not float; floaters is a list
+
+    Raises:
+        ValueError: if an employee has no team, or a floater has
+            must-work shifts but no home team to work them at
+    """
+    teams = {}
+    floaters = []
+    for emp in employees_data:
+        team = str(emp.get("team") or "").strip()
+        float_teams = emp.get("float_teams") or []
+        if not isinstance(float_teams, list):
+            raise ValueError(f"{emp['name']}: float_teams must be a list of team names")
+        if not team and not float_teams:
+            raise ValueError(f"{emp['name']} needs a team (or float_teams) to solve rotas by team")
+        if team:
+            teams.setdefault(team, [])
+        for other in float_teams:
+            teams.setdefault(str(other), [])
+        if float_teams:
+            if not team and emp.get("must_work_shifts"):
+                raise ValueError(f"{emp['name']} has must-work shifts but no home team")
+            floaters.append(emp)
+        else:
+            teams[team].append(emp)
+    return teams, floaters
+
+
+def team_employees(team, members, floaters, allocation, day_shifts, evening_shares=None):
+    """
+    The staff list for one team's subproblem
+
+    Floaters are included for the days allocated to this team and marked
+    unavailable for every shift on their other days. Their must-work shifts
+    stay with their home team, and supervisor floaters may only work this
+    team's share of their weekly evenings (see master_model.allocate_floaters).
+    """
+    employees = list(members)
+    for emp in floaters:
+        days = {d for d, t in allocation[emp["name"]].items() if t == team}
+        if not days:
+            continue
+        emp = copy.deepcopy(emp)
+        emp["floater"] = True
+        emp["unavailable_shifts"] = list(emp.get("unavailable_shifts", [])) + [
+            [d, s] for d in range(len(day_shifts)) if d not in days for s in range(len(day_shifts[d]))
+        ]
+        if str(emp.get("team") or "") != team:
+            emp["must_work_shifts"] = []
+        if evening_shares and emp["name"] in evening_shares:
+            emp["max_evenings"] = evening_shares[emp["name"]][team]
+        employees.append(emp)
+    return employees
+
+
+def merge_results(team_results, floaters, allocation, master):
+    """
+    Combine per-team solve results into one rota response
+
+    The table gains a "Team" column. Each floater gets one row, showing the
+    team in brackets for shifts worked away from their home team. Totals
+    are summed across teams, and each team's own status, message,
+    conflicts and solver stats are kept under "teams".
+    """
+    statuses = [result["status"] for result in team_results.values()]
+    status = max(statuses, key=STATUS_ORDER.index) if statuses else "error"
+    first = next(iter(team_results.values()))
+    calendar = first.get("calendar") or []
+    days = first["headers"][1:]
+    floater_names = {emp["name"] for emp in floaters}
+    home_team = {emp["name"]: str(emp.get("team") or "") for emp in floaters}
+
+    table = []
+    floater_cells = {name: [None] * len(days) for name in floater_names}
+    shift_totals, evening_totals, weekly_totals = {}, {}, {}
+    assignments = []
+    for team, result in team_results.items():
+        for row in result.get("table", []):
+            name = row[0]
+            if name not in floater_names:
+                table.append([name, team] + row[1:])
+                continue
+            for d, cell in enumerate(row[1:]):
+                if cell not in ("Off", "") and floater_cells[name][d] in (None, "Off"):
+                    floater_cells[name][d] = cell if team == home_team[name] or cell in ("Holiday", "Day Off") \
+                        else f"{cell} ({team})"
+                elif floater_cells[name][d] is None:
+                    floater_cells[name][d] = cell
+        for totals, key in ((shift_totals, "shift_totals"), (evening_totals, "evening_totals")):
+            for name, value in result.get(key, {}).items():
+                totals[name] = totals.get(name, 0) + value
+        for name, weeks in result.get("weekly_totals", {}).items():
+            previous = weekly_totals.get(name, [0] * len(weeks))
+            weekly_totals[name] = [a + b for a, b in zip(previous, weeks)]
+        assignments += [{**a, "team": team} for a in result.get("assignments", [])]
+
+    for emp in floaters:
+        name = emp["name"]
+        if any(cell is not None for cell in floater_cells[name]):
+            table.append([name, "Floater"] + [cell or "Off" for cell in floater_cells[name]])
+            shift_totals.setdefault(name, 0)
+            evening_totals.setdefault(name, 0)
+
+    stats = [result.get("solver_stats") or {} for result in team_results.values()]
+    objectives = [s.get("objective") for s in stats]
+    gaps = [s.get("gap") for s in stats if s.get("gap") is not None]
+    solved = sum(1 for s in statuses if s in ("optimal", "feasible"))
+    if status in ("optimal", "feasible"):
+        message = f"Rota successfully generated for {len(team_results)} teams! Solution status: {status}"
+    else:
+        failed = [f"{team}: {result['message']}" for team, result in team_results.items()
+                  if result["status"] not in ("optimal", "feasible")]
+        message = f"Rotas found for {solved} of {len(team_results)} teams. " + " ".join(failed)
+
+    merged = {
+        "status": status,
+        "message": message,
+        "mode": "by_team",
+        "table": table,
+        "headers": ["Employee", "Team"] + days,
+        "shift_totals": shift_totals,
+        "evening_totals": evening_totals,
+        "weekly_totals": weekly_totals,
+        "template": first.get("template"),
+        "calendar": calendar,
+        "assignments": assignments,
+        "floater_allocation": [
+            {"employee": name, "day": d, "date": calendar[d]["date"] if calendar else None, "team": team}
+            for name, by_day in allocation.items()
+            for d, team in sorted(by_day.items())
+        ],
+        "solver_stats": {
+            "profile": (stats[0] or {}).get("profile"),
+            "status": status,
+            # Teams solve in parallel, so the slowest one sets the pace
+            "wall_time": max((s.get("wall_time") or 0.0) for s in stats),
+            "objective": sum(objectives) if None not in objectives else None,
+            "best_bound": None,
+            "gap": max(gaps) if gaps else None,
+            "master": master,
+        },
+        "teams": {
+            team: {
+                key: result[key]
+                for key in ("status", "message", "conflicts", "solver_stats", "telemetry", "changed_shifts", "fairness")
+                if key in result
+            }
+            for team, result in team_results.items()
+        },
+    }
+    changes = [result["changed_shifts"] for result in team_results.values() if "changed_shifts" in result]
+    if changes:
+        merged["changed_shifts"] = sum(changes)
+    return merged
+
+
+def solve_by_team(queue, employees_data, **solve_options):
+    """
+    Solve one rota per team in parallel and merge them
+
+    Runs as a coordinating job (see SolveJobQueue.submit_coordinated):
+    floaters are first allocated to teams by the master model (see
+    master_model.allocate_floaters), which runs on a solver worker, then
+    every team's subproblem goes through the queue like any other solve,
+    so teams share the workers and the result cache. When the queue is
+    full, this waits for one of its own solves to finish before submitting
+    more.
+    """
+    teams, floaters = split_teams(employees_data)
+    horizon = solve_options.get("horizon")
+    template = solve_options.get("template")
+    master = None
+    allocation = {emp["name"]: {} for emp in floaters}
+    evening_shares = {}
+    if floaters:
+        master = queue.call("allocate_floaters", teams, floaters, horizon, template)
+        allocation = master.pop("allocation")
+        evening_shares = master.pop("evening_shares")
+
+    day_shifts = prepare_problem([], horizon, template)["day_shifts"]
+    previous = solve_options.get("previous")
+    fairness = solve_options.get("fairness")
+    pending = {}
+    remaining = []
+    for team, members in teams.items():
+        employees = team_employees(team, members, floaters, allocation, day_shifts, evening_shares)
+        options = dict(solve_options)
+        names = {emp["name"] for emp in employees}
+        if previous:
+            options["previous"] = {
+                **previous,
+                "assignments": [a for a in previous["assignments"] if a["employee"] in names],
+            }
+        if fairness:
+            # Only this team's history, so other teams' changes don't miss the cache
+            options["fairness"] = {
+                **fairness,
+                "history": {name: h for name, h in fairness.get("history", {}).items() if name in names},
+            }
+        remaining.append((team, employees, options))
+
+    results = {}
+    while remaining or pending:
+        while remaining:
+            team, employees, options = remaining[0]
+            try:
+                job = queue.submit(employees, **options)
+            except QueueFullError:
+                if not pending:
+                    raise
+                break
+            pending[job["future"]] = team
+            remaining.pop(0)
+
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+
+    # Report teams in the order they were listed
+    return merge_results({team: results[team] for team in teams}, floaters, allocation, master)
@@ -0,0 +1,219 @@
+import logging
+import random
+import threading
+import time
+
+from ortools.sat.python import cp_model
+
+logger = logging.getLogger(__name__)
+
+# CP-SAT seeds are 32-bit signed integers
+MAX_SEED = 2**31
+
+# CP-SAT parameter sets raced against each other, in the order runs take
+# them. A run with one worker follows its strategy exactly; with more,
+# CP-SAT adds its own helper subsolvers around it.
+SEARCH_STRATEGIES = {
+    "default": {},
+    "core": {"optimize_with_core": True},
+    "quick_restart": {"search_branching": cp_model.PORTFOLIO_WITH_QUICK_RESTART_SEARCH},
+    "lp": {"linearization_level": 2},
+}
+
+# Statuses that settle the race: no other run can do better
+PROVEN = (cp_model.OPTIMAL, cp_model.INFEASIBLE, cp_model.MODEL_INVALID)
+
+
+def portfolio_runs(solver_options):
+    """
+    The (strategy, seed) of every run a solve makes
+
+    Runs take SEARCH_STRATEGIES in turn and consecutive seeds from
+    solver_options["random_seed"], or from a random one when it is None,
+    wrapping round to 0 after the largest seed CP-SAT accepts.
+    """
+    seed = solver_options.get("random_seed")
+    if seed is None:
+        seed = random.randint(1, 10000)
+    strategies = list(SEARCH_STRATEGIES)
+    return [
+        (strategies[i % len(strategies)], (seed + i) % MAX_SEED)
+        for i in range(solver_options.get("portfolio_runs", 1))
+    ]
+
+
+class RaceCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback for one run of a PortfolioRace
+
+    Ends the run at its next solution once the race is over, and passes
+    solutions that beat every run's best so far to on_improving_solution.
+    """
+
+    def __init__(self, race):
+        super().__init__()
+        self.race = race
+
+    def on_solution_callback(self):
+        if self.race.cancelled:
+            self.StopSearch()
+            return
+        solutions = self.race.improved(self.ObjectiveValue())
+        if solutions:
+            self.on_improving_solution(solutions)
+
+    def on_improving_solution(self, solutions):
+        """Called with the number of improving solutions found so far"""
+
+
+class PortfolioRace:
+    """
+    Solves one model with several seeds and search strategies at once
+
+    Each run has its own CpSolver on its own thread (CP-SAT releases the
+    GIL while it searches), with the solver_options workers shared out
+    between them and one deadline for all. The first run to prove its
+    answer (optimal, or infeasible) wins and stops the others; otherwise
+    the run with the best objective when the deadline hits does. With a
+    single run this is one ordinary solve. A run that raises is logged and
+    left out of the race; the race fails only if every run does.
+    """
+
+    def __init__(self, solver_options):
+        self.solver_options = solver_options
+        self.runs = [{"strategy": strategy, "seed": seed} for strategy, seed in portfolio_runs(solver_options)]
+        self.cancelled = False
+        self.winner = None
+        self._solvers = []
+        self._finished = []
+        self._best = None
+        self._solutions = 0
+        self._lock = threading.Lock()
+
+    def improved(self, objective):
+        """
+        Record a solution found by any run
+
+        Returns:
+            The number of improving solutions so far, or 0 if another run
+            had already found one at least as good
+        """
+        with self._lock:
+            if self._best is not None and objective >= self._best:
+                return 0
+            self._best = objective
+            self._solutions += 1
+            return self._solutions
+
+    def cancel(self):
+        """Stop every run; each returns the best solution it has"""
+        with self._lock:
+            self.cancelled = True
+            solvers = list(self._solvers)
+        for solver in solvers:
+            solver.StopSearch()
+
+    def _make_solver(self, run, num_workers):
+        solver = cp_model.CpSolver()
+        solver.parameters.random_seed = run["seed"]
+        solver.parameters.num_workers = num_workers
+        solver.parameters.relative_gap_limit = self.solver_options["relative_gap_limit"]
+        for name, value in SEARCH_STRATEGIES[run["strategy"]].items():
+            setattr(solver.parameters, name, value)
+        return solver
+
+    def _run(self, i, *args):
+        try:
+            self._solve_run(i, *args)
+        except Exception as e:
+            logger.exception("Portfolio run %d (%s, seed %s) failed", i, self.runs[i]["strategy"], self.runs[i]["seed"])
+            self.runs[i]["status"] = "ERROR"
+            self.runs[i]["error"] = str(e)
+
+    def _solve_run(self, i, model, deadline, num_workers, monitor, make_callback):
+        run = self.runs[i]
+        solver = self._make_solver(run, num_workers)
+        with self._lock:
+            if self.cancelled:
+                run["status"] = "CANCELLED"
+                return
+            self._solvers.append(solver)
+        if monitor:
+            monitor.attach(solver)
+        callback = make_callback(self) if make_callback else None
+        if callback is None and len(self.runs) > 1:
+            callback = RaceCallback(self)
+
+        solver.parameters.max_time_in_seconds = max(0.0, deadline - time.perf_counter())
+        status = solver.Solve(model, callback) if callback else solver.Solve(model)
+        run["solver"] = solver
+        run["code"] = status
+        run["status"] = solver.StatusName(status)
+        run["wall_time"] = solver.WallTime()
+        run["objective"] = solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+        with self._lock:
+            self._finished.append(i)
+        if status in PROVEN and len(self.runs) > 1:
+            self.cancel()
+
+    def _winner(self):
+        for i in self._finished:
+            if self.runs[i]["code"] in PROVEN:
+                return i
+        # Nothing proven by the deadline: the best rota any run found
+        found = [i for i in self._finished if self.runs[i]["objective"] is not None]
+        if found:
+            return min(found, key=lambda i: self.runs[i]["objective"])
+        if self._finished:
+            return self._finished[0]
+        errors = "; ".join(run["error"] for run in self.runs if "error" in run)
+        raise RuntimeError(f"Every solver run failed: {errors}")
+
+    def solve(self, model, monitor=None, make_callback=None):
+        """
+        Race the runs and return the winner's solver
+
+        Args:
+            model: CpModel to solve; every run reads the same one
+            monitor: Optional SolveMonitor; stopping it stops every run
+            make_callback: Optional callable given this race and returning
+                a RaceCallback for one run
+
+        Returns:
+            (solver, status) of the winning run; its strategy and seed are
+            in report()
+
+        Raises:
+            RuntimeError: if no run finished
+        """
+        deadline = time.perf_counter() + self.solver_options["max_time_in_seconds"]
+        num_workers = max(1, self.solver_options["num_workers"] // len(self.runs))
+        args = (model, deadline, num_workers, monitor, make_callback)
+        if len(self.runs) == 1:
+            self._run(0, *args)
+        else:
+            threads = [
+                threading.Thread(target=self._run, args=(i, *args), name=f"rota-portfolio-{i}", daemon=True)
+                for i in range(len(self.runs))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.winner = self._winner()
+        run = self.runs[self.winner]
+        return run["solver"], run["code"]
+
+    def report(self):
+        """
+        The winning strategy and seed, plus every run's outcome when there
+        was more than one, for solver_stats
+        """
+        winner = self.runs[self.winner]
+        report = {"strategy": winner["strategy"], "random_seed": winner["seed"]}
+        if len(self.runs) > 1:
+            report["portfolio"] = [
+                {key: run.get(key) for key in ("strategy", "seed", "status", "objective", "wall_time")}
+                for run in self.runs
+            ]
+        return report
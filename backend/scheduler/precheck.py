@@ -0,0 +1,209 @@
+import numpy as np
+
+
+def _conflict(constraint, description, employee=None, day=None, shift=None):
+    return {
+        "employee": employee,
+        "constraint": constraint,
+        "day": day,
+        "shift": shift,
+        "description": description,
+    }
+
+
+def build_matrices(problem):
+    """
+    Lay a prepared problem out as employee × day × shift arrays
+
+    Shift axes are padded to the longest day; `exists` marks real shifts.
+
+    Returns:
+        Dictionary of numpy arrays: exists, min_staff, max_staff,
+        min_supervisors, evening (day × shift); blocked and must
+        (employee × day × shift); holiday (employee × day)
+    """
+    day_shifts = problem["day_shifts"]
+    num_employees = len(problem["employees"])
+    num_days = len(day_shifts)
+    num_shifts = max(len(shifts) for shifts in day_shifts)
+
+    exists = np.zeros((num_days, num_shifts), dtype=bool)
+    min_staff = np.zeros((num_days, num_shifts), dtype=np.int64)
+    max_staff = np.zeros((num_days, num_shifts), dtype=np.int64)
+    min_supervisors = np.zeros((num_days, num_shifts), dtype=np.int64)
+    evening = np.zeros((num_days, num_shifts), dtype=bool)
+    for d, shifts in enumerate(day_shifts):
+        for s, shift in enumerate(shifts):
+            exists[d, s] = True
+            min_staff[d, s] = shift["min_staff"]
+            max_staff[d, s] = shift["max_staff"]
+            min_supervisors[d, s] = shift["min_supervisors"]
+            evening[d, s] = shift["evening"]
+
+    holiday = np.zeros((num_employees, num_days), dtype=bool)
+    day_off = np.zeros((num_employees, num_days), dtype=bool)
+    unavailable = np.zeros((num_employees, num_days, num_shifts), dtype=bool)
+    must = np.zeros((num_employees, num_days, num_shifts), dtype=bool)
+    for e, holiday_days in problem["holidays"].items():
+        holiday[e, list(holiday_days)] = True
+    for e, off_days in problem["days_off"].items():
+        day_off[e, list(off_days)] = True
+    for e, slots in problem["unavailable_shifts"].items():
+        for d, s in slots:
+            if s < num_shifts:
+                unavailable[e, d, s] = True
+    for e, slots in problem["must_work_shifts"].items():
+        for d, s in slots:
+            if s < num_shifts:
+                must[e, d, s] = True
+
+    blocked = unavailable | (holiday | day_off)[:, :, None] | ~exists[None, :, :]
+    return {
+        "exists": exists,
+        "min_staff": min_staff,
+        "max_staff": max_staff,
+        "min_supervisors": min_supervisors,
+        "evening": evening,
+        "holiday": holiday,
+        "blocked": blocked,
+        "must": must,
+    }
+
+
+def precheck_problem(problem):
+    """
+    Cheap necessary conditions for a rota to exist
+
+    Every check is a counting argument over the employee × day × shift
+    availability matrix, so it runs in milliseconds and never rejects a
+    config the solver could satisfy. Passing does not guarantee the solver
+    will find a rota.
+
+    Args:
+        problem: Output of problem.prepare_problem
+
+    Returns:
+        List of conflicts in the same shape the solver reports them;
+        empty if every check passes
+    """
+    conflicts = []
+    employees = problem["employees"]
+    days = problem["days"]
+    day_shifts = problem["day_shifts"]
+    weeks = problem["weeks"]
+
+    # Must-work shifts that do not exist on that day
+    for e, slots in problem["must_work_shifts"].items():
+        for d, s in slots:
+            if s >= len(day_shifts[d]):
+                conflicts.append(_conflict(
+                    "must_work_shifts", f"{employees[e]} must work shift {s} on {days[d]}, which does not exist",
+                    employees[e], days[d],
+                ))
+    if conflicts:
+        return conflicts
+
+    m = build_matrices(problem)
+    available = ~m["blocked"]
+    must = m["must"]
+    supervisor = np.array(problem["is_supervisor"], dtype=bool)
+    floater = np.array(problem["floater"], dtype=bool)
+    max_shifts = np.array(problem["max_shifts"], dtype=np.int64)
+
+    def shift_name(d, s):
+        return day_shifts[d][s]["name"]
+
+    # Must-work shifts on a day off, holiday or unavailable shift
+    for e, d, s in zip(*np.nonzero(must & m["blocked"])):
+        conflicts.append(_conflict(
+            "must_work_shifts",
+            f"{employees[e]} must work {days[d]} {shift_name(d, s)} but is not available then",
+            employees[e], days[d], shift_name(d, s),
+        ))
+
+    # More than one must-work shift on the same day
+    for e, d in zip(*np.nonzero(must.sum(axis=2) > 1)):
+        conflicts.append(_conflict(
+            "must_work_shifts", f"{employees[e]} must work more than one shift on {days[d]}",
+            employees[e], days[d],
+        ))
+
+    # Per shift: enough available staff and supervisors, not too many must-works
+    staff_available = available.sum(axis=0)
+    supervisors_available = available[supervisor].sum(axis=0)
+    must_count = must.sum(axis=0)
+    for d, s in zip(*np.nonzero(m["exists"] & (staff_available < m["min_staff"]))):
+        conflicts.append(_conflict(
+            "coverage",
+            f"{days[d]} {shift_name(d, s)} needs {m['min_staff'][d, s]} staff but only {staff_available[d, s]} are available",
+            day=days[d], shift=shift_name(d, s),
+        ))
+    for d, s in zip(*np.nonzero(m["exists"] & (supervisors_available < m["min_supervisors"]))):
+        conflicts.append(_conflict(
+            "coverage",
+            f"{days[d]} {shift_name(d, s)} needs {m['min_supervisors'][d, s]} supervisor(s) but only {supervisors_available[d, s]} are available",
+            day=days[d], shift=shift_name(d, s),
+        ))
+    for d, s in zip(*np.nonzero(must_count > m["max_staff"])):
+        conflicts.append(_conflict(
+            "must_work_shifts",
+            f"{must_count[d, s]} staff must work {days[d]} {shift_name(d, s)} but it takes at most {m['max_staff'][d, s]}",
+            day=days[d], shift=shift_name(d, s),
+        ))
+
+    # Per day: each person works at most one shift a day
+    people_available = available.any(axis=2).sum(axis=0)
+    people_needed = m["min_staff"].sum(axis=1)
+    for d in np.nonzero(people_available < people_needed)[0]:
+        conflicts.append(_conflict(
+            "coverage",
+            f"{days[d]} needs {people_needed[d]} staff across its shifts but only {people_available[d]} are available",
+            day=days[d],
+        ))
+    supervisors_on_day = available[supervisor].any(axis=2).sum(axis=0)
+    supervisors_needed = m["min_supervisors"].sum(axis=1)
+    for d in np.nonzero(supervisors_on_day < supervisors_needed)[0]:
+        conflicts.append(_conflict(
+            "coverage",
+            f"{days[d]} needs {supervisors_needed[d]} supervisor shifts but only {supervisors_on_day[d]} supervisors are available",
+            day=days[d],
+        ))
+
+    # Per week: must-work shifts within the weekly cap, and enough capacity overall
+    available_days = available.any(axis=2)
+    for w, week in enumerate(weeks):
+        holidays_in_week = m["holiday"][:, week].sum(axis=1)
+        allowance = max_shifts - holidays_in_week
+        must_in_week = must[:, week].sum(axis=(1, 2))
+        for e in np.nonzero(must_in_week > allowance)[0]:
+            conflicts.append(_conflict(
+                "max_shifts",
+                f"{employees[e]} must work {must_in_week[e]} shifts in week {w + 1} but can work at most {max(allowance[e], 0)}",
+                employees[e],
+            ))
+
+        capacity = np.minimum(np.maximum(allowance, 0), available_days[:, week].sum(axis=1))
+        needed = m["min_staff"][week].sum()
+        if capacity.sum() < needed:
+            conflicts.append(_conflict(
+                "coverage",
+                f"Week {w + 1} needs {needed} shifts covered but staff can work at most {capacity.sum()}",
+            ))
+        supervisors_needed = m["min_supervisors"][week].sum()
+        if capacity[supervisor].sum() < supervisors_needed:
+            conflicts.append(_conflict(
+                "coverage",
+                f"Week {w + 1} needs {supervisors_needed} supervisor shifts but supervisors can work at most {capacity[supervisor].sum()}",
+            ))
+
+        # Supervisors need at least one evening in every full week (floaters excepted)
+        if len(week) == 7:
+            evening_available = (available[:, week] & m["evening"][week][None, :, :]).any(axis=(1, 2))
+            for e in np.nonzero(supervisor & ~floater & ~evening_available)[0]:
+                conflicts.append(_conflict(
+                    "supervisor_rules",
+                    f"{employees[e]} must work an evening in week {w + 1} as a supervisor but has no evening available",
+                    employees[e],
+                ))
+
+    return conflicts
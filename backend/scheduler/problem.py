@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+
+from .shift_templates import DAY_NAMES
+
+# Nothing here imports OR-Tools: the web tier prepares problems too, and
+# only solver worker processes should pay for that import.
+
+# Most evening shifts a supervisor works in one week, across all teams
+MAX_SUPERVISOR_EVENINGS = 3
+
+
+def build_calendar(horizon):
+    """
+    List the days covered by a resolved horizon
+    
+    Without a start date day 0 is a Monday and weeks are consecutive blocks
+    of 7 days, which matches the original single-week rota. With a start
+    date, weeks are calendar weeks starting on Monday, so the first and last
+    weeks may be partial.
+    
+    Returns:
+        List of dicts with index, weekday (0 = Mon), week, date (ISO string
+        or None) and a column label
+    """
+    start = date.fromisoformat(horizon["start_date"]) if horizon["start_date"] else None
+    calendar = []
+    week = 0
+    for i in range(horizon["days"]):
+        if start is None:
+            weekday = i % 7
+            week = i // 7
+            day_date = None
+            label = DAY_NAMES[weekday] if horizon["days"] <= 7 else f"{DAY_NAMES[weekday]} (wk {week + 1})"
+        else:
+            current = start + timedelta(days=i)
+            weekday = current.weekday()
+            if i > 0 and weekday == 0:
+                week += 1
+            day_date = current.isoformat()
+            label = f"{DAY_NAMES[weekday]} {current.day} {current.strftime('%b')}"
+        calendar.append({"day": i, "weekday": weekday, "week": week, "date": day_date, "label": label})
+    return calendar
+
+
+def _horizon_day(value, calendar, date_index):
+    """Map a day reference (horizon index or ISO date) to a horizon index, or None if outside it"""
+    try:
+        day = int(value)
+    except ValueError:
+        return date_index.get(date.fromisoformat(value).isoformat())
+    return day if 0 <= day < len(calendar) else None
+
+
+def prepare_problem(employees_data, horizon, template):
+    """
+    Resolve a request into the indexed data the model is built from
+    
+    Args:
+        employees_data: List of employee dictionaries with configuration
+        horizon: Planning horizon from resolve_horizon
+        template: Compiled shift template
+        
+    Returns:
+        Dictionary with the calendar, day labels, weeks (lists of day
+        indices), each day's shifts, and per-employee names, supervisor
+        flags, shift caps and constraints keyed by employee index
+    """
+    # Days and shifts configuration
+    calendar = build_calendar(horizon)
+    days = [day["label"] for day in calendar]
+    weekdays = [day["weekday"] for day in calendar]
+    date_index = {day["date"]: day["day"] for day in calendar if day["date"]}
+    weeks = {}
+    for day in calendar:
+        weeks.setdefault(day["week"], []).append(day["day"])
+    
+    def in_horizon(day_refs):
+        days_in = (_horizon_day(d, calendar, date_index) for d in day_refs)
+        return {d for d in days_in if d is not None}
+    
+    def slots_in_horizon(slots):
+        return [
+            (d, int(s))
+            for d, s in ((_horizon_day(d, calendar, date_index), s) for d, s in slots)
+            if d is not None
+        ]
+    
+    # Process constraints. days_off are weekdays (0 = Mon) and repeat every
+    # week; holidays and shift slots refer to horizon days or ISO dates.
+    days_off = {}
+    for i, emp in enumerate(employees_data):
+        weekdays_off = {int(w) for w in emp.get("days_off", [])}
+        days_off[i] = {d for d in range(len(days)) if weekdays[d] in weekdays_off}
+    
+    return {
+        "calendar": calendar,
+        "days": days,
+        "weekdays": weekdays,
+        "weeks": list(weeks.values()),
+        # Coverage table for each horizon day, from the weekday's shift template
+        "day_shifts": [template["days"][weekday] for weekday in weekdays],
+        "max_consecutive_days": horizon["max_consecutive_days"],
+        "employees": [emp["name"] for emp in employees_data],
+        "is_supervisor": [bool(emp["is_supervisor"]) for emp in employees_data],
+        # Floaters split their week between sites, so the weekly supervisor
+        # minimums are not applied to them in any one site's rota
+        "floater": [bool(emp.get("floater", False)) for emp in employees_data],
+        # Weekly evening caps; a floater's share of MAX_SUPERVISOR_EVENINGS
+        # comes from the master model (see master_model.allocate_floaters)
+        "max_evenings": [
+            [int(n) for n in emp["max_evenings"]] if emp.get("max_evenings") is not None
+            else [MAX_SUPERVISOR_EVENINGS] * len(weeks)
+            for emp in employees_data
+        ],
+        # Convert max_shifts to int (handle both string and int input).
+        # max_shifts is a weekly cap; max_shifts_horizon optionally caps the whole horizon.
+        "max_shifts": [int(emp["max_shifts"]) for emp in employees_data],
+        "max_shifts_horizon": [
+            int(emp["max_shifts_horizon"]) if emp.get("max_shifts_horizon") not in (None, "") else None
+            for emp in employees_data
+        ],
+        "days_off": days_off,
+        "holidays": {
+            i: in_horizon(emp["holidays"])
+            for i, emp in enumerate(employees_data)
+            if emp.get("holidays")
+        },
+        "unavailable_shifts": {
+            i: slots_in_horizon(emp["unavailable_shifts"])
+            for i, emp in enumerate(employees_data)
+            if emp.get("unavailable_shifts")
+        },
+        "must_work_shifts": {
+            i: slots_in_horizon(emp["must_work_shifts"])
+            for i, emp in enumerate(employees_data)
+            if emp.get("must_work_shifts")
+        },
+    }
+
+
+def floater_teams(emp, team_names):
+    """The teams a floater may be placed at, home team first"""
+    teams = [str(emp["team"])] if emp.get("team") else []
+    teams += [str(t) for t in emp.get("float_teams", []) if str(t) not in teams]
+    return [t for t in teams if t in team_names]
+
+
+def employee_classes(problem, extra_keys=None):
+    """
+    Group employees the model cannot tell apart
+
+    Employees are interchangeable when they share the supervisor and
+    floater flags, shift caps and every personal constraint, and
+    `extra_keys` agree; swapping two of them turns any rota into another
+    rota that is just as good, which the search would otherwise explore.
+
+    Args:
+        problem: Output of prepare_problem
+        extra_keys: Optional per-employee values that must also match,
+            e.g. fairness history or previous assignments
+
+    Returns:
+        Lists of employee indices, in order, for each group of two or more
+    """
+    groups = {}
+    for e in range(len(problem["employees"])):
+        key = (
+            problem["is_supervisor"][e],
+            problem["floater"][e],
+            problem["max_shifts"][e],
+            problem["max_shifts_horizon"][e],
+            tuple(problem["max_evenings"][e]),
+            frozenset(problem["days_off"].get(e, ())),
+            frozenset(problem["holidays"].get(e, ())),
+            frozenset(problem["unavailable_shifts"].get(e, ())),
+            frozenset(problem["must_work_shifts"].get(e, ())),
+            extra_keys[e] if extra_keys is not None else None,
+        )
+        groups.setdefault(key, []).append(e)
+    return [members for members in groups.values() if len(members) > 1]
@@ -1,212 +1,763 @@
-import json
-import random
+import threading
+import time
+import numpy as np
 from ortools.sat.python import cp_model
-from tabulate import tabulate
+from ortools.sat.python.cp_model import LinearExpr
+from .shift_templates import DAY_NAMES, get_shift_template
+from .portfolio import PortfolioRace, RaceCallback
+from .precheck import build_matrices, precheck_problem
+from .problem import employee_classes, prepare_problem
+from .solver_options import FAIRNESS_METRICS, resolve_horizon, resolve_solver_options
+from .telemetry import PhaseClock, model_statistics, profile_call, search_statistics
 
 
-def solve_rota(employees_data):
+def set_assumption_domains(model, assumptions, fixed):
+    """
+    Fix assumption literals to true, or free them again for diagnosis
+    
+    Solving with the literals as real assumptions stops presolve from
+    simplifying the guarded constraints, which makes multi-week models far
+    slower to optimise. The normal solve therefore fixes them, and they are
+    only freed once the model is known to be infeasible.
+    """
+    for lit, _ in assumptions:
+        model.Proto().variables[lit.Index()].domain[:] = [1, 1] if fixed else [0, 1]
+
+
+def _probe_feasibility(model, literals, deadline):
+    """Solve model under the given assumption literals, returning (status, core indices)"""
+    model.ClearAssumptions()
+    model.AddAssumptions(literals)
+    probe = cp_model.CpSolver()
+    probe.parameters.num_workers = 1
+    # Rota infeasibility is mostly a counting argument, which the full
+    # linear relaxation proves in milliseconds
+    probe.parameters.linearization_level = 2
+    probe.parameters.max_time_in_seconds = max(0.01, deadline - time.monotonic())
+    status = probe.Solve(model)
+    core = set(probe.SufficientAssumptionsForInfeasibility()) if status == cp_model.INFEASIBLE else set()
+    return status, core
+
+
+# Diagnosis gets at least this long, even when the solve used its whole time
+# limit to prove infeasibility. Most conflicts are found in milliseconds.
+# It can take a synchronous request this far past its solver time limit,
+# which ROTA_SYNC_TIMEOUT_SECONDS leaves room for.
+MIN_DIAGNOSIS_SECONDS = 2.0
+
+
+def find_conflicting_constraints(model, assumptions, time_limit, symmetry_literal=None):
+    """
+    Find a minimal set of user constraints that make the model infeasible
+    
+    One probe under every assumption gives CP-SAT's sufficient assumptions.
+    Those are not always minimal, so each literal in the core is then
+    dropped in turn and kept only if the model becomes feasible without it.
+    Every probe is a quick single-threaded feasibility solve on the same
+    model; probes that hit the time limit keep the literal.
+    
+    Args:
+        model: The infeasible model; its objective and hints are cleared
+        assumptions: (literal, description) pairs guarding user constraints
+        time_limit: Seconds available for all probes together
+        symmetry_literal: Literal enforcing the symmetry-breaking
+            constraints, if any. They are switched off, since they are
+            only valid while every employee's constraints are in force.
+        
+    Returns:
+        (conflicts, complete): descriptions of the conflicting constraints,
+        and whether the search finished. conflicts is empty when the model
+        is infeasible even with every user constraint relaxed, or when the
+        time ran out before the first probe proved it infeasible at all
+        (complete is then False). If the time ran out while shrinking the
+        core, conflicts still conflict but may not be minimal.
+    """
+    model.ClearObjective()
+    model.ClearHints()
+    set_assumption_domains(model, assumptions, fixed=False)
+    if symmetry_literal is not None:
+        model.Proto().variables[symmetry_literal.Index()].domain[:] = [0, 0]
+    deadline = time.monotonic() + time_limit
+    
+    status, sufficient = _probe_feasibility(model, [lit for lit, _ in assumptions], deadline)
+    if status != cp_model.INFEASIBLE:
+        # Out of time: every constraint is a suspect, which tells the user nothing
+        return [], False
+    core = [item for item in assumptions if item[0].Index() in sufficient]
+    
+    complete = True
+    i = 0
+    while i < len(core):
+        if time.monotonic() >= deadline:
+            complete = False
+            break
+        candidate = core[:i] + core[i + 1:]
+        status, smaller = _probe_feasibility(model, [lit for lit, _ in candidate], deadline)
+        if status == cp_model.INFEASIBLE:
+            # Still infeasible without it; the probe's own core may be smaller
+            core = [item for item in candidate if item[0].Index() in smaller]
+        else:
+            # Needed, unless the probe only ran out of time
+            complete = complete and status != cp_model.UNKNOWN
+            i += 1
+    
+    return [description for _, description in core], complete
+
+
+def add_lex_order(model, first, second, enforce):
+    """
+    Require `first` to be lexicographically at least `second` while `enforce` holds
+
+    Both are equal-length lists of Boolean variables. Each position gets a
+    literal that is true while the prefixes so far are equal; while it is,
+    second may only work a shift first also works.
+    """
+    equal = enforce
+    for i, (a, b) in enumerate(zip(first, second)):
+        model.AddImplication(b, a).OnlyEnforceIf(equal)
+        if i == len(first) - 1:
+            break
+        following = model.NewBoolVar('')
+        # Equal at this position: both on or both off
+        model.AddBoolOr([equal.Not(), a, b, following])
+        model.AddBoolOr([equal.Not(), a.Not(), b.Not(), following])
+        equal = following
+
+
+def period_vars(var_days, e, d_range):
+    """One employee's variables from x or evenings (employee × day lists) over a range of days"""
+    return [var for d in d_range for var in var_days[e][d]]
+
+
+def build_model(problem, matrices=None):
+    """
+    Build the CP-SAT model of a prepared problem's rules
+    
+    Shift variables live in x[e][d] lists, one per existing shift, and
+    sums go through LinearExpr rather than Python's sum(). Blocked days
+    are one BoolAnd per day and a day's shifts one AddAtMostOne. This
+    builds the same model as legacy_model.build_legacy_model, which used
+    a dict per (employee, day, shift) and sum() chains, with about 6%
+    fewer constraints and about 1.25x faster: 0.28s -> 0.22s for 200
+    employees over 28 days (`benchmark_rota --suite full
+    --compare-builders --repeat 5`). The "~2x" first reported was timed
+    with the garbage collector running. Most of what remains is the
+    cp_model wrapper's own cost per variable and constraint; the larger
+    saving is in reading solutions back through `index`.
+    
+    Args:
+        problem: Output of prepare_problem
+        matrices: build_matrices(problem), if the caller already has it
+    
+    Returns:
+        Dictionary with the model; x; index, the position of each x
+        variable in the solution vector laid out like the precheck
+        matrices (employee × day × shift, -1 where no shift exists), so a
+        solution is read back in one pass; evenings, the evening-shift
+        subset of x; assumptions, (literal, description) pairs guarding
+        every employee rule (see find_conflicting_constraints); and
+        max_evening_shifts, the most evenings any supervisor works (None
+        without supervisors), for the objective
+    
+    Raises:
+        ValueError: if a must-work shift does not exist
+    """
+    days = problem["days"]
+    weeks = problem["weeks"]
+    day_shifts = problem["day_shifts"]
+    employees = problem["employees"]
+    is_supervisor = problem["is_supervisor"]
+    floater = problem["floater"]
+    max_evenings = problem["max_evenings"]
+    max_shifts_per_employee = problem["max_shifts"]
+    max_shifts_horizon = problem["max_shifts_horizon"]
+    days_off = problem["days_off"]
+    holidays = problem["holidays"]
+    unavailable_shifts = problem["unavailable_shifts"]
+    must_work_shifts = problem["must_work_shifts"]
+    if matrices is None:
+        matrices = build_matrices(problem)
+    exists = matrices["exists"]
+    
+    # Initialize the model
+    model = cp_model.CpModel()
+    num_employees = len(employees)
+    num_days = len(days)
+    
+    # Create decision variables (only for shifts that exist on each day).
+    # x[e][d] lists an employee's shift variables for one day; `index`
+    # lays their positions in the solution vector out like the precheck
+    # matrices (employee × day × shift, -1 where no shift exists), so
+    # a solution is read back in one pass.
+    x = [
+        [[model.NewBoolVar(f'emp{e}_day{d}_shift{s}') for s in range(len(day_shifts[d]))] for d in range(num_days)]
+        for e in range(num_employees)
+    ]
+    index = np.full((num_employees,) + exists.shape, -1, dtype=np.int64)
+    for e in range(num_employees):
+        for d in range(num_days):
+            index[e, d, :len(x[e][d])] = [var.Index() for var in x[e][d]]
+    
+    # Index sets used by several constraints, computed once
+    supervisors = [e for e in range(num_employees) if is_supervisor[e]]
+    evening_slots = [[s for s, shift in enumerate(day_shifts[d]) if shift["evening"]] for d in range(num_days)]
+    evenings = [[[x[e][d][s] for s in evening_slots[d]] for d in range(num_days)] for e in range(num_employees)]
+    
+    def check_slot(e, d, s):
+        if not 0 <= s < len(day_shifts[d]):
+            raise ValueError(f"{employees[e]} refers to shift {s} on {days[d]}, which does not exist")
+    
+    # Constraint 1: Each shift needs between min_staff and max_staff people
+    for d in range(num_days):
+        for s, shift in enumerate(day_shifts[d]):
+            staff = LinearExpr.Sum([x[e][d][s] for e in range(num_employees)])
+            model.AddLinearConstraint(staff, shift["min_staff"], shift["max_staff"])
+    
+    # Every user-supplied constraint is enforced by an assumption literal,
+    # so an infeasible model can report which of them conflict
+    assumptions = []
+    
+    def guard(e, constraint, description, d=None, s=None):
+        lit = model.NewBoolVar(f'assume_{constraint}_emp{e}_{len(assumptions)}')
+        assumptions.append((lit, {
+            "employee": employees[e],
+            "constraint": constraint,
+            "day": days[d] if d is not None else None,
+            "shift": day_shifts[d][s]["name"] if s is not None else None,
+            "description": f"{employees[e]} {description}",
+        }))
+        return lit
+    
+    # Constraint 2: Max shifts per employee per week (RELAXED for part-time supervisors).
+    # Holidays use up allowance in the week they fall in.
+    for e in range(num_employees):
+        employee_holidays = holidays.get(e, set())
+        max_lit = guard(e, "max_shifts", f"can work at most {max_shifts_per_employee[e]} shifts a week")
+        min_lit = None
+        if is_supervisor[e] and not floater[e]:
+            min_lit = guard(e, "supervisor_rules", "must work at least 1 shift a week as a supervisor")
+        for week in weeks:
+            actual_shifts = LinearExpr.Sum(period_vars(x, e, week))
+            holiday_count = sum(1 for d in week if d in employee_holidays)
+    
+            # Everyone works UP TO their max_shifts
+            model.Add(actual_shifts + holiday_count <= max_shifts_per_employee[e]).OnlyEnforceIf(max_lit)
+            if min_lit is not None and len(week) == 7:
+                # But supervisors work at least some minimum in every full week
+                model.Add(actual_shifts + holiday_count >= 1).OnlyEnforceIf(min_lit)  # At least 1 shift if they're working
+    
+        # Optional cap over the whole horizon
+        if max_shifts_horizon[e] is not None:
+            lit = guard(e, "max_shifts_horizon", f"can work at most {max_shifts_horizon[e]} shifts over the horizon")
+            total_shifts = LinearExpr.Sum(period_vars(x, e, range(num_days)))
+            model.Add(total_shifts + len(employee_holidays) <= max_shifts_horizon[e]).OnlyEnforceIf(lit)
+    
+    # Constraint 3: Max 1 shift per day per employee
+    for e in range(num_employees):
+        for d in range(num_days):
+            if len(x[e][d]) > 1:
+                model.AddAtMostOne(x[e][d])
+    
+    # Constraint 4: Respect days off
+    for e in range(num_employees):
+        for d in days_off[e]:
+            lit = guard(e, "days_off", f"has {days[d]} as a day off", d)
+            model.AddBoolAnd([var.Not() for var in x[e][d]]).OnlyEnforceIf(lit)
+    
+    # Constraint 5: Each shift needs its template's number of supervisors
+    for d in range(num_days):
+        for s, shift in enumerate(day_shifts[d]):
+            if shift["min_supervisors"]:
+                model.Add(LinearExpr.Sum([x[e][d][s] for e in supervisors]) >= shift["min_supervisors"])
+    
+    # Constraint 6: Unavailable shifts (ignored if the shift does not exist that day)
+    for e, restricted_slots in unavailable_shifts.items():
+        for d, s in restricted_slots:
+            if 0 <= s < len(day_shifts[d]):
+                lit = guard(e, "unavailable_shifts", f"is unavailable for {days[d]} {day_shifts[d][s]['name']}", d, s)
+                model.AddImplication(lit, x[e][d][s].Not())
+    
+    # Constraint 7: Enforce must-work shifts
+    for e, required_slots in must_work_shifts.items():
+        for d, s in required_slots:
+            check_slot(e, d, s)
+            lit = guard(e, "must_work_shifts", f"must work {days[d]} {day_shifts[d][s]['name']}", d, s)
+            model.AddImplication(lit, x[e][d][s])
+    
+    # Constraint 8: Block all holiday days
+    for e, holiday_days in holidays.items():
+        for d in holiday_days:
+            lit = guard(e, "holidays", f"is on holiday on {days[d]}", d)
+            model.AddBoolAnd([var.Not() for var in x[e][d]]).OnlyEnforceIf(lit)
+    
+    # Constraint 9: Supervisors should work at least 1 evening shift per full week (relaxed from exactly 2)
+    for e in supervisors:
+        if floater[e]:
+            lit = guard(e, "supervisor_rules",
+                        "can work at most this team's share of 3 evening shifts a week as a supervisor")
+        else:
+            lit = guard(e, "supervisor_rules", "must work 1 to 3 evening shifts a week as a supervisor")
+        for w, week in enumerate(weeks):
+            evening_shifts = LinearExpr.Sum(period_vars(evenings, e, week))
+            if len(week) == 7 and not floater[e]:
+                model.Add(evening_shifts >= 1).OnlyEnforceIf(lit)  # At least 1 evening shift per supervisor
+            model.Add(evening_shifts <= max_evenings[e][w]).OnlyEnforceIf(lit)  # But not more than 3 to keep it reasonable
+    
+    # Constraint 10: Limit consecutive working days. The window slides over
+    # the whole horizon, so it also holds across week boundaries.
+    max_consecutive = problem["max_consecutive_days"]
+    if max_consecutive is not None and max_consecutive < num_days:
+        for e in range(num_employees):
+            lit = guard(e, "max_consecutive_days", f"can work at most {max_consecutive} days in a row")
+            for first in range(num_days - max_consecutive):
+                window = range(first, first + max_consecutive + 1)
+                model.Add(LinearExpr.Sum(period_vars(x, e, window)) <= max_consecutive).OnlyEnforceIf(lit)
+    
+    # Trying to balance evening shifts among supervisors over the whole
+    # horizon, so fairness carries over from one week to the next
+    max_evening_shifts = None
+    if supervisors:
+        max_evening_shifts = model.NewIntVar(0, num_days, 'max_evening_shifts')
+        for e in supervisors:
+            model.Add(LinearExpr.Sum(period_vars(evenings, e, range(num_days))) <= max_evening_shifts)
+    
+    return {
+        "model": model,
+        "x": x,
+        "index": index,
+        "evenings": evenings,
+        "assumptions": assumptions,
+        "max_evening_shifts": max_evening_shifts,
+    }
+
+
+def solver_statistics(solver, status, solver_options):
+    """Summarise a finished solve: timing, objective, bound and gap"""
+    stats = {
+        "profile": solver_options["profile"],
+        "status": solver.StatusName(status),
+        "wall_time": solver.WallTime(),
+        "objective": None,
+        "best_bound": None,
+        "gap": None,
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        objective = solver.ObjectiveValue()
+        best_bound = solver.BestObjectiveBound()
+        stats["objective"] = objective
+        stats["best_bound"] = best_bound
+        stats["gap"] = abs(objective - best_bound) / max(1.0, abs(objective))
+    return stats
+
+
+class SolveMonitor:
+    """
+    Follows a running solve_rota from another thread
+
+    on_solution is called from the solver with each improving solution as
+    {"solutions", "objective", "best_bound", "wall_time"}, plus a "preview"
+    of the rota ({"headers", "table"}) at most every preview_interval
+    seconds. stop() ends the search early; solve_rota then returns the
+    best rota found so far, marked "stopped".
+    """
+
+    def __init__(self, on_solution=None, preview_interval=1.0):
+        self.on_solution = on_solution
+        self.preview_interval = preview_interval
+        self.stopped = False
+        self._solvers = []
+        self._lock = threading.Lock()
+
+    def attach(self, solver):
+        # A portfolio solve attaches one solver per run
+        with self._lock:
+            self._solvers.append(solver)
+            if self.stopped:
+                # Stopped before the search began: settle for the first rota
+                solver.parameters.stop_after_first_solution = True
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            for solver in self._solvers:
+                solver.StopSearch()
+
+
+class _SolutionReporter(RaceCallback):
+    """Passes each solution that improves on every portfolio run's best to a SolveMonitor"""
+
+    def __init__(self, race, monitor, render_table):
+        # render_table is given the solution's CpSolverResponse
+        super().__init__(race)
+        self._monitor = monitor
+        self._render_table = render_table
+        self._last_preview = None
+
+    def on_improving_solution(self, solutions):
+        event = {
+            "solutions": solutions,
+            "objective": self.ObjectiveValue(),
+            "best_bound": self.BestObjectiveBound(),
+            "wall_time": self.WallTime(),
+        }
+        if self._last_preview is None or event["wall_time"] - self._last_preview >= self._monitor.preview_interval:
+            self._last_preview = event["wall_time"]
+            event["preview"] = self._render_table(self.response_proto)
+        if self._monitor.on_solution:
+            self._monitor.on_solution(event)
+        if self._monitor.stopped:
+            self.StopSearch()
+
+
+def solve_rota(employees_data, solver_options=None, previous=None, horizon=None, template=None, fairness=None,
+               monitor=None):
     """
     Solve rota scheduling using OR-Tools CP-SAT solver
     
     Args:
         employees_data: List of employee dictionaries with configuration
+        solver_options: Parameters from resolve_solver_options; the
+            "balanced" profile is used when omitted
+        previous: Optional earlier rota to re-solve from, as
+            {"assignments": [{"employee", "day", "shift"}, ...],
+             "minimal_change": bool}. Its assignments become solution
+            hints; with minimal_change the objective also penalises
+            every shift that differs from it.
+        horizon: Planning horizon from resolve_horizon; a single undated
+            Mon–Sun week when omitted
+        template: Compiled shift template (see shift_templates) giving each
+            weekday's shifts and their coverage; "default" when omitted
+        fairness: Optional {"weights": {metric: weight}, "history":
+            {employee: {metric: value}}} for the metrics in
+            FAIRNESS_METRICS. The objective then also keeps each
+            employee's history plus this rota near their share of the
+            weekly shift allowance; the projected totals are returned
+            under "fairness".
+        monitor: Optional SolveMonitor to report progress to and to stop
+            the search through
         
     Returns:
-        Dictionary with status, message, table data, and headers
+        Dictionary with status, message, table data, headers, solver stats
+        and telemetry (per-phase timings, model size and search counters).
+        A "no_solution" result found by the model also has the conflicting
+        constraints and "diagnosis_complete" (see
+        find_conflicting_constraints).
     """
+    clock = PhaseClock()
+    result = _solve_rota(employees_data, solver_options, previous, horizon, template, fairness, monitor, clock)
+    result["telemetry"] = clock.report()
+    return result
+
+
+def profile_solve_rota(employees_data, **options):
+    """solve_rota under cProfile, with the top of the profile in result["profile"]"""
+    result, report = profile_call(solve_rota, employees_data, **options)
+    result["profile"] = report
+    return result
+
+
+def _solve_rota(employees_data, solver_options, previous, horizon, template, fairness, monitor, clock):
+    if solver_options is None:
+        solver_options = resolve_solver_options()
+    if horizon is None:
+        horizon = resolve_horizon()
+    if template is None:
+        template = get_shift_template()
+    days = DAY_NAMES
+    
     try:
-        # Initialize the model
-        model = cp_model.CpModel()
-        
-        # Days and shifts configuration
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        shifts_per_day = 2  # 0 = morning (9:00am–5:30pm), 1 = evening (5:30pm–2:15am)
-        
-        # Extract structured variables for constraint use
-        employees = [emp["name"] for emp in employees_data]
-        is_supervisor = [emp["is_supervisor"] for emp in employees_data]
-        
-        # Convert max_shifts to int (handle both string and int input)
-        max_shifts_per_employee = []
-        for emp in employees_data:
-            max_shifts = emp["max_shifts"]
-            if isinstance(max_shifts, str):
-                max_shifts_per_employee.append(int(max_shifts))
-            else:
-                max_shifts_per_employee.append(max_shifts)
+        # Resolve the horizon, shift template and employee constraints
+        problem = prepare_problem(employees_data, horizon, template)
+        calendar = problem["calendar"]
+        days = problem["days"]
+        weeks = problem["weeks"]
+        day_shifts = problem["day_shifts"]
+        employees = problem["employees"]
+        max_shifts_per_employee = problem["max_shifts"]
+        days_off = problem["days_off"]
+        holidays = problem["holidays"]
+        clock.lap("prepare")
         
-        # Process constraints
-        days_off = {i: emp.get("days_off", []) for i, emp in enumerate(employees_data)}
+        # Reject configs that fail simple counting checks without building the model
+        conflicts = precheck_problem(problem)
+        clock.lap("precheck")
+        if conflicts:
+            return {
+                "status": "no_solution",
+                "message": "No feasible solution found. " + " ".join(c["description"] + "." for c in conflicts),
+                "conflicts": conflicts,
+                "table": [],
+                "headers": ["Employee"] + days,
+                "shift_totals": {},
+                "evening_totals": {},
+                "solver_stats": None
+            }
         
-        holidays = {
-            i: emp.get("holidays", [])
-            for i, emp in enumerate(employees_data)
-            if emp.get("holidays")
-        }
+        # Variables, coverage and every employee rule
+        matrices = build_matrices(problem)
+        exists = matrices["exists"]
+        num_employees = len(employees)
+        num_days = len(days)
+        built = build_model(problem, matrices)
+        model = built["model"]
+        x = built["x"]
+        index = built["index"]
+        assumptions = built["assumptions"]
         
-        unavailable_shifts = {
-            i: [tuple(slot) for slot in emp.get("unavailable_shifts", [])]
-            for i, emp in enumerate(employees_data)
-            if emp.get("unavailable_shifts")
-        }
+        # Fairness against the rolling history: each metric's projected
+        # total (history plus this rota) should follow the employee's share
+        # of the weekly shift allowance, so part-timers are not counted as
+        # owing hours, and the furthest anyone runs over is minimised. One
+        # constraint per employee and metric, whatever the history length.
+        fairness_terms = []
+        projected = {}
+        if fairness:
+            history = fairness.get("history") or {}
+            weights = fairness.get("weights") or {}
+            share_sum = sum(max_shifts_per_employee)
+            
+            def shift_value(metric, d, shift):
+                """What working one shift adds to a metric; hours are whole hours"""
+                if metric == "evenings":
+                    return int(shift["evening"])
+                if metric == "weekends":
+                    return int(problem["weekdays"][d] >= 5)
+                return round(shift["minutes"] / 60)
+            
+            for metric in FAIRNESS_METRICS:
+                weight = weights.get(metric)
+                if not weight or not share_sum:
+                    continue
+                # Day × shift grid of what each shift is worth
+                values = np.zeros(exists.shape, dtype=np.int64)
+                for d in range(num_days):
+                    for s, shift in enumerate(day_shifts[d]):
+                        values[d, s] = shift_value(metric, d, shift)
+                slots = [(d, s) for d, s in zip(*np.nonzero(values))]
+                coefficients = [int(values[d, s]) for d, s in slots]
+                pasts = [round(float((history.get(name) or {}).get(metric, 0))) for name in employees]
+                # Targets share out everyone's history plus this rota's
+                # minimum coverage. Constant targets keep the model easy to
+                # bound, where a share of the solved total does not.
+                pool = sum(pasts) + sum(day_shifts[d][s]["min_staff"] * value for (d, s), value in zip(slots, coefficients))
+                # Hours count per longest shift over the target, so every
+                # metric's unit is about one shift
+                unit = max(coefficients, default=1) if metric == "hours" else 1
+                worst = model.NewIntVar(0, max(pasts) + sum(coefficients), f'{metric}_worst_excess')
+                for e in range(num_employees):
+                    target = round(pool * max_shifts_per_employee[e] / share_sum)
+                    count = LinearExpr.WeightedSum([x[e][d][s] for d, s in slots], coefficients)
+                    model.Add(unit * worst >= pasts[e] + count - target)
+                fairness_terms.append(weight * worst)
+                projected[metric] = (pasts, values)
         
-        must_work_shifts = {
-            i: [tuple(slot) for slot in emp.get("must_work_shifts", [])]
-            for i, emp in enumerate(employees_data)
-            if emp.get("must_work_shifts")
-        }
+        # Warm start from the previous rota: hint every variable with what it
+        # was last time, and optionally count each shift that moves
+        changes = None
+        previous_slots = set()
+        if previous:
+            previous_slots = {
+                (a["employee"], int(a["day"]), int(a["shift"]))
+                for a in previous.get("assignments", [])
+            }
+            all_vars, coefficients, worked_before_count = [], [], 0
+            for e in range(num_employees):
+                for d in range(num_days):
+                    for s, var in enumerate(x[e][d]):
+                        worked_before = (employees[e], d, s) in previous_slots
+                        model.AddHint(var, worked_before)
+                        all_vars.append(var)
+                        # Keeping a previous shift is 1 - var, adding one is var
+                        coefficients.append(-1 if worked_before else 1)
+                        worked_before_count += worked_before
+            if previous.get("minimal_change"):
+                changes = (LinearExpr.WeightedSum(all_vars, coefficients) + worked_before_count, len(all_vars))
         
-        # Create decision variables
-        shift_assignments = {}
-        for e in range(len(employees)):
-            for d in range(len(days)):
-                for s in range(shifts_per_day):
-                    shift_assignments[(e, d, s)] = model.NewBoolVar(f'emp{e}_day{d}_shift{s}')
-        
-        # Constraint 1: Each shift must have exactly 2 staff (except Wednesday morning which needs 3)
-        for d in range(len(days)):
-            for s in range(shifts_per_day):
-                if d == 2 and s == 0:  # Wednesday (day 2), morning shift (shift 0)
-                    # Wednesday morning needs exactly 3 people
-                    model.Add(sum(shift_assignments[(e, d, s)] for e in range(len(employees))) == 3)
-                else:
-                    # All other shifts need exactly 2 people
-                    model.Add(sum(shift_assignments[(e, d, s)] for e in range(len(employees))) == 2)
-        
-        # Constraint 2: Max total shifts per employee (RELAXED for part-time supervisors)
-        for e in range(len(employees)):
-            actual_shifts = sum(shift_assignments[(e, d, s)] for d in range(len(days)) for s in range(shifts_per_day))
-            holiday_count = len(holidays.get(e, []))  # 0 if no holidays
-            
-            if is_supervisor[e]:
-                # Supervisors work UP TO their max_shifts 
-                model.Add(actual_shifts + holiday_count <= max_shifts_per_employee[e])
-                # But ensure they work at least some minimum
-                model.Add(actual_shifts + holiday_count >= 1)  # At least 1 shift if they're working
-            else:
-                # Non-supervisors work up to their max limit
-                model.Add(actual_shifts + holiday_count <= max_shifts_per_employee[e])
-        
-        # Constraint 3: Max 1 shift per day per employee
-        for e in range(len(employees)):
-            for d in range(len(days)):
-                model.Add(sum(shift_assignments[(e, d, s)] for s in range(shifts_per_day)) <= 1)
-        
-        # Constraint 4: Respect days off
-        for e in range(len(employees)):
-            for d in days_off[e]:
-                for s in range(shifts_per_day):
-                    model.Add(shift_assignments[(e, d, s)] == 0)
-        
-        # Constraint 5: At least 1 supervisor per shift
-        for d in range(len(days)):
-            for s in range(shifts_per_day):
-                model.Add(sum(shift_assignments[(e, d, s)] for e in range(len(employees)) if is_supervisor[e]) >= 1)
-        
-        # Constraint 6: Unavailable shifts
-        for e, restricted_slots in unavailable_shifts.items():
-            for d, s in restricted_slots:
-                model.Add(shift_assignments[(e, d, s)] == 0)
-        
-        # Constraint 7: Enforce must-work shifts
-        for e, required_slots in must_work_shifts.items():
-            for d, s in required_slots:
-                model.Add(shift_assignments[(e, d, s)] == 1)
-        
-        # Constraint 8: Block all holiday days
-        for e, holiday_days in holidays.items():
-            for d in holiday_days:
-                for s in range(shifts_per_day):
-                    model.Add(shift_assignments[(e, d, s)] == 0)
-        
-        # Constraint 9: Supervisors should work at least 1 evening shift (relaxed from exactly 2)
-        for e in range(len(employees)):
-            if is_supervisor[e]:
-                evening_shifts = sum(shift_assignments[(e, d, 1)] for d in range(len(days)))
-                model.Add(evening_shifts >= 1)  # At least 1 evening shift per supervisor
-                model.Add(evening_shifts <= 3)  # But not more than 3 to keep it reasonable
-        
-        # Trying to balance evening shifts among supervisors 
-        supervisor_evening_vars = []
-        for e in range(len(employees)):
-            if is_supervisor[e]:
-                evening_count = sum(shift_assignments[(e, d, 1)] for d in range(len(days)))
-                supervisor_evening_vars.append(evening_count)
-        
-        # Minimize the maximum number of evening shifts any supervisor has to work
-        if supervisor_evening_vars:
-            max_evening_shifts = model.NewIntVar(0, 7, 'max_evening_shifts')
-            for evening_var in supervisor_evening_vars:
-                model.Add(evening_var <= max_evening_shifts)
-            model.Minimize(max_evening_shifts)
+        # Symmetry breaking: employees the model cannot tell apart (same
+        # rules, history and previous shifts) have their rotas ordered, so
+        # the search does not revisit the same rota with names swapped
+        symmetry_literal = None
+        if solver_options.get("symmetry_breaking"):
+            extra_keys = [
+                (
+                    tuple(pasts[e] for pasts, _ in projected.values()),
+                    frozenset((d, s) for name, d, s in previous_slots if name == employees[e]),
+                )
+                for e in range(num_employees)
+            ]
+            classes = employee_classes(problem, extra_keys)
+            if classes:
+                symmetry_literal = model.NewBoolVar('symmetry_breaking')
+                for members in classes:
+                    for e1, e2 in zip(members, members[1:]):
+                        add_lex_order(model, period_vars(x, e1, range(num_days)),
+                                      period_vars(x, e2, range(num_days)), symmetry_literal)
+            clock.note("symmetry", {
+                "classes": len(classes),
+                "employees": sum(len(members) for members in classes),
+            })
+        
+        # Minimize the maximum number of evening shifts any supervisor has to
+        # work, alongside the weighted fairness terms
+        objective = LinearExpr.Sum(fairness_terms)
+        if built["max_evening_shifts"] is not None:
+            objective += built["max_evening_shifts"]
+        
+        # Then disturb as few previous shifts as possible. Weighting the
+        # balance above the largest possible change count keeps it the
+        # primary goal.
+        if changes:
+            change_count, max_changes = changes
+            objective = objective * (max_changes + 1) + change_count
+        
+        if fairness_terms or built["max_evening_shifts"] is not None or changes:
+            model.Minimize(objective)
         
         # Solve the model
-        solver = cp_model.CpSolver()
-        solver.parameters.random_seed = random.randint(1, 10000)
-        status = solver.Solve(model)
+        set_assumption_domains(model, assumptions, fixed=True)
+        if symmetry_literal is not None:
+            set_assumption_domains(model, [(symmetry_literal, None)], fixed=True)
+        labels = [[shift["label"] for shift in day_shifts[d]] for d in range(num_days)]
         
-        if status == cp_model.FEASIBLE or status == cp_model.OPTIMAL:
-            # Build the result table
+        def assigned_shifts(response):
+            """Employee × day × shift bool array of the shifts a solution assigns"""
+            solution = np.asarray(response.solution, dtype=np.int64)
+            return exists[None, :, :] & (solution[index] == 1)
+        
+        def render_table(assigned):
+            """The rota table for a solution, from assigned_shifts"""
             table_data = []
-            
-            for e in range(len(employees)):
+            assigned = assigned.tolist()
+            for e in range(num_employees):
                 row = [employees[e]]
-                for d in range(len(days)):
+                for d in range(num_days):
                     cell = ""
                     if holidays.get(e) and d in holidays[e]:
                         cell = "Holiday"
                     elif days_off.get(e) and d in days_off[e]:
                         cell = "Day Off"
                     else:
-                        shifts = []
-                        for s in range(shifts_per_day):
-                            if solver.Value(shift_assignments[(e, d, s)]):
-                                # Different shift times for Wednesday (2) and Saturday (5)
-                                if d in [2, 5]:  # Wednesday and Saturday
-                                    shifts.append("8:00am–5:00pm" if s == 0 else "5:00pm–2:15am")
-                                else:
-                                    shifts.append("9:00am–5:30pm" if s == 0 else "5:30pm–2:15am")
+                        shifts = [label for label, on in zip(labels[d], assigned[e][d]) if on]
                         if shifts:
                             cell = " / ".join(shifts)  # Join multiple shifts with /
                         else:
                             cell = "Off"
                     row.append(cell)
                 table_data.append(row)
+            return table_data
+        
+        clock.lap("build")
+        clock.note("model", model_statistics(model))
+        # One run, or a race between several seeds and search strategies
+        race = PortfolioRace(solver_options)
+        make_reporter = None
+        if monitor:
+            def make_reporter(race):
+                return _SolutionReporter(race, monitor, lambda response: {
+                    "headers": ["Employee"] + days, "table": render_table(assigned_shifts(response)),
+                })
+        solver, status = race.solve(model, monitor, make_reporter)
+        clock.lap("solve")
+        clock.note("search", search_statistics(solver))
+        stats = {**solver_statistics(solver, status, solver_options), **race.report()}
+        
+        if status == cp_model.FEASIBLE or status == cp_model.OPTIMAL:
+            # Read every assignment back in one pass, then build the result table
+            assigned = assigned_shifts(solver.ResponseProto())
+            table_data = render_table(assigned)
+            
+            # Structured assignments, usable as hints for a later re-solve
+            assignments = [
+                {
+                    "employee": employees[e], "day": d, "date": calendar[d]["date"], "shift": s,
+                    "shift_name": day_shifts[d][s]["name"], "start": day_shifts[d][s]["start"],
+                    "minutes": day_shifts[d][s]["minutes"], "evening": day_shifts[d][s]["evening"],
+                }
+                for e, d, s in np.argwhere(assigned).tolist()
+            ]
             
             # Calculate total shifts for verification
-            shift_totals = {}
-            evening_totals = {}
-            for e in range(len(employees)):
-                total = sum(
-                    solver.Value(shift_assignments[(e, d, s)])
-                    for d in range(len(days))
-                    for s in range(shifts_per_day)
-                )
-                evening_total = sum(
-                    solver.Value(shift_assignments[(e, d, 1)])
-                    for d in range(len(days))
-                )
-                shift_totals[employees[e]] = total
-                evening_totals[employees[e]] = evening_total
+            day_counts = assigned.sum(axis=2)
+            per_week = np.stack([day_counts[:, week].sum(axis=1) for week in weeks], axis=1).tolist()
+            evening_counts = (assigned & matrices["evening"][None, :, :]).sum(axis=(1, 2)).tolist()
+            shift_totals = {employees[e]: sum(per_week[e]) for e in range(num_employees)}
+            evening_totals = {employees[e]: evening_counts[e] for e in range(num_employees)}
+            weekly_totals = {employees[e]: per_week[e] for e in range(num_employees)}
             
-            return {
+            result = {
                 "status": "optimal" if status == cp_model.OPTIMAL else "feasible",
                 "message": f"Rota successfully generated! Solution status: {'optimal' if status == cp_model.OPTIMAL else 'feasible'}",
                 "table": table_data,
                 "headers": ["Employee"] + days,
                 "shift_totals": shift_totals,
-                "evening_totals": evening_totals
+                "evening_totals": evening_totals,
+                "weekly_totals": weekly_totals,
+                "template": template["name"],
+                "calendar": calendar,
+                "assignments": assignments,
+                "solver_stats": stats
             }
+            if projected:
+                # Each employee's history plus this rota, per balanced metric
+                result["fairness"] = {}
+                for metric, (pasts, values) in projected.items():
+                    counts = (assigned * values[None, :, :]).sum(axis=(1, 2)).tolist()
+                    result["fairness"][metric] = {employees[e]: pasts[e] + counts[e] for e in range(num_employees)}
+            if monitor and monitor.stopped:
+                result["stopped"] = True
+                result["message"] += " (search stopped early)"
+            if previous:
+                # Shifts added or removed compared with the previous rota
+                current_slots = {(a["employee"], a["day"], a["shift"]) for a in assignments}
+                result["changed_shifts"] = len(current_slots ^ previous_slots)
+            clock.lap("render")
+            return result
         
         elif status == cp_model.INFEASIBLE:
+            # Diagnosis gets what is left of the solve's time limit, but
+            # never less than MIN_DIAGNOSIS_SECONDS
+            remaining = max(MIN_DIAGNOSIS_SECONDS, solver_options["max_time_in_seconds"] - solver.WallTime())
+            conflicts, complete = find_conflicting_constraints(model, assumptions, remaining, symmetry_literal)
+            clock.lap("diagnose")
+            if conflicts:
+                message = "No feasible solution found. These constraints conflict: " + "; ".join(
+                    c["description"] for c in conflicts
+                ) + "."
+                if not complete:
+                    message += " The diagnosis ran out of time, so some of these may not be needed for the conflict."
+            elif not complete:
+                message = "No feasible solution found. The diagnosis ran out of time before it could tell which constraints conflict."
+            else:
+                # Nothing employee-specific is to blame: the shift template
+                # asks for more staff or supervisors than exist
+                message = "No feasible solution found. There are not enough staff or supervisors to cover the required shifts."
             return {
                 "status": "no_solution",
-                "message": "No feasible solution found. Try relaxing constraints (fewer must-work shifts, more available employees, or adjust max shifts).",
+                "message": message,
+                "conflicts": conflicts,
+                "diagnosis_complete": complete,
+                "table": [],
+                "headers": ["Employee"] + days,
+                "shift_totals": {},
+                "evening_totals": {},
+                "solver_stats": stats
+            }
+        
+        elif status == cp_model.UNKNOWN:
+            # Time limit reached (or the search stopped) before any rota was found
+            result = {
+                "status": "timeout",
+                "message": f"No rota found within the {solver_options['max_time_in_seconds']:g}s time limit. Try a slower solver profile or relax constraints.",
                 "table": [],
                 "headers": ["Employee"] + days,
                 "shift_totals": {},
-                "evening_totals": {}
+                "evening_totals": {},
+                "solver_stats": stats
             }
+            if monitor and monitor.stopped:
+                result["stopped"] = True
+                result["message"] = "The search was stopped before any rota was found."
+            return result
         
         else:
             return {
@@ -215,7 +766,8 @@ def solve_rota(employees_data):
                 "table": [],
                 "headers": ["Employee"] + days,
                 "shift_totals": {},
-                "evening_totals": {}
+                "evening_totals": {},
+                "solver_stats": stats
             }
             
     except Exception as e:
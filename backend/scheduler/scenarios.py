@@ -0,0 +1,144 @@
+import copy
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .jobs import QueueFullError, QueueUnavailableError
+
+logger = logging.getLogger(__name__)
+
+SCENARIO_FIELDS = {"name", "remove", "add", "update", "add_holidays"}
+
+
+def apply_scenario(base_employees, scenario):
+    """
+    Apply one what-if delta to the base employee list
+
+    A scenario may contain:
+        remove: names of employees to drop
+        add: employee dicts to append
+        update: {name: {field: value}} replacing fields for an employee
+        add_holidays: {name: [day, ...]} appended to an employee's holidays
+
+    Only employees the delta touches are copied; the rest are shared with
+    the base list. The employees that result are not validated here; check
+    them as any other rota request's employees.
+
+    Raises:
+        ValueError: for an unknown or malformed field, or a name not in
+            the base list
+    """
+    if not isinstance(scenario, dict):
+        raise ValueError("Each scenario must be an object")
+    unknown = set(scenario) - SCENARIO_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown scenario field '{sorted(unknown)[0]}'")
+    remove = scenario.get("remove", [])
+    if not isinstance(remove, list) or not all(isinstance(name, str) for name in remove):
+        raise ValueError("remove must be a list of employee names")
+    if not isinstance(scenario.get("add", []), list):
+        raise ValueError("add must be a list of employees")
+    if not all(isinstance(fields, dict) for fields in _mapping(scenario, "update").values()):
+        raise ValueError("update must map employee names to objects of fields")
+    if not all(isinstance(days, list) for days in _mapping(scenario, "add_holidays").values()):
+        raise ValueError("add_holidays must map employee names to lists of days")
+
+    names = {emp["name"] for emp in base_employees}
+    touched = set(scenario.get("update", {})) | set(scenario.get("add_holidays", {}))
+    removed = set(scenario.get("remove", []))
+    missing = (touched | removed) - names
+    if missing:
+        raise ValueError(f"Scenario refers to unknown employee '{sorted(missing)[0]}'")
+
+    employees = []
+    for emp in base_employees:
+        name = emp["name"]
+        if name in removed:
+            continue
+        if name in touched:
+            emp = copy.deepcopy(emp)
+            emp.update(scenario.get("update", {}).get(name, {}))
+            emp["holidays"] = list(emp.get("holidays", [])) + list(scenario.get("add_holidays", {}).get(name, []))
+        employees.append(emp)
+
+    employees.extend(copy.deepcopy(scenario.get("add", [])))
+    return employees
+
+
+def _mapping(scenario, field):
+    value = scenario.get(field, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"{field} must be an object keyed by employee name")
+    return value
+
+
+def summarize(index, name, job, result=None, error=None):
+    """One line of the streamed batch response"""
+    line = {"scenario": index, "name": name, "job_id": job["id"] if job else None}
+    if error:
+        line.update({"status": "error", "error": error})
+        return line
+
+    stats = result.get("solver_stats") or {}
+    line.update({
+        "status": result["status"],
+        "message": result["message"],
+        "objective": stats.get("objective"),
+        "wall_time": stats.get("wall_time"),
+        "shift_totals": result.get("shift_totals", {}),
+    })
+    return line
+
+
+def run_scenarios(queue, scenarios, options):
+    """
+    Solve prepared scenarios through the job queue, yielding summaries as
+    each one finishes
+
+    Args:
+        queue: SolveJobQueue to submit to
+        scenarios: List of (name, employees) pairs, already validated
+        options: solve_rota keyword arguments shared by every scenario
+
+    Scenarios are submitted while the queue has room. When it is full the
+    generator waits for one of its own solves to finish before submitting
+    more, so a large batch never overflows the queue. A scenario that
+    cannot be solved gets an error line; the rest of the batch carries on.
+    """
+    pending = {}
+    remaining = list(enumerate(scenarios))
+
+    while remaining or pending:
+        while remaining:
+            index, (name, employees) = remaining[0]
+            try:
+                job = queue.submit(employees, **options)
+            except QueueFullError as e:
+                if not pending:
+                    # Other requests hold every slot; give up on the rest
+                    for index, (name, _) in remaining:
+                        yield summarize(index, name, None, error=str(e))
+                    remaining = []
+                break
+            except QueueUnavailableError as e:
+                yield summarize(index, name, None, error=str(e))
+            except Exception as e:
+                # The response is already streaming, so report it in-line
+                logger.exception("Scenario %s could not be submitted", index)
+                yield summarize(index, name, None, error=f"Could not solve this scenario: {e}")
+            else:
+                pending[job["future"]] = (index, name, job)
+            remaining.pop(0)
+
+        if not pending:
+            continue
+
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            index, name, job = pending.pop(future)
+            # The queue frees the job's slot just after its future completes;
+            # wait for that so the next submit is not refused for it
+            job["done"].wait()
+            if future.exception() is not None:
+                yield summarize(index, name, job, error=f"Solver process failed: {future.exception()}")
+            else:
+                yield summarize(index, name, job, future.result())
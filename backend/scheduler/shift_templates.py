@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), 'shift_templates.json')
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+SHIFT_FIELDS = {"name", "start", "end", "min_staff", "max_staff", "min_supervisors", "evening"}
+
+
+def _minutes(value, where):
+    """Parse "HH:MM" into minutes after midnight"""
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"{where}: times must be HH:MM, got '{value}'")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"{where}: '{value}' is not a valid time")
+    return hours * 60 + minutes
+
+
+def _display_time(minutes):
+    """Format minutes after midnight the way the rota table shows it, e.g. 5:30pm"""
+    hours, mins = divmod(minutes, 60)
+    suffix = "am" if hours < 12 else "pm"
+    return f"{(hours % 12) or 12}:{mins:02d}{suffix}"
+
+
+def compile_shift(shift, where):
+    """Validate one shift definition and precompute its coverage entry"""
+    unknown = set(shift) - SHIFT_FIELDS
+    if unknown:
+        raise ValueError(f"{where}: unknown field '{sorted(unknown)[0]}'")
+    for field in ("start", "end", "min_staff"):
+        if field not in shift:
+            raise ValueError(f"{where}: missing required field '{field}'")
+
+    start = _minutes(shift["start"], where)
+    end = _minutes(shift["end"], where)
+    min_staff = int(shift["min_staff"])
+    max_staff = int(shift.get("max_staff", min_staff))
+    min_supervisors = int(shift.get("min_supervisors", 0))
+    if not 0 <= min_staff <= max_staff:
+        raise ValueError(f"{where}: need 0 <= min_staff <= max_staff")
+    if not 0 <= min_supervisors <= max_staff:
+        raise ValueError(f"{where}: min_supervisors must be between 0 and max_staff")
+
+    return {
+        "name": shift.get("name", ""),
+        "start": shift["start"],
+        "end": shift["end"],
+        "label": f"{_display_time(start)}–{_display_time(end)}",
+        # Shifts ending at or before their start run past midnight
+        "minutes": (end - start) % (24 * 60) or 24 * 60,
+        "min_staff": min_staff,
+        "max_staff": max_staff,
+        "min_supervisors": min_supervisors,
+        "evening": bool(shift.get("evening", False)),
+    }
+
+
+def compile_template(name, template, version):
+    """
+    Compile a template into the coverage table consumed by the solver
+
+    A template lists shifts per weekday ("Mon".."Sun"), falling back to its
+    "default" list. The compiled table is a plain dict so it can be pickled
+    to solver processes and hashed into cache keys:
+        {"name", "version", "shifts_per_day",
+         "days": [[shift, ...] for Mon..Sun]}
+    """
+    day_definitions = template.get("days")
+    if not isinstance(day_definitions, dict):
+        raise ValueError(f"Shift template '{name}' needs a 'days' object")
+    unknown = set(day_definitions) - set(DAY_NAMES) - {"default"}
+    if unknown:
+        raise ValueError(f"Shift template '{name}': unknown day '{sorted(unknown)[0]}'")
+
+    days = []
+    for day_name in DAY_NAMES:
+        shifts = day_definitions.get(day_name, day_definitions.get("default"))
+        if not shifts:
+            raise ValueError(f"Shift template '{name}' has no shifts for {day_name}")
+        days.append([
+            compile_shift(shift, f"Shift template '{name}', {day_name} shift {s}")
+            for s, shift in enumerate(shifts)
+        ])
+
+    return {
+        "name": name,
+        "version": version,
+        "shifts_per_day": max(len(shifts) for shifts in days),
+        "days": days,
+    }
+
+
+class ShiftTemplateStore:
+    """
+    Loads shift templates from a JSON file and keeps them compiled
+
+    The file is only re-read when its modification time changes, and only
+    recompiled when its "version" changes, so solves never re-parse it.
+    """
+
+    def __init__(self, path=DEFAULT_TEMPLATES_PATH):
+        self.path = path
+        self._mtime = None
+        self._version = None
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return
+
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        version = data.get("version")
+        if version != self._version or not self._compiled:
+            self._compiled = {
+                name: compile_template(name, template, version)
+                for name, template in data.get("templates", {}).items()
+            }
+            self._version = version
+        self._mtime = mtime
+
+    def get(self, name):
+        """
+        Return the compiled template called name
+
+        Raises:
+            ValueError: if no such template exists or the file is invalid
+        """
+        with self._lock:
+            self._refresh()
+            if name not in self._compiled:
+                raise ValueError(f"Unknown shift template '{name}'. Choose from: {', '.join(self._compiled)}")
+            return self._compiled[name]
+
+    def all(self):
+        """Return every compiled template, keyed by name"""
+        with self._lock:
+            self._refresh()
+            return dict(self._compiled)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_template_store(path=None):
+    """Return the shared store for the templates file at path"""
+    path = path or DEFAULT_TEMPLATES_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ShiftTemplateStore(path)
+        return _stores[path]
+
+
+def get_shift_template(name="default", path=None):
+    """Return a compiled shift template from the templates file at path"""
+    return get_template_store(path).get(name)
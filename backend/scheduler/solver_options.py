@@ -0,0 +1,148 @@
+from datetime import date
+
+# Named CP-SAT parameter sets. A time limit means a solve always returns,
+# with the best rota found so far if it could not prove optimality.
+# portfolio_runs above 1 races that many seeds and search strategies,
+# sharing the workers between them (see portfolio.PortfolioRace).
+SOLVER_PROFILES = {
+    "fast": {"max_time_in_seconds": 5.0, "num_workers": 4, "relative_gap_limit": 0.05, "portfolio_runs": 1},
+    "balanced": {"max_time_in_seconds": 20.0, "num_workers": 8, "relative_gap_limit": 0.01, "portfolio_runs": 1},
+    "thorough": {"max_time_in_seconds": 90.0, "num_workers": 8, "relative_gap_limit": 0.0, "portfolio_runs": 1},
+}
+
+# Allowed (min, max) for each parameter that can be overridden per request
+SOLVER_PARAMETER_BOUNDS = {
+    "max_time_in_seconds": (0.1, 600.0),
+    "num_workers": (1, 32),
+    "relative_gap_limit": (0.0, 1.0),
+    "portfolio_runs": (1, 8),
+    # Fixed CP-SAT seed for reproducible runs; a random one when left out
+    "random_seed": (0, 2**31 - 1),
+}
+
+# On/off switches that can be overridden per request, with their defaults
+SOLVER_FLAGS = {
+    # Order interchangeable employees' rotas (see employee_classes). Off by
+    # default: on the benchmark workloads the extra constraints slowed the
+    # search more than the pruning saved (benchmark_rota --compare-symmetry).
+    "symmetry_breaking": False,
+}
+
+
+def resolve_solver_options(options=None, default_profile="balanced"):
+    """
+    Build validated solver parameters from a profile plus overrides
+    
+    Args:
+        options: Optional dict with a "profile" name and any parameters from
+            SOLVER_PARAMETER_BOUNDS or SOLVER_FLAGS to override
+        default_profile: Profile used when options does not name one
+        
+    Returns:
+        Dictionary with the profile name and every solver parameter;
+        random_seed is None unless one was given
+        
+    Raises:
+        ValueError: for an unknown profile or parameter, or a value out of bounds
+    """
+    options = dict(options or {})
+    profile = options.pop("profile", None) or default_profile
+    if profile not in SOLVER_PROFILES:
+        raise ValueError(f"Unknown solver profile '{profile}'. Choose from: {', '.join(SOLVER_PROFILES)}")
+    
+    resolved = {"profile": profile, **SOLVER_PROFILES[profile], "random_seed": None, **SOLVER_FLAGS}
+    for name, value in options.items():
+        if name in SOLVER_FLAGS:
+            if not isinstance(value, bool):
+                raise ValueError(f"Solver option '{name}' must be true or false")
+            resolved[name] = value
+            continue
+        if name not in SOLVER_PARAMETER_BOUNDS:
+            raise ValueError(f"Unknown solver parameter '{name}'")
+        low, high = SOLVER_PARAMETER_BOUNDS[name]
+        cast = int if isinstance(low, int) else float
+        try:
+            value = cast(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Solver parameter '{name}' must be a number")
+        if not low <= value <= high:
+            raise ValueError(f"Solver parameter '{name}' must be between {low} and {high}")
+        resolved[name] = value
+    return resolved
+
+
+# Quantities balanced against each employee's rolling history, with default
+# weights. Hours over the target count per longest shift, so each metric's
+# unit is about one shift.
+FAIRNESS_METRICS = {"evenings": 1, "weekends": 1, "hours": 1}
+
+
+def resolve_fairness_weights(weights=None):
+    """
+    Validate fairness objective weights, filling in the defaults
+    
+    Args:
+        weights: Optional dict of FAIRNESS_METRICS names to non-negative
+            integer weights; 0 leaves a metric out of the objective
+        
+    Returns:
+        Dictionary with a weight for every metric
+        
+    Raises:
+        ValueError: for an unknown metric or a bad weight
+    """
+    resolved = dict(FAIRNESS_METRICS)
+    for metric, weight in (weights or {}).items():
+        if metric not in FAIRNESS_METRICS:
+            raise ValueError(f"Unknown fairness metric '{metric}'. Choose from: {', '.join(FAIRNESS_METRICS)}")
+        if isinstance(weight, bool) or not isinstance(weight, int) or not 0 <= weight <= 1000:
+            raise ValueError(f"Fairness weight for '{metric}' must be a whole number between 0 and 1000")
+        resolved[metric] = weight
+    return resolved
+
+
+# Longest planning horizon a single solve may cover
+MAX_HORIZON_DAYS = 84
+
+
+def resolve_horizon(horizon=None):
+    """
+    Validate the planning horizon for a solve
+    
+    Args:
+        horizon: Optional dict with "start_date" (ISO date), "days" (horizon
+            length, default 7) and "max_consecutive_days" (a rest rule that
+            also applies across week boundaries)
+        
+    Returns:
+        Dictionary with all three keys filled in
+        
+    Raises:
+        ValueError: for a malformed date or an out of range length
+    """
+    horizon = dict(horizon or {})
+    unknown = set(horizon) - {"start_date", "days", "max_consecutive_days"}
+    if unknown:
+        raise ValueError(f"Unknown horizon option '{sorted(unknown)[0]}'")
+    
+    start_date = horizon.get("start_date")
+    if start_date is not None:
+        try:
+            start_date = date.fromisoformat(str(start_date)).isoformat()
+        except ValueError:
+            raise ValueError("horizon.start_date must be an ISO date (YYYY-MM-DD)")
+    
+    try:
+        length = int(horizon.get("days", 7))
+        max_consecutive = horizon.get("max_consecutive_days")
+        if max_consecutive is not None:
+            max_consecutive = int(max_consecutive)
+    except (TypeError, ValueError):
+        raise ValueError("horizon.days and horizon.max_consecutive_days must be whole numbers")
+    
+    if not 1 <= length <= MAX_HORIZON_DAYS:
+        raise ValueError(f"horizon.days must be between 1 and {MAX_HORIZON_DAYS}")
+    if max_consecutive is not None and max_consecutive < 1:
+        raise ValueError("horizon.max_consecutive_days must be at least 1")
+    
+    return {"start_date": start_date, "days": length, "max_consecutive_days": max_consecutive}
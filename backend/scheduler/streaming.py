@@ -0,0 +1,144 @@
+import json
+import queue
+import time
+
+from asgiref.sync import sync_to_async
+
+
+class RotaStream:
+    """
+    Relays a streamed solve's progress to its response as it runs
+
+    The solve is an ordinary job on the solver queue (see
+    SolveJobQueue.submit), so it shares the queue's workers, limits and
+    result cache; its worker sends each improving rota back over the job's
+    ProgressChannel. The response reads them as Server-Sent Events:
+    "started", a "solution" for every improving rota, then one "result" (or
+    "error"). A solve still going after `timeout` seconds ends the stream
+    with an "error" giving the job's status_url, where its result can be
+    collected later.
+    """
+
+    # Seconds between checks for the job finishing while no progress arrives
+    POLL_SECONDS = 0.25
+
+    def __init__(self, queue, job, timeout):
+        self.queue = queue
+        self.job = job
+        self.id = job["id"]
+        self.timeout = timeout
+        self._started = time.monotonic()
+        self._pending = [("started", {"stream_id": self.id, "employees": job["employees"]})]
+        self._ended = False
+
+    def stop(self):
+        """End the search early; the result is the best rota found so far"""
+        self.queue.stop(self.job)
+
+    def _outcome(self):
+        try:
+            return "result", self.queue.result(self.job, timeout=0)
+        except Exception as e:
+            return "error", {"error": f"Server error during rota generation: {e}"}
+
+    def _timed_out(self):
+        return "error", {
+            "error": "Rota generation timed out",
+            "message": "The solver took too long. Its result will be available from the job API.",
+            "job_id": self.id,
+            "status_url": f"/api/rota-jobs/{self.id}/",
+        }
+
+    def _next_event(self, heartbeat):
+        """The next (event, data) for the response, or None if there is none within heartbeat seconds"""
+        channel = self.job.get("progress")
+        wake_at = time.monotonic() + heartbeat
+        while True:
+            # Progress is sent before the job finishes, so drain it first
+            finished = self.job["done"].is_set()
+            if channel is not None:
+                try:
+                    return channel.events.get(timeout=0 if finished else self.POLL_SECONDS)
+                except queue.Empty:
+                    pass
+            else:
+                self.job["done"].wait(self.POLL_SECONDS)
+            if finished:
+                self._ended = True
+                return self._outcome()
+            if self.timeout is not None and time.monotonic() - self._started > self.timeout:
+                # The job carries on, so the stream does not stop it
+                self._ended = True
+                return self._timed_out()
+            if time.monotonic() >= wake_at:
+                return None
+
+    def _next_chunk(self, heartbeat):
+        """The next Server-Sent Events chunk, a keep-alive comment, or None at the end"""
+        if self._pending:
+            event = self._pending.pop(0)
+        elif self._ended:
+            return None
+        else:
+            event = self._next_event(heartbeat)
+        if event is None:
+            return ": keep-alive\n\n"
+        event, data = event
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def events(self, heartbeat=15):
+        """
+        Iterate over the stream's chunks, for WSGI servers
+
+        Closing the iterator early (the client went away) stops the search.
+        """
+        try:
+            while (chunk := self._next_chunk(heartbeat)) is not None:
+                yield chunk
+        finally:
+            if not self._ended:
+                self.stop()
+
+    async def aevents(self, heartbeat=15):
+        """As events(), for ASGI servers, which would otherwise buffer a sync iterator whole"""
+        next_chunk = sync_to_async(self._next_chunk, thread_sensitive=False)
+        try:
+            while (chunk := await next_chunk(heartbeat)) is not None:
+                yield chunk
+        finally:
+            if not self._ended:
+                self.stop()
+
+
+def start_stream(queue, employees_data, options, finish=None, preview_interval=1.0, timeout=None):
+    """
+    Submit a streamed solve to the job queue and return its RotaStream
+
+    Args:
+        queue: SolveJobQueue to solve on
+        employees_data: Employee list, as for solve_rota
+        options: solve_rota keyword arguments
+        finish: Optional job finish hook (see SolveJobQueue.submit)
+        preview_interval: Minimum seconds between rota previews
+        timeout: Seconds before the stream gives up waiting for the result
+
+    Raises:
+        QueueFullError, QueueUnavailableError: as for SolveJobQueue.submit
+    """
+    progress = queue.progress_channel(preview_interval)
+    job = queue.submit(employees_data, finish=finish, progress=progress, **options)
+    return RotaStream(queue, job, timeout)
+
+
+async def iterate_async(iterator):
+    """
+    Serve a blocking iterator to an ASGI response one item at a time
+
+    Django reads a sync iterator into a list before sending it under ASGI.
+    Items are fetched on the thread the view ran on, which holds its
+    database connection, so iterators over querysets keep working.
+    """
+    next_item = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (item := await next_item(iterator, done)) is not done:
+        yield item
@@ -0,0 +1,308 @@
+import abc
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+
+logger = logging.getLogger("scheduler.telemetry")
+
+# Histogram buckets: seconds for timings, counts for model sizes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+
+PROFILE_LINES = 40
+
+
+class PhaseClock:
+    """
+    Times the consecutive phases of a solve
+
+    Call lap(phase) at the end of each phase; the time since the previous
+    lap is added to that phase. Extra details (model size, search stats)
+    can be attached with note().
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = {}
+        self.details = {}
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def note(self, key, value):
+        self.details[key] = value
+
+    def report(self):
+        """Serialisable summary for the "telemetry" key of a result"""
+        return {
+            "phases": {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            **self.details,
+        }
+
+
+def model_statistics(model):
+    """Size of a CP-SAT model"""
+    proto = model.Proto()
+    return {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+
+
+def search_statistics(solver):
+    """Counters from a finished CP-SAT search (see CpSolver.ResponseStats)"""
+    response = solver.ResponseProto()
+    return {
+        "booleans": response.num_booleans,
+        "conflicts": response.num_conflicts,
+        "branches": response.num_branches,
+        "restarts": response.num_restarts,
+        "binary_propagations": response.num_binary_propagations,
+        "integer_propagations": response.num_integer_propagations,
+        "lp_iterations": response.num_lp_iterations,
+        "deterministic_time": response.deterministic_time,
+        "user_time": response.user_time,
+    }
+
+
+def profile_call(func, *args, **kwargs):
+    """
+    Run func under cProfile
+
+    Returns:
+        (result, report) where report is the top of the profile sorted by
+        cumulative time, as text
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return result, out.getvalue()
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Emit one structured log line: a JSON object with an "event" name"""
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"event": event, **fields}, default=str))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    """Base for metrics keyed by a fixed tuple of label names"""
+
+    type = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labels)
+
+    @abc.abstractmethod
+    def samples(self):
+        """Yield (name suffix, label pairs, value) for rendering"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", key, value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, buckets, labels=()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            for bound, count in zip(self.buckets, counts):
+                yield "_bucket", key + (("le", _format_value(float(bound))),), count
+            yield "_sum", key, total
+            yield "_count", key, counts[-1]
+
+
+class CallbackMetric(Metric):
+    """
+    A metric read from elsewhere when /metrics is scraped
+
+    callback returns {label values tuple: value}, or a bare number when the
+    metric has no labels. Used for counts the cache and job queue already
+    keep, so they are not tracked twice.
+    """
+
+    def __init__(self, name, help, type, callback, labels=()):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            yield "", tuple(zip(self.labels, key)), value
+
+
+class MetricsRegistry:
+    """
+    Metrics for this process, rendered in the Prometheus text format
+
+    Each web process keeps its own registry, so with several processes
+    every one must be scraped (or the values summed) separately.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, buckets=DURATION_BUCKETS, labels=()):
+        return self._add(Histogram(name, help, buckets, labels))
+
+    def callback(self, name, help, type, callback, labels=()):
+        return self._add(CallbackMetric(name, help, type, callback, labels))
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Failed to collect metric %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SOLVES = REGISTRY.counter(
+    "rota_solves_total", "Finished rota solves by result status", labels=("status",))
+SOLVE_SECONDS = REGISTRY.histogram(
+    "rota_solve_seconds", "Time spent inside solve_rota")
+PHASE_SECONDS = REGISTRY.histogram(
+    "rota_solve_phase_seconds", "Time spent in each phase of a rota request", labels=("phase",))
+MODEL_VARIABLES = REGISTRY.histogram(
+    "rota_model_variables", "Variables in each CP-SAT model built", SIZE_BUCKETS)
+MODEL_CONSTRAINTS = REGISTRY.histogram(
+    "rota_model_constraints", "Constraints in each CP-SAT model built", SIZE_BUCKETS)
+JOBS = REGISTRY.counter(
+    "rota_jobs_total", "Jobs accepted by the solver queue by how they completed", labels=("outcome",))
+JOB_SECONDS = REGISTRY.histogram(
+    "rota_job_seconds", "Time from submitting a job to its result, including queueing")
+QUEUE_REJECTIONS = REGISTRY.counter(
+    "rota_queue_rejections_total", "Solves refused by the job queue", labels=("reason",))
+PORTFOLIO_WINS = REGISTRY.counter(
+    "rota_portfolio_wins_total", "Portfolio solves won by each search strategy", labels=("strategy",))
+
+
+def observe_solve(result, job_seconds=None, **context):
+    """
+    Record a finished solve in the metrics registry and the structured log
+
+    Args:
+        result: solve_rota result dict
+        job_seconds: time from submission to completion, if it went through
+            the job queue
+        context: extra fields for the log line (job id, employee count, ...)
+    """
+    telemetry = result.get("telemetry") or {}
+    SOLVES.inc(status=result.get("status", "unknown"))
+    if "total_seconds" in telemetry:
+        SOLVE_SECONDS.observe(telemetry["total_seconds"])
+    for phase, seconds in telemetry.get("phases", {}).items():
+        PHASE_SECONDS.observe(seconds, phase=phase)
+    model = telemetry.get("model")
+    if model:
+        MODEL_VARIABLES.observe(model["variables"])
+        MODEL_CONSTRAINTS.observe(model["constraints"])
+    if job_seconds is not None:
+        JOB_SECONDS.observe(job_seconds)
+
+    stats = result.get("solver_stats") or {}
+    if stats.get("portfolio"):
+        PORTFOLIO_WINS.inc(strategy=stats["strategy"])
+    log_event(
+        "rota_solve",
+        status=result.get("status"),
+        profile=stats.get("profile"),
+        strategy=stats.get("strategy"),
+        random_seed=stats.get("random_seed"),
+        objective=stats.get("objective"),
+        gap=stats.get("gap"),
+        job_seconds=job_seconds,
+        telemetry=telemetry,
+        **context,
+    )
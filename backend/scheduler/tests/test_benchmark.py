@@ -0,0 +1,81 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from ..benchmark import case_name, compare_runs, generate_workload, resolve_case, run_case
+from ..precheck import precheck_problem
+from ..rota_solver import prepare_problem, solve_rota
+from .utils import fast_options
+
+
+def run_record(**case):
+    return {"cases": [{"name": "e20-d7", "status": "optimal", "build_seconds": 0.1, "solve_seconds": 1.0,
+                       "objective": 10, **case}]}
+
+
+class WorkloadTests(SimpleTestCase):
+    def test_same_case_builds_the_same_workload(self):
+        case = {"employees": 30, "days": 14, "must_work_density": 0.1}
+        self.assertEqual(generate_workload(case), generate_workload(case))
+        self.assertNotEqual(generate_workload(case)[0], generate_workload({**case, "seed": 2})[0])
+
+    def test_case_name_lists_only_changed_parameters(self):
+        self.assertEqual(case_name(resolve_case({"employees": 50})), "e50-d7")
+        self.assertEqual(case_name(resolve_case({"employees": 50, "days": 28, "holiday_density": 0.15,
+                                                 "infeasible": "solver"})),
+                         "e50-d28-hol0.15-infeasible-solver")
+
+    def test_bad_parameters_are_refused(self):
+        for case in ({"staff": 5}, {"employees": 1}, {"infeasible": "sometimes"}, {"holiday_density": 2}):
+            with self.assertRaises(ValueError):
+                resolve_case(case)
+
+    def test_feasible_workload_solves(self):
+        result = run_case({"employees": 20}, fast_options())
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertEqual(result["expected"], "solution")
+        self.assertGreater(result["variables"], 0)
+
+    def test_precheck_mode_is_caught_before_the_model(self):
+        employees, options = generate_workload({"employees": 20, "infeasible": "precheck"})
+        self.assertTrue(precheck_problem(prepare_problem(employees, options["horizon"], options["template"])))
+
+    def test_solver_mode_passes_the_precheck_but_has_no_solution(self):
+        employees, options = generate_workload({"employees": 20, "infeasible": "solver"})
+        self.assertEqual(precheck_problem(prepare_problem(employees, options["horizon"], options["template"])), [])
+        result = solve_rota(employees, fast_options(), **options)
+        self.assertEqual(result["status"], "no_solution")
+        self.assertTrue(result["conflicts"])
+
+
+class CompareRunsTests(SimpleTestCase):
+    def test_slower_solve_is_a_regression(self):
+        regressions = compare_runs(run_record(solve_seconds=1.5), run_record())
+        self.assertEqual([(r["metric"], r["current"]) for r in regressions], [("solve_seconds", 1.5)])
+
+    def test_noise_on_short_timings_is_ignored(self):
+        self.assertEqual(compare_runs(run_record(build_seconds=0.14), run_record()), [])
+
+    def test_changed_status_and_worse_objective_are_regressions(self):
+        regressions = compare_runs(run_record(status="feasible", objective=12), run_record())
+        self.assertEqual({r["metric"] for r in regressions}, {"status", "objective"})
+
+    def test_command_fails_on_a_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "run.json"
+            call_command("benchmark_rota", case=['{"employees": 6}'], profile="fast", output=str(output),
+                         stdout=StringIO())
+            run = json.loads(output.read_text())
+            self.assertEqual([case["name"] for case in run["cases"]], ["e6-d7"])
+
+            # A baseline that solved in no time makes this run a regression
+            run["cases"][0].update(solve_seconds=0.0, build_seconds=0.0, objective=-1)
+            baseline = Path(tmp) / "baseline.json"
+            baseline.write_text(json.dumps(run))
+            with self.assertRaises(CommandError):
+                call_command("benchmark_rota", case=['{"employees": 6}'], profile="fast",
+                             baseline=str(baseline), stdout=StringIO())
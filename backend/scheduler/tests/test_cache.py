@@ -0,0 +1,103 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..cache import DjangoCacheBackend, InProcessBackend, RotaResultCache, make_cache_key
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_fairness_weights, resolve_horizon
+from .utils import employees, fast_options, post_json
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "rota-tests"},
+}
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_equivalent_configs_share_a_key(self):
+        staff = employees()
+        reordered = [dict(reversed(list(emp.items()))) for emp in reversed(staff)]
+        for emp in reordered:
+            emp["days_off"] = [str(d) for d in reversed(emp["days_off"])]
+            emp["must_work_shifts"] = list(reversed(emp["must_work_shifts"]))
+            emp["max_shifts"] = str(emp["max_shifts"])
+            emp["notes"] = "ignored by the solver"
+        self.assertEqual(make_cache_key(staff), make_cache_key(reordered))
+
+    def test_solver_inputs_change_the_key(self):
+        staff = employees()
+        changed = employees()
+        changed[0]["max_shifts"] -= 1
+        self.assertNotEqual(make_cache_key(staff), make_cache_key(changed))
+        self.assertNotEqual(make_cache_key(staff, {"horizon": {"days": 7}}),
+                            make_cache_key(staff, {"horizon": {"days": 14}}))
+
+    def test_hit_follows_the_callers_employee_order(self):
+        cache = RotaResultCache(InProcessBackend(max_entries=8))
+        staff = employees()
+        fairness = {"weights": resolve_fairness_weights({}), "history": {}}
+        result = solve_rota(staff, fast_options(), horizon=resolve_horizon({}),
+                            template=get_shift_template("default"), fairness=fairness)
+        self.assertIsNone(cache.get(staff))
+        cache.set(staff, result)
+
+        reordered = list(reversed(employees()))
+        names = [emp["name"] for emp in reordered]
+        hit = cache.get(reordered)
+        self.assertEqual([row[0] for row in hit["table"]], names)
+        for field in ("shift_totals", "evening_totals", "weekly_totals"):
+            self.assertEqual(list(hit[field]), names, field)
+            self.assertEqual(hit[field], result[field], field)
+        for metric, totals in hit["fairness"].items():
+            self.assertEqual(list(totals), names, metric)
+        self.assertEqual(list(dict.fromkeys(a["employee"] for a in hit["assignments"])),
+                         [name for name in names if result["shift_totals"][name]])
+        self.assertEqual(sorted(hit["assignments"], key=lambda a: (a["employee"], a["day"], a["shift"])),
+                         sorted(result["assignments"], key=lambda a: (a["employee"], a["day"], a["shift"])))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_stopped_and_failed_results_are_not_cached(self):
+        cache = RotaResultCache(InProcessBackend(max_entries=8))
+        staff = employees()
+        cache.set(staff, {"status": "feasible", "stopped": True})
+        cache.set(staff, {"status": "error"})
+        self.assertIsNone(cache.get(staff))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DjangoCacheBackendTests(SimpleTestCase):
+    def tearDown(self):
+        caches["default"].clear()
+
+    def test_clear_keeps_the_rest_of_the_cache(self):
+        shared = caches["default"]
+        shared.set("session:abc", "someone else's data")
+        cache = RotaResultCache(DjangoCacheBackend("default", ttl=60))
+        cache.set(employees(), {"status": "optimal", "table": []})
+        self.assertIsNotNone(cache.get(employees()))
+
+        cache.clear()
+        self.assertIsNone(cache.get(employees()))
+        self.assertEqual(shared.get("session:abc"), "someone else's data")
+
+        # Later results are cached under the new generation
+        cache.set(employees(), {"status": "optimal", "table": []})
+        self.assertIsNotNone(cache.get(employees()))
+
+    def test_processes_share_results_and_clears(self):
+        first = DjangoCacheBackend("default")
+        second = DjangoCacheBackend("default")
+        first.set("key", {"status": "optimal"})
+        self.assertEqual(second.get("key"), {"status": "optimal"})
+        second.clear()
+        self.assertIsNone(first.get("key"))
+
+
+class RotaRequestEmployeeTests(TestCase):
+    def test_malformed_employees_are_400(self):
+        for change in ({"max_shifts": "lots"}, {"max_shifts": -1}, {"days_off": "Mon"},
+                       {"must_work_shifts": [[1]]}, {"name": ""}):
+            staff = employees()
+            staff[0].update(change)
+            for url in ("/api/generate-rota/", "/api/rota-jobs/"):
+                response = post_json(self.client, url, {"employees": staff})
+                self.assertEqual(response.status_code, 400, (change, response.content))
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from ortools.sat.python import cp_model
+
+from .. import rota_solver
+from ..rota_solver import MIN_DIAGNOSIS_SECONDS, solve_rota
+from ..solver_options import resolve_horizon
+from .utils import SINGLE_TEMPLATE, fast_options
+
+# Ann alone can cover Tuesday to Friday, which the rest rule forbids
+STAFF = [
+    {"name": "Ann", "is_supervisor": False, "max_shifts": 7},
+    {"name": "Ben", "is_supervisor": False, "max_shifts": 7, "days_off": [1, 2, 3, 4]},
+]
+
+
+def solve(**overrides):
+    return solve_rota(STAFF, fast_options(**overrides), horizon=resolve_horizon({"max_consecutive_days": 3}),
+                      template=SINGLE_TEMPLATE)
+
+
+class DiagnosisTests(SimpleTestCase):
+    def test_reports_a_minimal_conflict_set(self):
+        result = solve()
+        self.assertEqual(result["status"], "no_solution")
+        self.assertTrue(result["diagnosis_complete"])
+        conflicts = {(c["employee"], c["constraint"], c["day"]) for c in result["conflicts"]}
+        self.assertEqual(conflicts, {
+            ("Ann", "max_consecutive_days", None),
+            ("Ben", "days_off", "Tue"),
+            ("Ben", "days_off", "Wed"),
+            ("Ben", "days_off", "Thu"),
+            ("Ben", "days_off", "Fri"),
+        })
+
+    def test_diagnosis_gets_a_minimum_time_budget(self):
+        with mock.patch("scheduler.rota_solver.find_conflicting_constraints",
+                        wraps=rota_solver.find_conflicting_constraints) as diagnose:
+            result = solve(max_time_in_seconds=0.1)
+        self.assertGreaterEqual(diagnose.call_args.args[2], MIN_DIAGNOSIS_SECONDS)
+        self.assertTrue(result["diagnosis_complete"])
+
+    def test_unproven_infeasibility_blames_nothing(self):
+        with mock.patch("scheduler.rota_solver._probe_feasibility", return_value=(cp_model.UNKNOWN, set())):
+            result = solve()
+        self.assertEqual(result["status"], "no_solution")
+        self.assertEqual(result["conflicts"], [])
+        self.assertFalse(result["diagnosis_complete"])
+        self.assertIn("ran out of time", result["message"])
+
+    def test_unfinished_minimisation_is_marked_incomplete(self):
+        probe = rota_solver._probe_feasibility
+        calls = []
+
+        def first_probe_only(model, literals, deadline):
+            calls.append(literals)
+            return probe(model, literals, deadline) if len(calls) == 1 else (cp_model.UNKNOWN, set())
+
+        with mock.patch("scheduler.rota_solver._probe_feasibility", side_effect=first_probe_only):
+            result = solve()
+        self.assertTrue(result["conflicts"])
+        self.assertFalse(result["diagnosis_complete"])
+        self.assertIn("may not be needed", result["message"])
@@ -0,0 +1,53 @@
+import json
+
+from django.test import TestCase
+
+from ..cache import get_employee_config_cache
+from ..models import Employee
+from .utils import employees, post_json
+
+
+class EmployeeConditionalRequestTests(TestCase):
+    def setUp(self):
+        response = post_json(self.client, "/api/employees/", employees())
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_answers_if_none_match_with_304(self):
+        response = self.client.get("/api/employees/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+        response = self.client.get("/api/employees/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_save_with_stale_if_match_is_412(self):
+        etag = self.client.get("/api/employees/")["ETag"]
+        staff = employees()
+        staff[0]["max_shifts"] = 4
+        self.assertEqual(post_json(self.client, "/api/employees/", staff, HTTP_IF_MATCH=etag).status_code, 200)
+
+        staff[0]["max_shifts"] = 3
+        response = post_json(self.client, "/api/employees/", staff, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(json.loads(self.client.get("/api/employees/").content)[0]["max_shifts"], 4)
+
+    def test_detail_patch_with_stale_if_match_is_412(self):
+        etag = self.client.get("/api/employees/George/")["ETag"]
+        response = self.client.patch("/api/employees/George/", json.dumps({"max_shifts": 4}),
+                                     content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.client.patch("/api/employees/George/", json.dumps({"max_shifts": 3}),
+                                     content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+
+    def test_changes_made_elsewhere_change_the_etag(self):
+        cache = get_employee_config_cache()
+        first = cache.get()
+        self.assertIs(cache.get(), first)
+
+        # As the admin or another process would, without invalidating this cache
+        Employee.objects.create(name="Zed", is_supervisor=False, max_shifts=2, position=99)
+        response = self.client.get("/api/employees/", HTTP_IF_NONE_MATCH=first["etag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[-1]["name"], "Zed")
@@ -0,0 +1,90 @@
+import csv
+import io
+import zipfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..exports import COLUMNS, _ics_line, _ics_text, stream_csv
+from ..models import Rota
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fast_options
+
+
+class RotaExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        template = get_shift_template("default")
+        dated = solve_rota(employees(), fast_options(), horizon=resolve_horizon({"start_date": "2025-06-02"}),
+                           template=template)
+        undated = solve_rota(employees(), fast_options(), horizon=resolve_horizon({}), template=template)
+        cls.rota = Rota.save_result(dated)
+        cls.undated = Rota.save_result(undated)
+        cls.shifts = len(dated["assignments"])
+        cls.george_shifts = sum(1 for a in dated["assignments"] if a["employee"] == "George")
+
+    def content(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_has_every_shift_with_its_times(self):
+        rows = list(csv.reader(io.StringIO(self.content(f"/api/rotas/{self.rota.id}/export/csv/").decode())))
+        self.assertEqual(rows[0], COLUMNS)
+        self.assertEqual(len(rows) - 1, self.shifts)
+        first = dict(zip(COLUMNS, rows[1]))
+        self.assertEqual((first["Date"], first["Day"], first["Shift"]), ("2025-06-02", "Mon", "Morning"))
+        self.assertEqual((first["Start"], first["End"], first["Hours"]), ("09:00", "17:30", "8.5"))
+        self.assertEqual(rows[-1][2], "2025-06-08")
+
+    def test_xlsx_is_a_workbook_of_the_shifts(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.content(f"/api/rotas/{self.rota.id}/export/xlsx/")))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row "), self.shifts + 1)
+        self.assertIn("<t>George</t>", sheet)
+
+    def test_ics_has_one_event_per_shift(self):
+        feed = self.content(f"/api/rotas/{self.rota.id}/export/ics/?employee=George").decode()
+        self.assertEqual(feed.count("BEGIN:VEVENT"), self.george_shifts)
+        # George must work the Tuesday and Wednesday mornings
+        self.assertIn("DTSTART:20250603T090000", feed)
+        self.assertIn("DTSTART:20250604T080000", feed)
+
+    def test_ics_of_an_undated_rota_is_400(self):
+        response = self.client.get(f"/api/rotas/{self.undated.id}/export/ics/?employee=George")
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_rota_or_format_is_refused(self):
+        self.assertEqual(self.client.get("/api/rotas/999999/export/csv/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/rotas/{self.rota.id}/export/pdf/").status_code, 400)
+        # Calendar feeds are per employee
+        self.assertEqual(self.client.get(f"/api/rotas/{self.rota.id}/export/ics/").status_code, 400)
+
+    def test_range_export_covers_accepted_rotas(self):
+        url = "/api/rotas/export/csv/?start=2025-06-02&end=2025-06-08"
+        self.assertEqual(len(self.content(url).decode().splitlines()), 1)
+        self.assertEqual(len(self.content(url + "&accepted=false").decode().splitlines()), self.shifts + 1)
+        self.assertEqual(self.client.post(f"/api/rotas/{self.rota.id}/accept/").status_code, 200)
+        self.assertEqual(len(self.content(url).decode().splitlines()), self.shifts + 1)
+
+
+class ExportFormatTests(SimpleTestCase):
+    def test_csv_streams_in_chunks(self):
+        row = {"rota_id": 1, "employee": "Ann", "date": None, "day": "Mon", "shift": "Day",
+               "start": None, "end": None, "minutes": 480, "evening": False}
+        with mock.patch("scheduler.exports.CHUNK_ROWS", 2):
+            chunks = list(stream_csv([row] * 5))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual("".join(chunks).splitlines()[0], ",".join(COLUMNS))
+        self.assertEqual(len("".join(chunks).splitlines()), 6)
+
+    def test_ics_lines_are_escaped_and_folded(self):
+        self.assertEqual(_ics_text("Late; bar, till\n2"), "Late\\; bar\\, till\\n2")
+        line = _ics_line("DESCRIPTION:" + "é" * 60)
+        parts = line.removesuffix("\r\n").split("\r\n ")
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(len(part.encode("utf-8")) <= 75 for part in parts))
+        self.assertEqual("".join(parts), "DESCRIPTION:" + "é" * 60)
@@ -0,0 +1,87 @@
+import json
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..models import EmployeeHistory, Rota
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_fairness_weights, resolve_horizon
+from ..views import parse_rota_request
+from .utils import employees, fast_options, post_json
+
+
+def solve(history=None):
+    fairness = {"weights": resolve_fairness_weights(None), "history": history} if history is not None else None
+    return solve_rota(employees(), fast_options(max_time_in_seconds=1), horizon=resolve_horizon({}),
+                      template=get_shift_template("default"), fairness=fairness)
+
+
+class FairnessObjectiveTests(SimpleTestCase):
+    def test_history_moves_evenings_away(self):
+        plain = solve({})
+        history = {"George": {"evenings": 30, "weekends": 0, "hours": 0}}
+        fair = solve(history)
+        self.assertEqual(fair["status"], "optimal")
+        self.assertLess(fair["evening_totals"]["George"], plain["evening_totals"]["George"])
+        # Reported totals include the history carried in
+        self.assertEqual(fair["fairness"]["evenings"]["George"], 30 + fair["evening_totals"]["George"])
+
+    def test_fairness_is_opt_in(self):
+        self.assertNotIn("fairness", solve())
+        self.assertNotIn("fairness", parse_rota_request(employees())[1])
+        with self.assertRaises(ValueError):
+            parse_rota_request({"employees": employees(), "fairness": {"overtime": 1}})
+
+
+class HistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.result = solve()
+        cls.hours = {name: 0.0 for name in cls.result["shift_totals"]}
+        for a in cls.result["assignments"]:
+            cls.hours[a["employee"]] += a["minutes"] / 60
+
+    def setUp(self):
+        self.rota = Rota.save_result(self.result)
+
+    def accept(self, rota):
+        return self.client.post(f"/api/rotas/{rota.id}/accept/")
+
+    def history(self):
+        return {h["employee"]: h for h in json.loads(self.client.get("/api/employee-history/").content)}
+
+    def test_accept_adds_the_rota_once(self):
+        response = self.accept(self.rota)
+        self.assertEqual(response.status_code, 200)
+        worked = [name for name, total in self.result["shift_totals"].items() if total]
+        self.assertEqual(json.loads(response.content)["employees"], len(worked))
+        history = self.history()
+        self.assertEqual(set(history), set(worked))
+        for name in worked:
+            self.assertEqual(history[name]["evenings"], self.result["evening_totals"][name])
+            self.assertAlmostEqual(history[name]["hours"], self.hours[name])
+            self.assertEqual(history[name]["rotas"], 1)
+
+        self.assertEqual(self.accept(self.rota).status_code, 409)
+        self.assertEqual(self.history()["George"]["rotas"], 1)
+        self.assertEqual(self.client.post("/api/rotas/999999/accept/").status_code, 404)
+
+    @override_settings(ROTA_HISTORY_DECAY=0.5)
+    def test_accept_decays_only_this_rotas_employees(self):
+        EmployeeHistory.objects.create(employee_name="George", evenings=10, weekends=4, hours=80, rotas=2)
+        EmployeeHistory.objects.create(employee_name="Zed", evenings=10, weekends=4, hours=80, rotas=2)
+        self.assertEqual(self.accept(self.rota).status_code, 200)
+
+        history = self.history()
+        self.assertEqual(history["George"]["evenings"], 5 + self.result["evening_totals"]["George"])
+        self.assertAlmostEqual(history["George"]["hours"], 40 + self.hours["George"])
+        # Zed is not in this rota, e.g. on another team
+        self.assertEqual((history["Zed"]["evenings"], history["Zed"]["hours"], history["Zed"]["rotas"]), (10, 80, 2))
+
+    def test_fair_request_reads_the_history(self):
+        self.accept(self.rota)
+        _, options = parse_rota_request({"employees": employees(), "fairness": True})
+        self.assertEqual(options["fairness"]["history"]["George"]["evenings"],
+                         self.result["evening_totals"]["George"])
+        self.assertEqual(post_json(self.client, "/api/generate-rota/",
+                                   {"employees": employees(), "fairness": "yes"}).status_code, 400)
@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase
+
+from ..problem import build_calendar, prepare_problem
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import SINGLE_TEMPLATE, employees, fast_options
+
+
+class CalendarTests(SimpleTestCase):
+    def test_undated_horizon_is_whole_weeks_from_monday(self):
+        calendar = build_calendar(resolve_horizon({"days": 14}))
+        self.assertEqual([day["week"] for day in calendar], [0] * 7 + [1] * 7)
+        self.assertEqual((calendar[7]["weekday"], calendar[7]["label"], calendar[7]["date"]), (0, "Mon (wk 2)", None))
+        self.assertEqual(build_calendar(resolve_horizon({}))[6]["label"], "Sun")
+
+    def test_dated_horizon_has_partial_calendar_weeks(self):
+        # Wednesday 4 June to Friday 13 June
+        calendar = build_calendar(resolve_horizon({"start_date": "2025-06-04", "days": 10}))
+        self.assertEqual([day["week"] for day in calendar], [0] * 5 + [1] * 5)
+        self.assertEqual((calendar[0]["weekday"], calendar[0]["label"]), (2, "Wed 4 Jun"))
+        self.assertEqual(calendar[-1]["date"], "2025-06-13")
+
+    def test_bad_horizons_are_refused(self):
+        for horizon in ({"days": 0}, {"days": 85}, {"start_date": "4 June"}, {"max_consecutive_days": 0},
+                        {"weeks": 2}):
+            with self.assertRaises(ValueError, msg=horizon):
+                resolve_horizon(horizon)
+
+    def test_days_off_repeat_and_dates_map_to_days(self):
+        staff = [{"name": "Ann", "is_supervisor": False, "max_shifts": 5, "days_off": [0],
+                  "holidays": ["2025-06-10", "2025-07-01"], "must_work_shifts": [["2025-06-11", 1], [20, 0]]}]
+        problem = prepare_problem(staff, resolve_horizon({"start_date": "2025-06-04", "days": 14}),
+                                  get_shift_template("default"))
+        self.assertEqual(problem["days_off"][0], {5, 12})
+        self.assertEqual(problem["holidays"][0], {6})
+        self.assertEqual(problem["must_work_shifts"][0], [(7, 1)])
+        self.assertEqual(problem["weeks"], [[0, 1, 2, 3, 4], list(range(5, 12)), [12, 13]])
+
+
+class MultiWeekSolveTests(SimpleTestCase):
+    def test_weekly_caps_hold_in_every_week(self):
+        # Any rota will do, so skip proving it optimal
+        result = solve_rota(employees(), fast_options(max_time_in_seconds=0.5),
+                            horizon=resolve_horizon({"days": 14}), template=get_shift_template("default"))
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertEqual(len(result["headers"]), 15)
+        for emp in employees():
+            weeks = result["weekly_totals"][emp["name"]]
+            self.assertEqual(len(weeks), 2)
+            self.assertTrue(all(total <= emp["max_shifts"] for total in weeks), (emp["name"], weeks))
+
+    def test_rest_rule_applies_across_the_week_boundary(self):
+        # With Ben away from Saturday to Tuesday, Ann must work four days in a row
+        staff = [
+            {"name": "Ann", "is_supervisor": False, "max_shifts": 7},
+            {"name": "Ben", "is_supervisor": False, "max_shifts": 7, "holidays": [5, 6, 7, 8]},
+        ]
+
+        def solve(max_consecutive):
+            return solve_rota(staff, fast_options(), template=SINGLE_TEMPLATE,
+                              horizon=resolve_horizon({"days": 14, "max_consecutive_days": max_consecutive}))
+
+        self.assertIn(solve(4)["status"], ("optimal", "feasible"))
+        result = solve(3)
+        self.assertEqual(result["status"], "no_solution")
+        self.assertIn(("Ann", "max_consecutive_days"), {(c["employee"], c["constraint"]) for c in result["conflicts"]})
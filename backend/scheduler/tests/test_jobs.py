@@ -0,0 +1,87 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+
+from ..cache import InProcessBackend, RotaResultCache
+from ..jobs import QueueFullError, QueueUnavailableError
+from ..models import Rota
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fake_queue, fast_options, post_json
+
+
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class JobQueueTests(TestCase):
+    def test_full_queue_refuses_more_solves(self, _):
+        queue = fake_queue(max_queued=1)
+        queue.submit(employees())
+        queue.submit(employees())
+        with self.assertRaises(QueueFullError):
+            queue.submit(employees())
+
+        queue._executor.finish(queue._executor.futures[0], {"status": "optimal"})
+        queue.submit(employees())
+
+    def test_broken_pool_is_unavailable_and_replaced(self, _):
+        queue = fake_queue(broken=True)
+        with self.assertRaises(QueueUnavailableError):
+            queue.submit(employees())
+        self.assertIsNone(queue._executor)
+
+    def test_full_queue_is_429_with_retry_after(self, _):
+        queue = fake_queue()
+        queue.submit(employees())
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            for url in ("/api/rota-jobs/", "/api/generate-rota/"):
+                response = post_json(self.client, url, employees())
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(response["Retry-After"], "5")
+
+    def test_broken_pool_is_503(self, _):
+        with mock.patch("scheduler.views.get_job_queue", side_effect=lambda: fake_queue(broken=True)):
+            for url in ("/api/rota-jobs/", "/api/generate-rota/"):
+                self.assertEqual(post_json(self.client, url, employees()).status_code, 503)
+
+    def test_cached_result_finishes_without_a_solve(self, cached):
+        cache = RotaResultCache(InProcessBackend(max_entries=8))
+        cached.return_value = cache
+        calls = []
+
+        def finish(result, job_id):
+            calls.append(job_id)
+            return result if "rota_id" in result else {**result, "rota_id": len(calls)}
+
+        queue = fake_queue()
+        job = queue.submit(employees(), finish=finish)
+        queue._executor.finish(queue._executor.futures[0], {"status": "optimal", "table": []})
+        self.assertEqual(queue.result(job, timeout=1)["rota_id"], 1)
+
+        again = queue.submit(list(reversed(employees())), finish=finish)
+        self.assertEqual(len(queue._executor.futures), 1)
+        self.assertEqual(queue.result(again, timeout=0)["rota_id"], 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+# The finish hook saves the rota on the pool's thread, which needs the
+# database outside the test's transaction
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class JobApiTests(TransactionTestCase):
+    def test_job_is_queued_then_finished_with_its_rota(self, _):
+        queue = fake_queue()
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            response = post_json(self.client, "/api/rota-jobs/", employees())
+            self.assertEqual(response.status_code, 202)
+            job = json.loads(response.content)
+            self.assertEqual(job["status"], "queued")
+            status_url = job["status_url"]
+            self.assertEqual(json.loads(self.client.get(status_url).content)["status"], "queued")
+
+            result = solve_rota(employees(), fast_options(), horizon=resolve_horizon({}),
+                                template=get_shift_template("default"))
+            queue._executor.finish(queue._executor.futures[0], result)
+            job = json.loads(self.client.get(status_url + "?wait=1").content)
+            self.assertEqual(job["status"], "finished")
+            self.assertEqual(Rota.objects.get(id=job["rota_id"]).job_id, job["job_id"])
+            self.assertEqual(self.client.get("/api/rota-jobs/unknown/").status_code, 404)
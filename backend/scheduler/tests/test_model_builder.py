@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from ortools.sat.python import cp_model
+
+from ..benchmark import compare_builders, generate_workload
+from ..legacy_model import build_legacy_model
+from ..rota_solver import build_model, prepare_problem, set_assumption_domains
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees
+
+
+def problems():
+    staff = employees()
+    staff[0].update({"max_shifts_horizon": 9, "unavailable_shifts": [[3, 1]]})
+    staff[1].update({"floater": True, "max_evenings": [2, 1]})
+    yield "config", prepare_problem(staff, resolve_horizon({"days": 14}), get_shift_template("default"))
+    workload, options = generate_workload({"employees": 20, "days": 14, "must_work_density": 0.1})
+    yield "workload", prepare_problem(workload, options["horizon"], options["template"])
+
+
+def solve(built, fixed=None):
+    """Minimise the busiest supervisor's evenings, optionally with x fixed to another model's solution"""
+    model = built["model"]
+    set_assumption_domains(model, built["assumptions"], fixed=True)
+    if fixed is not None:
+        for day_vars, day_values in zip((v for row in built["x"] for v in row), fixed):
+            for var, value in zip(day_vars, day_values):
+                model.Add(var == value)
+    model.Minimize(built["max_evening_shifts"])
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 20
+    status = solver.Solve(model)
+    values = [[solver.Value(var) for var in day_vars] for row in built["x"] for day_vars in row] \
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+    return status, solver.ObjectiveValue() if values else None, values
+
+
+class ModelBuilderTests(SimpleTestCase):
+    def test_both_builders_make_the_same_model(self):
+        for name, problem in problems():
+            with self.subTest(name):
+                current, legacy = build_model(problem), build_legacy_model(problem)
+                self.assertEqual(len(current["model"].Proto().variables), len(legacy["model"].Proto().variables))
+                self.assertEqual([d for _, d in current["assumptions"]], [d for _, d in legacy["assumptions"]])
+                self.assertLess(len(current["model"].Proto().constraints), len(legacy["model"].Proto().constraints))
+
+                status, objective, values = solve(current)
+                self.assertEqual(status, cp_model.OPTIMAL)
+                legacy_status, legacy_objective, legacy_values = solve(legacy)
+                self.assertEqual((legacy_status, legacy_objective), (status, objective))
+
+                # Each model accepts the other's rota
+                self.assertEqual(solve(build_legacy_model(problem), values)[1], objective)
+                self.assertEqual(solve(build_model(problem), legacy_values)[1], objective)
+
+    def test_broken_rota_is_refused_by_both(self):
+        _, problem = next(problems())
+        _, _, values = solve(build_model(problem))
+        # Drop everyone's shifts on the first day, leaving it uncovered
+        values = [[0] * len(day) if i % len(problem["days"]) == 0 else day for i, day in enumerate(values)]
+        for build in (build_model, build_legacy_model):
+            self.assertEqual(solve(build(problem), values)[0], cp_model.INFEASIBLE)
+
+    def test_compare_builders_reports_both(self):
+        rows = compare_builders([{"employees": 20}])
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row["name"], "e20-d7")
+        self.assertEqual(row["variables"], row["legacy_variables"])
+        self.assertLess(row["constraints"], row["legacy_constraints"])
+        self.assertGreater(row["speedup"], 0)
+
+        out = StringIO()
+        call_command("benchmark_rota", "--case", '{"employees": 5}', "--compare-builders", stdout=out)
+        self.assertIn("e5-d7", out.getvalue())
+        self.assertIn("Overall:", out.getvalue())
@@ -0,0 +1,143 @@
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..jobs import SolveJobQueue
+from ..master_model import allocate_floaters
+from ..multisite import solve_by_team, split_teams, team_employees
+from ..problem import MAX_SUPERVISOR_EVENINGS, floater_teams, prepare_problem
+from ..rota_solver import solve_rota
+from ..shift_templates import compile_template
+from ..solver_options import resolve_horizon
+from .utils import PAIR_TEMPLATE, fast_options
+
+# One evening shift a day, which needs a supervisor
+EVENING_TEMPLATE = compile_template("evening", {"days": {"default": [
+    {"name": "Evening", "start": "18:00", "end": "23:00", "min_staff": 1, "max_staff": 2, "min_supervisors": 1,
+     "evening": True},
+]}}, 1)
+
+# An evening shift anyone may work, but nobody has to
+OPTIONAL_EVENING_TEMPLATE = compile_template("optional-evening", {"days": {"default": [
+    {"name": "Evening", "start": "18:00", "end": "23:00", "min_staff": 0, "max_staff": 1, "min_supervisors": 0,
+     "evening": True},
+]}}, 1)
+
+# A day shift worked in pairs, and an evening anyone may work alone
+TEAM_TEMPLATE = compile_template("team", {"days": {"default": [
+    {"name": "Day", "start": "09:00", "end": "17:00", "min_staff": 2, "max_staff": 2, "min_supervisors": 0},
+    {"name": "Evening", "start": "18:00", "end": "23:00", "min_staff": 0, "max_staff": 1, "min_supervisors": 0,
+     "evening": True},
+]}}, 1)
+
+
+class InlineExecutor:
+    """Stands in for the solver pool, running everything submitted to it straight away"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append(args[0])
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class FloaterAllocationTests(SimpleTestCase):
+    def test_floaters_cover_the_short_team(self):
+        staff = [
+            {"name": "Nia", "is_supervisor": True, "max_shifts": 7, "team": "north"},
+            {"name": "Ned", "is_supervisor": False, "max_shifts": 7, "team": "north"},
+            {"name": "Sam", "is_supervisor": True, "max_shifts": 7, "team": "south"},
+            {"name": "Fay", "is_supervisor": False, "max_shifts": 3, "float_teams": ["south"]},
+            {"name": "Gus", "is_supervisor": False, "max_shifts": 7, "team": "north", "float_teams": ["south"],
+             "days_off": [0]},
+        ]
+        teams, floaters = split_teams(staff)
+        self.assertEqual({team: [emp["name"] for emp in members] for team, members in teams.items()},
+                         {"north": ["Nia", "Ned"], "south": ["Sam"]})
+        self.assertEqual(floater_teams(floaters[1], list(teams)), ["north", "south"])
+
+        allocated = allocate_floaters(teams, floaters, resolve_horizon({}), PAIR_TEMPLATE)
+        self.assertEqual(allocated["shortfall"], 0)
+        allocation = allocated["allocation"]
+        self.assertEqual(set(allocation["Fay"].values()), {"south"})
+        self.assertLessEqual(len(allocation["Fay"]), 3)
+        self.assertNotIn(0, allocation["Gus"])
+        for day in range(7):
+            self.assertIn("south", [allocation[name].get(day) for name in ("Fay", "Gus")])
+
+    def test_employee_without_a_team_is_refused(self):
+        with self.assertRaises(ValueError):
+            split_teams([{"name": "Ann", "is_supervisor": True, "max_shifts": 5}])
+
+
+class FloaterEveningCapTests(SimpleTestCase):
+    # Each team's own supervisor covers 3 of its 7 evenings a week
+    STAFF = [
+        {"name": "Nia", "is_supervisor": True, "max_shifts": 7, "team": "north"},
+        {"name": "Sam", "is_supervisor": True, "max_shifts": 7, "team": "south"},
+        {"name": "Flo", "is_supervisor": True, "max_shifts": 7, "team": "north", "float_teams": ["south"]},
+    ]
+
+    def setUp(self):
+        self.horizon = resolve_horizon({"days": 14})
+        self.teams, self.floaters = split_teams(self.STAFF)
+        self.allocated = allocate_floaters(self.teams, self.floaters, self.horizon, EVENING_TEMPLATE)
+
+    def test_evening_cap_holds_across_teams(self):
+        shares = self.allocated["evening_shares"]["Flo"]
+        self.assertEqual(set(shares), {"north", "south"})
+        for week in range(2):
+            self.assertEqual(shares["north"][week] + shares["south"][week], MAX_SUPERVISOR_EVENINGS)
+            self.assertGreater(min(shares["north"][week], shares["south"][week]), 0)
+        # Both teams are 4 supervisor evenings short a week; Flo covers 3 of the 8
+        self.assertEqual(self.allocated["shortfall"], 2 * (8 - MAX_SUPERVISOR_EVENINGS))
+
+    def test_each_team_rota_keeps_to_its_share(self):
+        day_shifts = prepare_problem([], self.horizon, EVENING_TEMPLATE)["day_shifts"]
+        shares = self.allocated["evening_shares"]["Flo"]
+        for team, members in self.teams.items():
+            staff = team_employees(team, members, self.floaters, self.allocated["allocation"], day_shifts,
+                                   self.allocated["evening_shares"])
+            flo = next(emp for emp in staff if emp["name"] == "Flo")
+            self.assertEqual(flo["max_evenings"], shares[team])
+
+        # One evening more than the share is refused
+        share = shares["north"][0]
+        flo = {"name": "Flo", "is_supervisor": True, "max_shifts": 7, "floater": True,
+               "max_evenings": [share, share], "must_work_shifts": [[d, 0] for d in range(share + 1)]}
+        result = solve_rota([flo], fast_options(), horizon=self.horizon, template=OPTIONAL_EVENING_TEMPLATE)
+        self.assertEqual(result["status"], "no_solution")
+        self.assertIn(("Flo", "supervisor_rules"), [(c["employee"], c["constraint"]) for c in result["conflicts"]])
+
+        flo["must_work_shifts"] = flo["must_work_shifts"][:share]
+        result = solve_rota([flo], fast_options(), horizon=self.horizon, template=OPTIONAL_EVENING_TEMPLATE)
+        self.assertIn(result["status"], ("optimal", "feasible"))
+
+
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class SolveByTeamTests(SimpleTestCase):
+    def test_master_model_runs_on_the_solver_workers(self, _):
+        # North needs Flo at weekends, south on Mondays and Tuesdays
+        staff = [
+            {"name": "Nia", "is_supervisor": True, "max_shifts": 7, "team": "north"},
+            {"name": "Ned", "is_supervisor": False, "max_shifts": 7, "team": "north", "days_off": [5, 6]},
+            {"name": "Sam", "is_supervisor": True, "max_shifts": 7, "team": "south"},
+            {"name": "Sue", "is_supervisor": False, "max_shifts": 7, "team": "south", "days_off": [0, 1]},
+            {"name": "Sid", "is_supervisor": False, "max_shifts": 7, "team": "south", "days_off": [0, 1]},
+            {"name": "Flo", "is_supervisor": False, "max_shifts": 7, "team": "north", "float_teams": ["south"]},
+        ]
+        queue = SolveJobQueue(max_workers=1, max_queued=1, retention=60)
+        queue._executor = InlineExecutor()
+        job = queue.submit_coordinated(solve_by_team, staff, solver_options=fast_options(),
+                                       horizon=resolve_horizon({}), template=TEAM_TEMPLATE)
+        result = queue.result(job, timeout=60)
+
+        self.assertEqual(queue._executor.calls, ["allocate_floaters", "solve_rota", "solve_rota"])
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertEqual(result["solver_stats"]["master"]["shortfall"], 0)
+        teams = {a["team"] for a in result["assignments"] if a["employee"] == "Flo"}
+        self.assertEqual(teams, {"north", "south"})
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from ortools.sat.python import cp_model
+
+from ..portfolio import MAX_SEED, PortfolioRace, portfolio_runs
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fast_options
+
+
+def finished_race(*runs):
+    """A race whose runs finished, in the order given, with these (code, objective) outcomes"""
+    race = PortfolioRace(fast_options(portfolio_runs=len(runs)))
+    for i, (code, objective) in enumerate(runs):
+        race.runs[i].update(code=code, objective=objective)
+        race._finished.append(i)
+    return race
+
+
+class PortfolioRunTests(SimpleTestCase):
+    def test_runs_take_each_strategy_and_the_next_seed(self):
+        runs = portfolio_runs({"random_seed": 7, "portfolio_runs": 5})
+        self.assertEqual(runs, [("default", 7), ("core", 8), ("quick_restart", 9), ("lp", 10), ("default", 11)])
+
+    def test_seeds_wrap_round_to_zero(self):
+        runs = portfolio_runs({"random_seed": MAX_SEED - 1, "portfolio_runs": 3})
+        self.assertEqual([seed for _, seed in runs], [MAX_SEED - 1, 0, 1])
+
+    def test_proven_run_wins_over_a_better_looking_one(self):
+        race = finished_race((cp_model.FEASIBLE, 3), (cp_model.OPTIMAL, 4))
+        self.assertEqual(race._winner(), 1)
+
+    def test_best_objective_wins_at_the_deadline(self):
+        race = finished_race((cp_model.FEASIBLE, 6), (cp_model.FEASIBLE, 4), (cp_model.UNKNOWN, None))
+        self.assertEqual(race._winner(), 1)
+        race = finished_race((cp_model.UNKNOWN, None), (cp_model.UNKNOWN, None))
+        self.assertEqual(race._winner(), 0)
+
+    def test_race_fails_only_when_every_run_does(self):
+        race = PortfolioRace(fast_options(portfolio_runs=2))
+        for run in race.runs:
+            run.update(status="ERROR", error="out of memory")
+        with self.assertRaisesMessage(RuntimeError, "out of memory; out of memory"):
+            race._winner()
+
+
+class PortfolioSolveTests(SimpleTestCase):
+    def solve(self, **options):
+        return solve_rota(employees(), fast_options(**options), horizon=resolve_horizon({}),
+                          template=get_shift_template("default"))
+
+    def test_race_finds_the_same_rota_quality(self):
+        single = self.solve()
+        raced = self.solve(portfolio_runs=3, num_workers=3)
+        self.assertEqual(raced["status"], "optimal")
+        self.assertEqual(raced["solver_stats"]["objective"], single["solver_stats"]["objective"])
+        runs = raced["solver_stats"]["portfolio"]
+        self.assertEqual([(run["strategy"], run["seed"]) for run in runs], [("default", 1), ("core", 2),
+                                                                            ("quick_restart", 3)])
+        self.assertIn(raced["solver_stats"]["strategy"], [run["strategy"] for run in runs])
+        self.assertNotIn("portfolio", single["solver_stats"])
+
+    def test_failed_run_is_left_out(self):
+        make_solver = PortfolioRace._make_solver
+
+        def broken_core(race, run, num_workers):
+            if run["strategy"] == "core":
+                raise RuntimeError("solver crashed")
+            return make_solver(race, run, num_workers)
+
+        with mock.patch.object(PortfolioRace, "_make_solver", broken_core), \
+                self.assertLogs("scheduler.portfolio", "ERROR") as logs:
+            result = self.solve(portfolio_runs=2, num_workers=2)
+        self.assertIn("Portfolio run 1 (core, seed 2) failed", logs.output[0])
+        self.assertEqual(result["status"], "optimal")
+        self.assertEqual(result["solver_stats"]["strategy"], "default")
+        self.assertEqual([run["status"] for run in result["solver_stats"]["portfolio"]], ["OPTIMAL", "ERROR"])
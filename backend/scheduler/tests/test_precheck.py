@@ -0,0 +1,87 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..precheck import precheck_problem
+from ..problem import prepare_problem
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import PAIR_TEMPLATE, employees, fast_options
+
+
+def check(staff, template=PAIR_TEMPLATE, horizon=None):
+    return precheck_problem(prepare_problem(staff, resolve_horizon(horizon), template))
+
+
+class PrecheckTests(SimpleTestCase):
+    def test_sample_config_passes(self):
+        self.assertEqual(check(employees(), get_shift_template("default")), [])
+
+    def test_each_check_names_its_conflict(self):
+        sup = {"name": "Sue", "is_supervisor": True, "max_shifts": 7}
+        al = {"name": "Al", "is_supervisor": False, "max_shifts": 7}
+        cases = [
+            # Must-work shift on a holiday
+            ([{**sup, "holidays": [2], "must_work_shifts": [[2, 0]]}, al], ("must_work_shifts", "Sue", "Wed")),
+            # Shift that does not exist in the template
+            ([{**sup, "must_work_shifts": [[2, 1]]}, al], ("must_work_shifts", "Sue", "Wed")),
+            # Nobody but Sue to make up the pair
+            ([sup], ("coverage", None, "Mon")),
+            # Only supervisor away on Friday
+            ([{**sup, "days_off": [4]}, al], ("coverage", None, "Fri")),
+            # Must-work shifts beyond the weekly cap
+            ([{**sup, "max_shifts": 1, "must_work_shifts": [[0, 0], [1, 0]]}, al], ("max_shifts", "Sue", None)),
+        ]
+        for staff, expected in cases:
+            conflicts = check(staff)
+            self.assertIn(expected, [(c["constraint"], c["employee"], c["day"]) for c in conflicts], staff)
+
+    def test_supervisor_without_an_evening_is_caught(self):
+        staff = employees()
+        staff[0]["unavailable_shifts"] = [[d, 1] for d in range(7)]
+        self.assertIn(("supervisor_rules", "George"),
+                      [(c["constraint"], c["employee"]) for c in check(staff, get_shift_template("default"))])
+        # The rule only covers full weeks
+        self.assertNotIn("supervisor_rules", [c["constraint"] for c in check(
+            staff, get_shift_template("default"), {"start_date": "2025-06-04", "days": 5})])
+
+    def test_rejected_config_never_reaches_the_model(self):
+        staff = [{"name": "Sue", "is_supervisor": True, "max_shifts": 7}]
+        with mock.patch("scheduler.rota_solver.cp_model.CpModel") as model:
+            result = solve_rota(staff, fast_options(), horizon=resolve_horizon({}), template=PAIR_TEMPLATE)
+        model.assert_not_called()
+        self.assertEqual(result["status"], "no_solution")
+        self.assertIsNone(result["solver_stats"])
+        self.assertTrue(result["conflicts"])
+
+    def test_never_rejects_a_solvable_config(self):
+        rng = random.Random(11)
+        template = get_shift_template("default")
+        horizon = resolve_horizon({})
+        solved = 0
+        for _ in range(20):
+            staff = []
+            for i in range(rng.randint(7, 9)):
+                days_off = rng.sample(range(7), rng.randint(0, 2))
+                holidays = rng.sample(range(7), rng.randint(0, 1))
+                unavailable = [[rng.randrange(7), rng.randrange(2)] for _ in range(rng.randint(0, 2))]
+                free = [[d, s] for d in range(7) for s in range(2)
+                        if d not in days_off + holidays and [d, s] not in unavailable]
+                staff.append({
+                    "name": f"E{i}",
+                    "is_supervisor": i < 4,
+                    "max_shifts": rng.randint(3, 6),
+                    "days_off": days_off,
+                    "holidays": holidays,
+                    "unavailable_shifts": unavailable,
+                    "must_work_shifts": rng.sample(free, rng.randint(0, 2)),
+                })
+            # Solve without the precheck to learn whether the config really is feasible
+            with mock.patch("scheduler.rota_solver.precheck_problem", return_value=[]):
+                result = solve_rota(staff, fast_options(), horizon=horizon, template=template)
+            if result["status"] in ("optimal", "feasible"):
+                solved += 1
+                self.assertEqual(precheck_problem(prepare_problem(staff, horizon, template)), [], staff)
+        self.assertGreater(solved, 0)
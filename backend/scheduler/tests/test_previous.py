@@ -0,0 +1,82 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..models import Rota
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fake_queue, fast_options, post_json
+
+
+def solve(staff, previous=None):
+    return solve_rota(staff, fast_options(), previous=previous, horizon=resolve_horizon({}),
+                      template=get_shift_template("default"))
+
+
+def slots(result):
+    return {(a["employee"], a["day"], a["shift"]) for a in result["assignments"]}
+
+
+class MinimalChangeTests(SimpleTestCase):
+    def test_unchanged_config_keeps_the_previous_rota(self):
+        first = solve(employees())
+        again = solve(employees(), {"assignments": first["assignments"], "minimal_change": True})
+        self.assertEqual(again["changed_shifts"], 0)
+        self.assertEqual(slots(again), slots(first))
+
+    def test_new_day_off_moves_only_a_few_shifts(self):
+        first = solve(employees())
+        # Take a day off George was rostered on but not required to work
+        must_work = {d for d, _ in employees()[0]["must_work_shifts"]}
+        day = next(a["day"] for a in first["assignments"] if a["employee"] == "George" and a["day"] not in must_work)
+        staff = employees()
+        staff[0]["days_off"] = staff[0]["days_off"] + [day]
+
+        again = solve(staff, {"assignments": first["assignments"], "minimal_change": True})
+        self.assertIn(again["status"], ("optimal", "feasible"))
+        self.assertNotIn(day, {a["day"] for a in again["assignments"] if a["employee"] == "George"})
+        # George's shift goes, someone covers it, and any knock-on move costs two more
+        self.assertGreater(again["changed_shifts"], 0)
+        self.assertLessEqual(again["changed_shifts"], len(first["assignments"]) // 2)
+        self.assertEqual(again["changed_shifts"], len(slots(again) ^ slots(first)))
+
+    def test_hints_alone_do_not_change_the_objective(self):
+        first = solve(employees())
+        hinted = solve(employees(), {"assignments": first["assignments"]})
+        self.assertEqual(hinted["solver_stats"]["objective"], first["solver_stats"]["objective"])
+        self.assertIn("changed_shifts", hinted)
+
+
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class PreviousRotaRequestTests(TestCase):
+    def test_previous_assignments_must_fit_the_solve(self, _):
+        for assignment in ({"employee": "George", "day": 7, "shift": 0},
+                           {"employee": "George", "day": 1, "shift": 2},
+                           {"employee": "George", "day": "1", "shift": 0},
+                           {"employee": "George", "day": 1}):
+            response = post_json(self.client, "/api/rota-jobs/", {
+                "employees": employees(), "previous": {"assignments": [assignment]},
+            })
+            self.assertEqual(response.status_code, 400, assignment)
+
+    def test_saved_rota_is_the_previous_rota(self, _):
+        first = solve(employees())
+        rota = Rota.save_result(first)
+        queue = fake_queue()
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            response = post_json(self.client, "/api/rota-jobs/", {
+                "employees": employees(), "previous": {"rota_id": rota.id, "minimal_change": True},
+            })
+            self.assertEqual(response.status_code, 202)
+            _, _, kwargs = queue._executor.calls[0]
+            self.assertTrue(kwargs["previous"]["minimal_change"])
+            self.assertEqual({(a["employee"], a["day"], a["shift"]) for a in kwargs["previous"]["assignments"]},
+                             slots(first))
+
+            response = post_json(self.client, "/api/rota-jobs/", {
+                "employees": employees(), "previous": {"rota_id": rota.id + 1},
+            })
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(json.loads(response.content)["error"], "Previous rota not found")
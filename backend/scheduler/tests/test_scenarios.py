@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..jobs import QueueFullError
+from ..rota_solver import solve_rota
+from ..scenarios import apply_scenario, run_scenarios
+from .utils import employees, fake_queue, fast_options, post_json
+
+
+class InlineQueue:
+    """Solves each scenario as it is submitted"""
+
+    def submit(self, employees_data, **options):
+        future = Future()
+        future.set_result(solve_rota(employees_data, **options))
+        done = threading.Event()
+        done.set()
+        return {"id": uuid.uuid4().hex, "future": future, "done": done}
+
+
+class ApplyScenarioTests(SimpleTestCase):
+    def test_deltas_apply_without_touching_the_base(self):
+        base = employees()
+        changed = apply_scenario(base, {
+            "remove": ["Shea"], "add": [{"name": "Zed", "is_supervisor": False, "max_shifts": 3}],
+            "update": {"George": {"max_shifts": 2}}, "add_holidays": {"George": [6]},
+        })
+        names = [emp["name"] for emp in changed]
+        self.assertNotIn("Shea", names)
+        self.assertEqual(names[-1], "Zed")
+        george = changed[names.index("George")]
+        self.assertEqual((george["max_shifts"], george["holidays"][-1]), (2, 6))
+        self.assertEqual(base, employees())
+        # Employees the delta does not touch are shared, not copied
+        self.assertIs(changed[names.index("Patrick")], base[[emp["name"] for emp in base].index("Patrick")])
+
+    def test_bad_deltas_are_refused(self):
+        for scenario in ([], {"drop": []}, {"remove": "Shea"}, {"update": {"George": 3}},
+                         {"add_holidays": {"George": 6}}, {"remove": ["Nobody"]}):
+            with self.assertRaises(ValueError, msg=scenario):
+                apply_scenario(employees(), scenario)
+
+
+class RunScenariosTests(SimpleTestCase):
+    def test_full_queue_waits_for_the_batchs_own_solves(self):
+        # One slot, so each scenario is submitted when the one before finishes
+        queue = fake_queue()
+        futures = queue._executor.futures
+        result = {"status": "optimal", "message": "done", "solver_stats": {"objective": 1}}
+
+        def solve_each():
+            while len(futures) < 3 or not futures[-1].done():
+                for future in list(futures):
+                    if not future.done():
+                        future.set_result(result)
+                time.sleep(0.001)
+
+        solver = threading.Thread(target=solve_each)
+        solver.start()
+        with mock.patch("scheduler.jobs.get_result_cache", return_value=None):
+            summaries = list(run_scenarios(queue, [(f"S{i}", employees()) for i in range(3)], {}))
+        solver.join()
+        self.assertEqual([(line["scenario"], line["status"]) for line in summaries],
+                         [(0, "optimal"), (1, "optimal"), (2, "optimal")])
+
+    def test_batch_refused_by_a_busy_queue_reports_every_scenario(self):
+        queue = mock.Mock(submit=mock.Mock(side_effect=QueueFullError("busy")))
+        summaries = list(run_scenarios(queue, [("A", []), ("B", [])], {}))
+        self.assertEqual([(line["name"], line["status"], line["error"]) for line in summaries],
+                         [("A", "error", "busy"), ("B", "error", "busy")])
+
+
+@mock.patch("scheduler.views.get_job_queue", return_value=InlineQueue())
+class ScenarioRequestTests(TestCase):
+    body = {
+        "employees": employees(),
+        "solver": {"profile": "fast", "num_workers": 1, "random_seed": 1},
+        "scenarios": [{"name": "As is"}, {"name": "Emma does more", "update": {"Emma": {"max_shifts": 4}}}],
+    }
+
+    def test_each_scenario_is_one_line(self, _):
+        response = post_json(self.client, "/api/rota-scenarios/", self.body)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        # Lines come in the order the scenarios finish
+        self.assertEqual(sorted(line["name"] for line in lines), ["As is", "Emma does more"])
+        self.assertTrue(all(line["status"] in ("optimal", "feasible") for line in lines))
+
+    async def test_asgi_response_streams_line_by_line(self, _):
+        response = await self.async_client.post("/api/rota-scenarios/", json.dumps(self.body),
+                                                content_type="application/json")
+        self.assertTrue(response.is_async)
+        lines = [json.loads(chunk) async for chunk in response.streaming_content]
+        self.assertEqual(sorted(line["scenario"] for line in lines), [0, 1])
+
+    def test_malformed_scenarios_are_400(self, _):
+        for scenario in ({"remove": ["Nobody"]}, {"rename": {}}, {"update": {"George": {"max_shifts": "x"}}},
+                         {"add": [{"name": "Zed"}]}):
+            response = post_json(self.client, "/api/rota-scenarios/", {
+                "employees": employees(), "scenarios": [scenario],
+            })
+            self.assertEqual(response.status_code, 400, scenario)
+            self.assertTrue(json.loads(response.content)["error"].startswith("Scenario 0:"))
+
+    def test_too_many_scenarios_are_400(self, _):
+        with self.settings(ROTA_MAX_SCENARIOS=1):
+            self.assertEqual(post_json(self.client, "/api/rota-scenarios/", self.body).status_code, 400)
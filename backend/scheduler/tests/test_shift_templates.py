@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..rota_solver import solve_rota
+from ..shift_templates import ShiftTemplateStore, compile_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fast_options, post_json
+
+DAY = {"name": "Day", "start": "09:00", "end": "17:00", "min_staff": 1}
+
+
+def write_templates(path, version, templates):
+    with open(path, "w") as f:
+        json.dump({"version": version, "templates": templates}, f)
+
+
+class CompileTemplateTests(SimpleTestCase):
+    def test_weekdays_fall_back_to_the_default_list(self):
+        night = {"name": "Night", "start": "22:00", "end": "06:00", "min_staff": 1, "max_staff": 2, "evening": True}
+        template = compile_template("t", {"days": {"default": [DAY], "Sat": [DAY, night]}}, 3)
+        self.assertEqual((template["version"], template["shifts_per_day"]), (3, 2))
+        self.assertEqual([len(shifts) for shifts in template["days"]], [1, 1, 1, 1, 1, 2, 1])
+        compiled = template["days"][5][1]
+        self.assertEqual((compiled["minutes"], compiled["label"], compiled["evening"]), (480, "10:00pm–6:00am", True))
+        self.assertEqual((compiled["min_staff"], compiled["max_staff"], compiled["min_supervisors"]), (1, 2, 0))
+
+    def test_bad_definitions_name_what_is_wrong(self):
+        cases = [
+            ({"shifts": []}, "needs a 'days' object"),
+            ({"days": {"Someday": [DAY]}}, "unknown day 'Someday'"),
+            ({"days": {"Mon": [DAY]}}, "has no shifts for Tue"),
+            ({"days": {"default": [{**DAY, "colour": "red"}]}}, "unknown field 'colour'"),
+            ({"days": {"default": [{"start": "09:00", "end": "17:00"}]}}, "missing required field 'min_staff'"),
+            ({"days": {"default": [{**DAY, "start": "9am"}]}}, "times must be HH:MM"),
+            ({"days": {"default": [{**DAY, "end": "24:00"}]}}, "is not a valid time"),
+            ({"days": {"default": [{**DAY, "min_staff": 3, "max_staff": 2}]}}, "min_staff <= max_staff"),
+            ({"days": {"default": [{**DAY, "min_supervisors": 2}]}}, "min_supervisors must be between"),
+        ]
+        for definition, message in cases:
+            with self.assertRaisesRegex(ValueError, message, msg=definition):
+                compile_template("t", definition, 1)
+
+
+class ShiftTemplateStoreTests(SimpleTestCase):
+    def test_changed_file_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "templates.json")
+            write_templates(path, 1, {"day": {"days": {"default": [DAY]}}})
+            store = ShiftTemplateStore(path)
+            self.assertEqual(store.get("day")["version"], 1)
+            with self.assertRaisesRegex(ValueError, "Unknown shift template 'night'"):
+                store.get("night")
+
+            write_templates(path, 2, {"night": {"days": {"default": [{**DAY, "start": "22:00", "end": "06:00"}]}}})
+            os.utime(path, (0, 1))
+            self.assertEqual(store.get("night")["days"][0][0]["minutes"], 480)
+            self.assertEqual(list(store.all()), ["night"])
+
+
+class ShiftTemplateRequestTests(TestCase):
+    def test_templates_are_listed(self):
+        data = json.loads(self.client.get("/api/shift-templates/").content)
+        self.assertIn(data["default"], data["templates"])
+
+    def test_unknown_template_is_400(self):
+        response = post_json(self.client, "/api/rota-jobs/", {"employees": employees(), "template": "nowhere"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_templates_file_is_500(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "templates.json")
+            write_templates(path, 1, {"broken": {"days": {"default": [{"start": "09:00"}]}}})
+            with override_settings(ROTA_SHIFT_TEMPLATES_PATH=path):
+                self.assertEqual(self.client.get("/api/shift-templates/").status_code, 500)
+
+
+class TemplateCoverageTests(SimpleTestCase):
+    def test_solve_follows_each_days_coverage(self):
+        # Two people on weekdays, one at the weekend
+        template = compile_template("weekend", {"days": {
+            "default": [{**DAY, "min_staff": 2, "max_staff": 2}],
+            "Sat": [DAY], "Sun": [DAY],
+        }}, 1)
+        staff = [{"name": name, "is_supervisor": False, "max_shifts": 5} for name in ("Ann", "Ben", "Cat")]
+        result = solve_rota(staff, fast_options(), horizon=resolve_horizon({}), template=template)
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        per_day = [sum(1 for a in result["assignments"] if a["day"] == d) for d in range(7)]
+        self.assertEqual(per_day, [2, 2, 2, 2, 2, 1, 1])
+        self.assertEqual({a["minutes"] for a in result["assignments"]}, {480})
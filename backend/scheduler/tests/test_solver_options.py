@@ -0,0 +1,63 @@
+import time
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..benchmark import generate_workload
+from ..rota_solver import SolveMonitor, solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import SOLVER_PROFILES, resolve_fairness_weights, resolve_horizon, resolve_solver_options
+from .utils import employees, fast_options, post_json
+
+
+class SolverProfileTests(SimpleTestCase):
+    def test_profile_fills_in_every_parameter(self):
+        options = resolve_solver_options({"profile": "thorough"})
+        self.assertEqual(options, {"profile": "thorough", **SOLVER_PROFILES["thorough"], "random_seed": None,
+                                   "symmetry_breaking": False})
+        self.assertEqual(resolve_solver_options()["profile"], "balanced")
+
+    def test_overrides_are_cast_and_bounded(self):
+        options = resolve_solver_options({"profile": "fast", "max_time_in_seconds": "2", "num_workers": 2.0})
+        self.assertEqual((options["max_time_in_seconds"], options["num_workers"]), (2.0, 2))
+        self.assertEqual(options["relative_gap_limit"], SOLVER_PROFILES["fast"]["relative_gap_limit"])
+        for bad in ({"profile": "quickest"}, {"max_time_in_seconds": 0}, {"max_time_in_seconds": 601},
+                    {"num_workers": "many"}, {"relative_gap_limit": 2}, {"threads": 4},
+                    {"symmetry_breaking": "yes"}):
+            with self.assertRaises(ValueError, msg=bad):
+                resolve_solver_options(bad)
+
+    def test_deadline_returns_the_best_rota_so_far(self):
+        # Balancing fairness over two weeks takes longer than a fraction of
+        # a second to prove optimal
+        staff, options = generate_workload({"employees": 20, "days": 14})
+        started = time.perf_counter()
+        result = solve_rota(staff, fast_options(max_time_in_seconds=0.3, relative_gap_limit=0),
+                            fairness={"weights": resolve_fairness_weights({}), "history": {}}, **options)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertTrue(result["assignments"])
+        if result["status"] == "feasible":
+            self.assertGreater(result["solver_stats"]["gap"], 0)
+
+    def test_stopped_search_keeps_the_first_rota(self):
+        monitor = SolveMonitor()
+        monitor.stop()
+        result = solve_rota(employees(), fast_options(), horizon=resolve_horizon({}),
+                            template=get_shift_template("default"), monitor=monitor)
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertTrue(result["stopped"])
+        self.assertTrue(result["message"].endswith("(search stopped early)"))
+
+
+class SolverOptionRequestTests(TestCase):
+    def test_bad_solver_options_are_400(self):
+        for solver in ({"profile": "quickest"}, {"max_time_in_seconds": -1}):
+            response = post_json(self.client, "/api/rota-jobs/", {"employees": employees(), "solver": solver})
+            self.assertEqual(response.status_code, 400, solver)
+
+    @override_settings(ROTA_SYNC_MAX_SOLVE_SECONDS=1)
+    def test_sync_solve_longer_than_the_limit_is_400(self):
+        response = post_json(self.client, "/api/generate-rota/", {
+            "employees": employees(), "solver": {"max_time_in_seconds": 5},
+        })
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,105 @@
+import json
+
+from django.test import TestCase
+
+from ..models import Employee, Rota, RotaAssignment
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import employees, fast_options, post_json
+
+
+def patch_json(client, url, data):
+    return client.patch(url, json.dumps(data), content_type="application/json")
+
+
+class EmployeeStorageTests(TestCase):
+    def setUp(self):
+        self.assertEqual(post_json(self.client, "/api/employees/", employees()).status_code, 200)
+
+    def test_saved_list_reads_back_in_order(self):
+        self.assertEqual(json.loads(self.client.get("/api/employees/").content), employees())
+        staff = employees()[1:]
+        staff[0]["holidays"] = ["2025-06-03"]
+        post_json(self.client, "/api/employees/", staff)
+        self.assertEqual(json.loads(self.client.get("/api/employees/").content), staff)
+        self.assertFalse(Employee.objects.filter(name="George").exists())
+
+    def test_patch_changes_only_what_is_sent(self):
+        before = json.loads(self.client.get("/api/employees/Emma/").content)
+        response = patch_json(self.client, "/api/employees/Emma/", {"max_shifts": 4, "holidays": [5, "2025-06-03"]})
+        self.assertEqual(response.status_code, 200)
+        after = json.loads(response.content)
+        self.assertEqual((after["max_shifts"], after["holidays"]), (4, [5, "2025-06-03"]))
+        self.assertEqual((after["days_off"], after["must_work_shifts"]), (before["days_off"], before["must_work_shifts"]))
+
+        self.assertEqual(patch_json(self.client, "/api/employees/Nobody/", {"max_shifts": 4}).status_code, 404)
+        self.assertEqual(patch_json(self.client, "/api/employees/Emma/", {"name": "George"}).status_code, 400)
+        self.assertEqual(patch_json(self.client, "/api/employees/Emma/", {"max_shifts": -2}).status_code, 400)
+        self.assertEqual(patch_json(self.client, "/api/employees/Emma/", {"name": "Em"}).status_code, 200)
+        self.assertEqual(self.client.get("/api/employees/Emma/").status_code, 404)
+
+    def test_list_pages_on_request(self):
+        data = json.loads(self.client.get("/api/employees/?page_size=3").content)
+        self.assertEqual(data["count"], len(employees()))
+        self.assertEqual([emp["name"] for emp in data["results"]], [emp["name"] for emp in employees()[:3]])
+        last = json.loads(self.client.get("/api/employees/?page_size=3&page=3").content)
+        self.assertIsNone(last["next"])
+        self.assertEqual(len(last["results"]), 2)
+
+    def test_duplicate_names_are_400(self):
+        staff = employees()
+        staff[1]["name"] = staff[0]["name"]
+        self.assertEqual(post_json(self.client, "/api/employees/", staff).status_code, 400)
+        self.assertEqual(post_json(self.client, "/api/employees/", {"name": "Ann"}).status_code, 400)
+
+
+class RotaStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        template = get_shift_template("default")
+        cls.results = {}
+        for start in ("2025-06-02", "2025-06-09"):
+            cls.results[start] = solve_rota(employees(), fast_options(),
+                                            horizon=resolve_horizon({"start_date": start}), template=template)
+        cls.first = Rota.save_result(cls.results["2025-06-02"], job_id="a" * 32)
+        cls.second = Rota.save_result(cls.results["2025-06-09"])
+
+    def listing(self, query=""):
+        response = self.client.get(f"/api/rotas/{query}")
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_saving_a_job_twice_keeps_one_rota(self):
+        again = Rota.save_result(self.results["2025-06-02"], job_id="a" * 32)
+        self.assertEqual(again.id, self.first.id)
+        self.assertEqual(RotaAssignment.objects.filter(rota=self.first).count(),
+                         len(self.results["2025-06-02"]["assignments"]))
+
+    def test_list_is_newest_first_and_paged(self):
+        data = self.listing()
+        self.assertEqual([rota["id"] for rota in data["results"]], [self.second.id, self.first.id])
+        self.assertNotIn("result", data["results"][0])
+        data = self.listing("?page_size=1")
+        self.assertEqual((data["count"], len(data["results"])), (2, 1))
+
+    def test_week_filter_keeps_rotas_in_that_week(self):
+        data = self.listing("?week=2025-06-05")
+        self.assertEqual([rota["id"] for rota in data["results"]], [self.first.id])
+        dates = {a["date"] for a in data["results"][0]["assignments"]}
+        self.assertTrue(dates <= {f"2025-06-0{d}" for d in range(2, 9)})
+        self.assertEqual(self.client.get("/api/rotas/?week=June").status_code, 400)
+
+    def test_employee_filter_lists_their_shifts(self):
+        data = self.listing("?employee=George&week=2025-06-09")
+        self.assertEqual([rota["id"] for rota in data["results"]], [self.second.id])
+        george = [a for a in self.results["2025-06-09"]["assignments"] if a["employee"] == "George"]
+        self.assertEqual(len(data["results"][0]["assignments"]), len(george))
+        self.assertEqual({a["employee"] for a in data["results"][0]["assignments"]}, {"George"})
+        self.assertEqual(self.listing("?employee=Nobody")["count"], 0)
+
+    def test_detail_has_the_full_result(self):
+        data = json.loads(self.client.get(f"/api/rotas/{self.first.id}/").content)
+        self.assertEqual(data["result"]["assignments"], self.results["2025-06-02"]["assignments"])
+        self.assertEqual(str(data["start_date"]), "2025-06-02")
+        self.assertEqual(self.client.get("/api/rotas/999999/").status_code, 404)
@@ -0,0 +1,123 @@
+import json
+import threading
+from queue import Queue
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from ..streaming import start_stream
+from ..workers import ProgressChannel, run_solve
+from .utils import employees, fake_queue, fast_options, post_json
+
+
+def parse_events(chunks):
+    """(event, data) for each Server-Sent Event, skipping keep-alive comments"""
+    events = []
+    for chunk in chunks:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith(":"):
+            continue
+        event, data = chunk.strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class RotaStreamTests(SimpleTestCase):
+    def start(self, timeout=None):
+        queue = fake_queue()
+        stream = start_stream(queue, employees(), {}, timeout=timeout)
+        return queue, stream
+
+    def test_events_are_started_solutions_then_result(self, _):
+        queue, stream = self.start()
+        stream.job["progress"].put("solution", {"objective": 9})
+        stream.job["progress"].put("solution", {"objective": 7})
+        queue._executor.finish(queue._executor.futures[0], {"status": "optimal"})
+
+        events = parse_events(stream.events(heartbeat=1))
+        self.assertEqual([event for event, _ in events], ["started", "solution", "solution", "result"])
+        self.assertEqual(events[0][1], {"stream_id": stream.id, "employees": len(employees())})
+        self.assertEqual([data["objective"] for _, data in events[1:3]], [9, 7])
+        self.assertEqual(events[-1][1], {"status": "optimal"})
+
+    def test_quiet_search_sends_keep_alives(self, _):
+        queue, stream = self.start()
+        chunks = stream.events(heartbeat=0)
+        next(chunks)
+        self.assertEqual(next(chunks), ": keep-alive\n\n")
+        queue._executor.finish(queue._executor.futures[0], {"status": "optimal"})
+        self.assertEqual([event for event, _ in parse_events(chunks)], ["result"])
+
+    def test_timeout_leaves_the_job_running(self, _):
+        _, stream = self.start(timeout=0)
+        events = parse_events(stream.events(heartbeat=1))
+        self.assertEqual([event for event, _ in events], ["started", "error"])
+        self.assertEqual(events[-1][1]["status_url"], f"/api/rota-jobs/{stream.id}/")
+        self.assertFalse(stream.job["progress"].stopping.is_set())
+
+    def test_client_going_away_stops_the_search(self, _):
+        _, stream = self.start()
+        chunks = stream.events(heartbeat=1)
+        next(chunks)
+        chunks.close()
+        self.assertTrue(stream.job["progress"].stopping.is_set())
+
+
+class ProgressChannelTests(SimpleTestCase):
+    def test_worker_reports_each_improving_rota(self):
+        channel = ProgressChannel(Queue(), threading.Event(), preview_interval=0)
+        result = run_solve("solve_rota", employees(), progress=channel, solver_options=fast_options(),
+                           horizon=resolve_horizon({}), template=get_shift_template("default"))
+        events = []
+        while not channel.events.empty():
+            events.append(channel.events.get())
+        self.assertTrue(events)
+        self.assertEqual({event for event, _ in events}, {"solution"})
+        objectives = [data["objective"] for _, data in events]
+        self.assertEqual(objectives, sorted(objectives, reverse=True))
+        self.assertEqual(objectives[-1], result["solver_stats"]["objective"])
+
+    def test_stopped_channel_ends_the_search_with_a_rota(self):
+        channel = ProgressChannel(Queue(), threading.Event())
+        channel.stop()
+        result = run_solve("solve_rota", employees(), progress=channel, solver_options=fast_options(),
+                           horizon=resolve_horizon({"days": 14}), template=get_shift_template("default"))
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        # Proving this rota optimal takes several seconds
+        self.assertLess(result["solver_stats"]["wall_time"], 2)
+
+
+@mock.patch("scheduler.jobs.get_result_cache", return_value=None)
+class RotaStreamApiTests(TransactionTestCase):
+    def test_stream_and_stop(self, _):
+        queue = fake_queue()
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            response = post_json(self.client, "/api/rota-streams/", employees())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            self.assertEqual(response["Cache-Control"], "no-cache")
+            chunks = iter(response.streaming_content)
+            (event, data), = parse_events([next(chunks)])
+            self.assertEqual(event, "started")
+
+            stop_url = f"/api/rota-streams/{data['stream_id']}/stop/"
+            self.assertEqual(self.client.post(stop_url).status_code, 202)
+            job = queue.get(data["stream_id"])
+            self.assertTrue(job["progress"].stopping.is_set())
+
+            queue._executor.finish(queue._executor.futures[0], {"status": "feasible", "assignments": []})
+            self.assertEqual([event for event, _ in parse_events(chunks)], ["result"])
+            self.assertEqual(self.client.post(stop_url).status_code, 404)
+            self.assertEqual(self.client.post("/api/rota-streams/nothing/stop/").status_code, 404)
+
+    def test_only_plain_single_solves_stream(self, _):
+        queue = fake_queue()
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            staff = [{**emp, "team": "north"} for emp in employees()]
+            response = post_json(self.client, "/api/rota-streams/", {"employees": staff, "mode": "by_team"})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(post_json(self.client, "/api/rota-streams/", {"employees": []}).status_code, 400)
+        self.assertEqual(queue._executor.calls, [])
@@ -0,0 +1,85 @@
+from django.test import SimpleTestCase
+from ortools.sat.python import cp_model
+
+from ..benchmark import generate_workload
+from ..problem import employee_classes, prepare_problem
+from ..rota_solver import add_lex_order, solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from .utils import fast_options
+
+# Two groups of interchangeable staff, and one who differs by a day off
+STAFF = (
+    [{"name": f"Sup {i}", "is_supervisor": True, "max_shifts": 5} for i in range(4)]
+    + [{"name": f"Staff {i}", "is_supervisor": False, "max_shifts": 5} for i in range(4)]
+    + [{"name": "Odd", "is_supervisor": False, "max_shifts": 5, "days_off": [6]}]
+)
+
+
+class PairCollector(cp_model.CpSolverSolutionCallback):
+    def __init__(self, first, second):
+        super().__init__()
+        self.variables = (first, second)
+        self.pairs = set()
+
+    def on_solution_callback(self):
+        self.pairs.add(tuple(tuple(self.Value(var) for var in row) for row in self.variables))
+
+
+def lex_ordered_pairs(enforced, size=3):
+    """Every (first, second) pair of bit vectors the ordering allows"""
+    model = cp_model.CpModel()
+    first = [model.NewBoolVar(f"a{i}") for i in range(size)]
+    second = [model.NewBoolVar(f"b{i}") for i in range(size)]
+    enforce = model.NewBoolVar("enforce")
+    model.Add(enforce == int(enforced))
+    add_lex_order(model, first, second, enforce)
+    solver = cp_model.CpSolver()
+    solver.parameters.enumerate_all_solutions = True
+    collector = PairCollector(first, second)
+    solver.Solve(model, collector)
+    return collector.pairs
+
+
+def worked(result, name):
+    """An employee's rota as a 0/1 vector over (day, shift), in order"""
+    slots = {(a["day"], a["shift"]) for a in result["assignments"] if a["employee"] == name}
+    return [int((d, s) in slots) for d in range(7) for s in range(2)]
+
+
+class SymmetryTests(SimpleTestCase):
+    def test_employee_classes_group_interchangeable_staff(self):
+        problem = prepare_problem(STAFF, resolve_horizon({}), get_shift_template("default"))
+        self.assertEqual(employee_classes(problem), [[0, 1, 2, 3], [4, 5, 6, 7]])
+        # Different history or previous shifts tell them apart
+        self.assertEqual(employee_classes(problem, [0, 0, 1, 1, 0, 1, 2, 3, 0]), [[0, 1], [2, 3]])
+
+    def test_lex_order_keeps_one_of_each_swapped_pair(self):
+        self.assertEqual(len(lex_ordered_pairs(False)), 64)
+        ordered = lex_ordered_pairs(True)
+        self.assertEqual(len(ordered), 8 * 9 // 2)
+        self.assertTrue(all(first >= second for first, second in ordered))
+
+    def test_ordered_rota_is_just_as_good(self):
+        horizon = resolve_horizon({})
+        template = get_shift_template("default")
+        plain = solve_rota(STAFF, fast_options(), horizon=horizon, template=template)
+        ordered = solve_rota(STAFF, fast_options(symmetry_breaking=True), horizon=horizon, template=template)
+        self.assertEqual(plain["status"], "optimal")
+        self.assertEqual(ordered["status"], "optimal")
+        self.assertEqual(ordered["solver_stats"]["objective"], plain["solver_stats"]["objective"])
+        self.assertEqual(ordered["telemetry"]["symmetry"], {"classes": 2, "employees": 8})
+        for group in ("Sup", "Staff"):
+            rotas = [worked(ordered, f"{group} {i}") for i in range(4)]
+            self.assertEqual(rotas, sorted(rotas, reverse=True))
+
+    def test_diagnosis_ignores_the_ordering(self):
+        staff, options = generate_workload({"employees": 20, "holiday_density": 0, "days_off_density": 0,
+                                            "must_work_density": 0, "infeasible": "solver"})
+        conflicts = []
+        for enabled in (False, True):
+            result = solve_rota(staff, fast_options(symmetry_breaking=enabled), **options)
+            self.assertEqual(result["status"], "no_solution")
+            conflicts.append(sorted(c["description"] for c in result["conflicts"]))
+        self.assertTrue(conflicts[0])
+        self.assertEqual(conflicts[1], conflicts[0])
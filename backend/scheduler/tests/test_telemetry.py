@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import telemetry
+from ..rota_solver import solve_rota
+from ..shift_templates import get_shift_template
+from ..solver_options import resolve_horizon
+from ..telemetry import Metric, MetricsRegistry
+from .utils import employees, fast_options
+
+
+def sample(registry, line_start):
+    """The value of the rendered sample line starting with line_start"""
+    for line in registry.render().splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_metric_must_say_how_to_render_its_samples(self):
+        with self.assertRaises(TypeError):
+            Metric("rota_things", "Things")
+
+        class Incomplete(Metric):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete("rota_things", "Things")
+
+    def test_counter_renders_each_label_set(self):
+        registry = MetricsRegistry()
+        solves = registry.counter("rota_solves_total", "Solves", labels=("status",))
+        solves.inc(status="optimal")
+        solves.inc(2, status='say "no"')
+        self.assertIs(registry.counter("rota_solves_total", "Solves", labels=("status",)), solves)
+        text = registry.render()
+        self.assertIn("# TYPE rota_solves_total counter", text)
+        self.assertIn('rota_solves_total{status="optimal"} 1', text)
+        self.assertIn('rota_solves_total{status="say \\"no\\""} 2', text)
+        with self.assertRaises(ValueError):
+            solves.inc(outcome="optimal")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        seconds = registry.histogram("rota_seconds", "Seconds", buckets=(1, 5))
+        for value in (0.5, 3, 30):
+            seconds.observe(value)
+        self.assertEqual(sample(registry, 'rota_seconds_bucket{le="1"}'), 1)
+        self.assertEqual(sample(registry, 'rota_seconds_bucket{le="5"}'), 2)
+        self.assertEqual(sample(registry, 'rota_seconds_bucket{le="+Inf"}'), 3)
+        self.assertEqual(sample(registry, "rota_seconds_sum"), 33.5)
+        self.assertEqual(sample(registry, "rota_seconds_count"), 3)
+
+    def test_failing_callback_does_not_break_the_page(self):
+        registry = MetricsRegistry()
+        registry.callback("rota_broken", "Broken", "gauge", lambda: 1 / 0)
+        registry.callback("rota_queued", "Queued", "gauge", lambda: 4)
+        with self.assertLogs("scheduler.telemetry", "ERROR"):
+            self.assertEqual(sample(registry, "rota_queued"), 4)
+
+
+class SolveTelemetryTests(SimpleTestCase):
+    def test_solve_reports_its_phases_and_model_size(self):
+        result = solve_rota(employees(), fast_options(), horizon=resolve_horizon({}),
+                            template=get_shift_template("default"))
+        report = result["telemetry"]
+        self.assertEqual(list(report["phases"]), ["prepare", "precheck", "build", "solve", "render"])
+        self.assertGreater(report["model"]["variables"], 0)
+        self.assertIn("conflicts", report["search"])
+
+        before = sample(telemetry.REGISTRY, f'rota_solves_total{{status="{result["status"]}"}}') or 0
+        with self.assertLogs("scheduler.telemetry", "INFO") as logs:
+            telemetry.observe_solve(result, job_seconds=0.5, job_id="abc")
+        self.assertEqual(sample(telemetry.REGISTRY, f'rota_solves_total{{status="{result["status"]}"}}'), before + 1)
+        self.assertIn('"job_id": "abc"', logs.output[0])
+
+
+@override_settings(ROTA_METRICS_ENABLED=True, ROTA_METRICS_TOKEN="scrape-token")
+class MetricsEndpointTests(TestCase):
+    def test_disabled_endpoint_is_404(self):
+        with override_settings(ROTA_METRICS_ENABLED=False):
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 404)
+
+    def test_scraper_needs_the_token(self):
+        self.assertIn(self.client.get("/metrics").status_code, (401, 403))
+        self.assertIn(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, (401, 403))
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b"# TYPE rota_solves_total counter", response.content)
+
+    def test_no_token_configured_admits_only_staff(self):
+        with override_settings(ROTA_METRICS_TOKEN=""):
+            self.assertIn(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, (401, 403))
+            self.client.force_login(User.objects.create_user("ops", is_staff=True))
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    def test_health_stays_open(self):
+        with override_settings(ROTA_METRICS_ENABLED=False):
+            self.assertIn(self.client.get("/health").status_code, (200, 503))
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from ..jobs import solver_worker_settings
+from ..master_model import allocate_floaters
+from ..multisite import split_teams
+from ..solver_options import resolve_horizon
+from ..workers import WarmPool, check_authkey, parse_address, run_solve
+from .utils import PAIR_TEMPLATE
+
+# North needs Flo at weekends, south on Mondays and Tuesdays
+STAFF = [
+    {"name": "Nia", "is_supervisor": True, "max_shifts": 7, "team": "north"},
+    {"name": "Ned", "is_supervisor": False, "max_shifts": 7, "team": "north", "days_off": [5, 6]},
+    {"name": "Sam", "is_supervisor": True, "max_shifts": 7, "team": "south"},
+    {"name": "Sue", "is_supervisor": False, "max_shifts": 7, "team": "south", "days_off": [0, 1]},
+    {"name": "Flo", "is_supervisor": False, "max_shifts": 7, "team": "north", "float_teams": ["south"]},
+]
+
+
+class SolverWorkerChannelTests(SimpleTestCase):
+    def test_address_must_be_local(self):
+        self.assertEqual(parse_address("127.0.0.1:7000"), ("127.0.0.1", 7000))
+        self.assertEqual(parse_address("/run/rota/solver.sock"), "/run/rota/solver.sock")
+        with self.assertRaises(ValueError):
+            parse_address("10.0.0.1:7000")
+
+    def test_key_must_be_long_enough(self):
+        check_authkey(b"k" * 16)
+        for key in (b"", b"short", None):
+            with self.assertRaises(ValueError):
+                check_authkey(key)
+
+    @override_settings(SECRET_KEY="s" * 50, ROTA_SOLVER_WORKER_ADDRESS="127.0.0.1:7000")
+    def test_settings_refuse_a_reused_secret_key(self):
+        with override_settings(ROTA_SOLVER_WORKER_AUTHKEY="s" * 50), self.assertRaises(ImproperlyConfigured):
+            solver_worker_settings()
+        with override_settings(ROTA_SOLVER_WORKER_AUTHKEY="k" * 32):
+            self.assertEqual(solver_worker_settings(), ("127.0.0.1:7000", b"k" * 32))
+
+
+class WarmPoolTests(SimpleTestCase):
+    def test_workers_warm_up_then_run_the_master_model(self):
+        pool = WarmPool(1)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.health()["status"], "cold")
+        pool.start()
+        deadline = time.monotonic() + 60
+        while pool.health()["status"] == "warming" and time.monotonic() < deadline:
+            time.sleep(0.1)
+        health = pool.health()
+        self.assertEqual((health["status"], health["warm"]), ("ready", 1))
+        self.assertGreater(health["warm_up_seconds"][0], 0)
+
+        teams, floaters = split_teams(STAFF)
+        args = (teams, floaters, resolve_horizon({}), PAIR_TEMPLATE)
+        remote = pool.submit(run_solve, "allocate_floaters", *args).result(timeout=60)
+        self.assertEqual(remote["allocation"], allocate_floaters(*args)["allocation"])
+        self.assertEqual(remote["shortfall"], 0)
+
+    def test_only_known_functions_run(self):
+        with self.assertRaises(ValueError):
+            run_solve("build_model", {})
+
+
+class HealthTests(SimpleTestCase):
+    def health(self, status):
+        queue = mock.Mock()
+        queue.health.return_value = {"status": status, "mode": "local", "workers": 2, "warm": 0}
+        with mock.patch("scheduler.views.get_job_queue", return_value=queue):
+            return self.client.get("/health")
+
+    def test_ready_only_once_the_workers_are(self):
+        for status, code in (("ready", 200), ("cold", 200), ("warming", 503), ("unavailable", 503)):
+            with self.subTest(status):
+                response = self.health(status)
+                self.assertEqual(response.status_code, code)
+                self.assertEqual(json.loads(response.content)["status"], status)
+
+
+class WebTierImportTests(SimpleTestCase):
+    def test_web_tier_does_not_import_or_tools(self):
+        code = (
+            "import sys, django; django.setup(); "
+            "import rota_star.urls, scheduler.multisite, scheduler.problem; "
+            "print(sorted(m for m in sys.modules if m.split('.')[0] == 'ortools'))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "rota_star.settings", "ROTA_SOLVER_PREWARM": "False"}
+        output = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], "[]")
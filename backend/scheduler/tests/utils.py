@@ -0,0 +1,67 @@
+import json
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from queue import Queue
+
+from ..jobs import SolveJobQueue
+from ..shift_templates import compile_template
+from ..solver_options import resolve_solver_options
+from ..workers import ProgressChannel
+
+CONFIG = json.loads((Path(__file__).parent.parent / "config.json").read_text())
+
+# One shift a day, worked by a supervisor and one other employee
+PAIR_TEMPLATE = compile_template("pair", {"days": {"default": [
+    {"name": "Day", "start": "09:00", "end": "17:00", "min_staff": 2, "max_staff": 2, "min_supervisors": 1},
+]}}, 1)
+
+# One shift a day, worked by anyone
+SINGLE_TEMPLATE = compile_template("single", {"days": {"default": [
+    {"name": "Day", "start": "09:00", "end": "17:00", "min_staff": 1, "max_staff": 1, "min_supervisors": 0},
+]}}, 1)
+
+
+def fast_options(**overrides):
+    return resolve_solver_options({"profile": "fast", "num_workers": 1, "random_seed": 1, **overrides})
+
+
+def employees():
+    return json.loads(json.dumps(CONFIG))
+
+
+def post_json(client, url, data, **headers):
+    return client.post(url, json.dumps(data), content_type="application/json", **headers)
+
+
+class FakeExecutor:
+    """Stands in for the solver pool: submitted solves wait until the test finishes them"""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        if self.broken:
+            raise BrokenProcessPool("A solver worker died")
+        future = Future()
+        self.futures.append(future)
+        self.calls.append((fn, args, kwargs))
+        return future
+
+    def progress_channel(self, preview_interval=1.0):
+        return ProgressChannel(Queue(), threading.Event(), preview_interval)
+
+    def finish(self, future, result):
+        # Pool threads complete futures, and finish hooks run on them
+        thread = threading.Thread(target=future.set_result, args=(result,))
+        thread.start()
+        thread.join()
+
+
+def fake_queue(max_queued=0, broken=False):
+    queue = SolveJobQueue(max_workers=1, max_queued=max_queued, retention=60)
+    queue._executor = FakeExecutor(broken)
+    return queue
@@ -3,5 +3,19 @@ from . import views
 
 urlpatterns = [
     path("employees/", views.EmployeeConfigView.as_view()),
+    path("employees/<str:name>/", views.EmployeeDetailView.as_view()),
+    path("employee-history/", views.EmployeeHistoryView.as_view()),
     path("generate-rota/", views.GenerateRotaView.as_view()),
+    path("rota-jobs/", views.RotaJobListView.as_view()),
+    path("rota-jobs/<str:job_id>/", views.RotaJobDetailView.as_view()),
+    path("rota-streams/", views.RotaStreamView.as_view()),
+    path("rota-streams/<str:stream_id>/stop/", views.RotaStreamStopView.as_view()),
+    path("rota-scenarios/", views.RotaScenarioView.as_view()),
+    path("rota-cache/", views.RotaCacheView.as_view()),
+    path("shift-templates/", views.ShiftTemplateView.as_view()),
+    path("rotas/", views.RotaListView.as_view()),
+    path("rotas/export/<str:fmt>/", views.RotaExportView.as_view()),
+    path("rotas/<int:rota_id>/", views.RotaDetailView.as_view()),
+    path("rotas/<int:rota_id>/accept/", views.RotaAcceptView.as_view()),
+    path("rotas/<int:rota_id>/export/<str:fmt>/", views.RotaExportView.as_view()),
 ]
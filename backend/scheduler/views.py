@@ -1,92 +1,856 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .rota_solver import solve_rota
+from django.http import HttpResponse, StreamingHttpResponse
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.text import slugify
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import BasePermission
+from .jobs import get_job_queue, QueueFullError, QueueUnavailableError
+from .cache import get_employee_config_cache, get_result_cache
+from .solver_options import resolve_fairness_weights, resolve_horizon, resolve_solver_options
+from .shift_templates import get_shift_template, get_template_store
+from .scenarios import apply_scenario, run_scenarios
+from .models import Employee, EmployeeConstraint, EmployeeHistory, Rota, RotaAssignment, parse_constraints
+from .multisite import solve_by_team, split_teams
+from .streaming import iterate_async, start_stream
+from .exports import EXPORT_FORMATS, export_rows, stream_csv, stream_ics, stream_xlsx
+from . import telemetry
+import hmac
 import json
-import os
-import traceback
+import logging
+import threading
+import time
+from datetime import date, timedelta
 
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_FIELDS = {'name', 'is_supervisor', 'max_shifts', 'max_shifts_horizon', 'team', 'float_teams'}
+CONSTRAINT_FIELDS = set(EmployeeConstraint.Kind.values)
+
+class EmployeePagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class RotaPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+def employee_fields(data, partial=False):
+    """
+    Validate an employee's own fields (not its constraint lists)
+
+    Returns:
+        Dictionary of model field values present in data
+
+    Raises:
+        ValueError: with a message suitable for a 400 response
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Each employee must be an object")
+    unknown = set(data) - EMPLOYEE_FIELDS - CONSTRAINT_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown employee field: {sorted(unknown)[0]}")
+    if not partial:
+        for field in ['name', 'is_supervisor', 'max_shifts']:
+            if field not in data:
+                raise ValueError(f"Missing required field: {field}")
+
+    fields = {}
+    if 'name' in data:
+        fields['name'] = str(data['name']).strip()
+        if not fields['name']:
+            raise ValueError("Employee name cannot be empty")
+    if 'is_supervisor' in data:
+        fields['is_supervisor'] = bool(data['is_supervisor'])
+    if 'team' in data:
+        fields['team'] = str(data['team'] or '').strip()
+    if 'float_teams' in data:
+        float_teams = data['float_teams'] or []
+        if not isinstance(float_teams, list):
+            raise ValueError("float_teams must be a list of team names")
+        fields['float_teams'] = [str(team).strip() for team in float_teams if str(team).strip()]
+    for field in ('max_shifts', 'max_shifts_horizon'):
+        if field not in data:
+            continue
+        if field == 'max_shifts_horizon' and data[field] in (None, ''):
+            fields[field] = None
+            continue
+        try:
+            fields[field] = int(data[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a whole number")
+        if fields[field] < 0:
+            raise ValueError(f"{field} cannot be negative")
+    if not partial:
+        fields.setdefault('max_shifts_horizon', None)
+        fields.setdefault('team', '')
+        fields.setdefault('float_teams', [])
+    return fields
+
+# Serialises conditional writes in this process; select_for_update does the
+# same across processes on databases that support it
+config_write_lock = threading.Lock()
+
+def validator_headers(etag, last_modified):
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified.timestamp())
+    return headers
+
+def precondition_failed(request, etag, last_modified):
+    """Return a 412 response if the request's If-Match or If-Unmodified-Since no longer holds"""
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None and response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        return Response({"error": "The employee configuration has changed since you loaded it. Reload and try again."},
+                        status=status.HTTP_412_PRECONDITION_FAILED, headers=validator_headers(etag, last_modified))
+    return None
+
+def employee_validators(employee):
+    """ETag and last-modified time of one employee (every API write saves the employee row)"""
+    return f'"{employee.id}-{int(employee.updated_at.timestamp() * 1000000)}"', employee.updated_at
 
 class EmployeeConfigView(APIView):
     def get(self, request):
-        """Get current employee configuration"""
-        try:
-            with open(CONFIG_PATH, 'r') as f:
-                data = json.load(f)
-            return Response(data)
-        except FileNotFoundError:
-            return Response({"error": "Configuration file not found"}, status=status.HTTP_404_NOT_FOUND)
-        except json.JSONDecodeError:
-            return Response({"error": "Invalid JSON in configuration file"}, status=status.HTTP_400_BAD_REQUEST)
+        """
+        Get current employee configuration
+
+        Returns the whole staff list, or one page of it as
+        {"count", "next", "previous", "results"} when ?page or ?page_size
+        is given. The whole list is served from memory with an ETag and
+        Last-Modified, and answers conditional requests with 304.
+        """
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = EmployeePagination()
+            page = paginator.paginate_queryset(Employee.objects.prefetch_related('constraints'), request, view=self)
+            return paginator.get_paginated_response([emp.to_config() for emp in page])
+
+        config = get_employee_config_cache().get()
+        response = HttpResponse(config["body"], content_type="application/json",
+                                headers=validator_headers(config["etag"], config["last_modified"]))
+        last_modified = config["last_modified"]
+        return get_conditional_response(
+            request, etag=config["etag"],
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+            response=response,
+        )
 
     def post(self, request):
-        """Save employee configuration"""
+        """
+        Save employee configuration, replacing the whole staff list
+
+        Send the ETag from a GET as If-Match to only save if nobody else
+        has changed the list since; otherwise the response is a 412.
+        """
+        # Validate the incoming data structure
+        if not isinstance(request.data, list):
+            return Response({"error": "Data must be a list of employees"}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            # Validate the incoming data structure
-            if not isinstance(request.data, list):
-                return Response({"error": "Data must be a list of employees"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            for emp in request.data:
-                required_fields = ['name', 'is_supervisor', 'max_shifts']
-                for field in required_fields:
-                    if field not in emp:
-                        return Response({"error": f"Missing required field: {field}"}, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Ensure optional fields exist with defaults
-                emp.setdefault('days_off', [])
-                emp.setdefault('holidays', [])
-                emp.setdefault('unavailable_shifts', [])
-                emp.setdefault('must_work_shifts', [])
-            
-            with open(CONFIG_PATH, 'w') as f:
-                json.dump(request.data, f, indent=2)
-            
-            return Response({"status": "saved"}, status=status.HTTP_200_OK)
-        
+            fields = [employee_fields(emp) for emp in request.data]
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        names = [f['name'] for f in fields]
+        if len(set(names)) != len(names):
+            return Response({"error": "Employee names must be unique"}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache = get_employee_config_cache()
+        try:
+            with config_write_lock, transaction.atomic():
+                list(Employee.objects.select_for_update().values_list('id', flat=True))
+                current = cache.get()
+                failed = precondition_failed(request, current["etag"], current["last_modified"])
+                if failed:
+                    return failed
+                Employee.objects.exclude(name__in=names).delete()
+                for position, (emp, values) in enumerate(zip(request.data, fields)):
+                    employee, _ = Employee.objects.update_or_create(
+                        name=values.pop('name'), defaults={**values, 'position': position},
+                    )
+                    # Missing lists are saved empty, as the config file used to be
+                    employee.set_constraints({kind: emp.get(kind, []) for kind in CONSTRAINT_FIELDS})
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": f"Failed to save configuration: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            cache.invalidate()
+
+        config = cache.get()
+        return Response({"status": "saved"}, status=status.HTTP_200_OK,
+                        headers=validator_headers(config["etag"], config["last_modified"]))
+
+class EmployeeDetailView(APIView):
+    def get(self, request, name):
+        """Get one employee's configuration"""
+        employee = Employee.objects.prefetch_related('constraints').filter(name=name).first()
+        if employee is None:
+            return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
+        etag, last_modified = employee_validators(employee)
+        response = Response(employee.to_config(), headers=validator_headers(etag, last_modified))
+        return get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()), response=response)
+
+    def patch(self, request, name):
+        """
+        Update some of one employee's fields
+
+        Only the fields sent are changed. A constraint list that is sent
+        (e.g. "holidays") replaces that list; the others are kept. Send the
+        employee's ETag as If-Match to avoid overwriting someone else's
+        change (412).
+        """
+        try:
+            fields = employee_fields(request.data, partial=True)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with config_write_lock, transaction.atomic():
+                employee = Employee.objects.select_for_update().filter(name=name).first()
+                if employee is None:
+                    return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
+                failed = precondition_failed(request, *employee_validators(employee))
+                if failed:
+                    return failed
+                if fields.get('name', name) != name and Employee.objects.filter(name=fields['name']).exists():
+                    return Response({"error": f"An employee called {fields['name']} already exists"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                for field, value in fields.items():
+                    setattr(employee, field, value)
+                employee.save()
+                employee.set_constraints(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            get_employee_config_cache().invalidate()
+
+        return Response(employee.to_config(), headers=validator_headers(*employee_validators(employee)))
+
+def validate_rota_employee(emp):
+    """
+    Check one employee of a rota request with the rules a saved employee follows
+
+    Fields the solver does not read are let through.
+
+    Raises:
+        ValueError: with a message suitable for a 400 response
+    """
+    if not isinstance(emp, dict):
+        raise ValueError("Each employee must be an object")
+    employee_fields({k: v for k, v in emp.items() if k in EMPLOYEE_FIELDS})
+    parse_constraints(emp['name'], emp)
+
+def validate_rota_request(data):
+    """Return an error message if data cannot be solved, otherwise None"""
+    if not data or not isinstance(data, list):
+        return "Invalid employee data provided"
+    for emp in data:
+        try:
+            validate_rota_employee(emp)
+        except ValueError as e:
+            return str(e)
+
+    # Check minimum requirements
+    supervisors = [emp for emp in data if emp.get('is_supervisor', False)]
+    if len(supervisors) < 1:
+        return "At least 1 supervisor is required to generate a valid rota"
+
+    if len(data) < 2:
+        return "At least 2 employees are required to generate a rota (each shift needs 2 people)"
+
+    return None
+
+def check_previous_assignments(assignments, horizon, template):
+    """
+    Check previous assignments fit the horizon and shift template being solved
+
+    Returns:
+        The assignments as {"employee", "day", "shift"} with whole-number
+        day and shift
+
+    Raises:
+        ValueError: for a malformed assignment, a day outside the horizon
+            or a shift the template does not have on that day
+    """
+    start = date.fromisoformat(horizon['start_date']) if horizon['start_date'] else None
+    checked = []
+    for a in assignments:
+        if not isinstance(a, dict) or not {'employee', 'day', 'shift'} <= a.keys():
+            raise ValueError("Each previous assignment needs employee, day and shift")
+        day, shift = a['day'], a['shift']
+        if any(isinstance(v, bool) or not isinstance(v, int) for v in (day, shift)):
+            raise ValueError("Previous assignment day and shift must be whole numbers")
+        if not 0 <= day < horizon['days']:
+            raise ValueError(f"Previous assignment day {day} is outside the {horizon['days']}-day horizon")
+        # Undated horizons start on a Monday, as in build_calendar
+        weekday = (start.weekday() + day) % 7 if start else day % 7
+        if not 0 <= shift < len(template['days'][weekday]):
+            raise ValueError(f"Previous assignment shift {shift} on day {day} is not in the "
+                             f"'{template['name']}' shift template")
+        checked.append({"employee": str(a['employee']), "day": day, "shift": shift})
+    return checked
+
+def resolve_previous_rota(previous, horizon, template):
+    """
+    Turn a request's "previous" object into the assignments to re-solve from
+
+    The previous rota is given inline as "assignments", as the "rota_id"
+    of a saved rota, or as the "job_id" of an earlier solve that is still
+    held by the job queue. Its assignments must fit the horizon and shift
+    template of the new solve.
+    """
+    if not isinstance(previous, dict):
+        raise ValueError("previous must be an object with assignments, a rota_id or a job_id")
+
+    if 'rota_id' in previous:
+        try:
+            rota_id = int(previous['rota_id'])
+        except (TypeError, ValueError):
+            raise ValueError("previous.rota_id must be a number")
+        if not Rota.objects.filter(id=rota_id).exists():
+            raise ValueError("Previous rota not found")
+        assignments = [
+            {"employee": a["employee_name"], "day": a["day"], "shift": a["shift"]}
+            for a in RotaAssignment.objects.filter(rota_id=rota_id).values("employee_name", "day", "shift").iterator()
+        ]
+    elif 'job_id' in previous:
+        queue = get_job_queue()
+        job = queue.get(previous['job_id'])
+        if job is None:
+            raise ValueError("Previous job not found (it may have expired)")
+        data = queue.describe(job)
+        assignments = data.get('result', {}).get('assignments')
+        if assignments is None:
+            raise ValueError("Previous job has no rota to re-solve from")
+    else:
+        assignments = previous.get('assignments')
+        if not isinstance(assignments, list):
+            raise ValueError("previous.assignments must be a list")
+
+    return {
+        "assignments": check_previous_assignments(assignments, horizon, template),
+        "minimal_change": bool(previous.get('minimal_change', False)),
+    }
+
+def parse_rota_request(data):
+    """
+    Split a rota request into employees and keyword arguments for solve_rota
+
+    Accepts a plain list of employees, or an object of the form
+    {"employees": [...], "solver": {"profile": "fast", ...},
+     "horizon": {"start_date": "2025-06-02", "days": 28},
+     "template": "default",
+     "previous": {"rota_id": 12, "minimal_change": true},
+     "mode": "by_team",
+     "fairness": {"evenings": 2, "weekends": 1, "hours": 1},
+     "profile": true}.
+
+    "mode": "by_team" solves each employee "team" as its own rota (see
+    multisite.solve_by_team); the default "single" solves everyone together.
+
+    "fairness" balances evenings, weekends and hours against each
+    employee's history from accepted rotas; true uses the default weights,
+    an object overrides them and false turns it off. When it is left out it
+    is off, unless ROTA_FAIRNESS_ENABLED is set.
+
+    "profile" runs the solve under cProfile and returns the report in the
+    result; it is only accepted when ROTA_PROFILING_ENABLED is set.
+
+    Raises:
+        ValueError: with a message suitable for a 400 response
+    """
+    started = time.perf_counter()
+    solver = {}
+    horizon = {}
+    template = settings.ROTA_DEFAULT_SHIFT_TEMPLATE
+    employees = data
+    previous = None
+    mode = 'single'
+    profile = False
+    fairness = settings.ROTA_FAIRNESS_ENABLED
+    if isinstance(data, dict):
+        employees = data.get('employees')
+        solver = data.get('solver') or {}
+        horizon = data.get('horizon') or {}
+        template = data.get('template') or template
+        if not isinstance(solver, dict):
+            raise ValueError("solver must be an object of solver options")
+        if not isinstance(horizon, dict):
+            raise ValueError("horizon must be an object")
+        previous = data.get('previous')
+        mode = data.get('mode') or 'single'
+        if mode not in ('single', 'by_team'):
+            raise ValueError("mode must be 'single' or 'by_team'")
+        fairness = data.get('fairness', fairness)
+        if not isinstance(fairness, (bool, dict)):
+            raise ValueError("fairness must be true, false or an object of metric weights")
+        profile = bool(data.get('profile', False))
+        if profile and not settings.ROTA_PROFILING_ENABLED:
+            raise ValueError("Profiling is not enabled on this server")
+
+    error = validate_rota_request(employees)
+    if error:
+        raise ValueError(error)
+    if mode == 'by_team':
+        split_teams(employees)
+
+    options = {
+        "solver_options": resolve_solver_options(solver, settings.ROTA_SOLVER_DEFAULT_PROFILE),
+        "horizon": resolve_horizon(horizon),
+        "template": get_shift_template(template, settings.ROTA_SHIFT_TEMPLATES_PATH),
+    }
+    if previous:
+        options["previous"] = resolve_previous_rota(previous, options["horizon"], options["template"])
+    if fairness is not False:
+        weights = resolve_fairness_weights(fairness if isinstance(fairness, dict) else None)
+        if any(weights.values()):
+            options["fairness"] = {
+                "weights": weights,
+                "history": EmployeeHistory.snapshot([emp["name"] for emp in employees]),
+            }
+    if mode == 'by_team':
+        options["mode"] = mode
+    if profile:
+        options["profile"] = True
+    telemetry.PHASE_SECONDS.observe(time.perf_counter() - started, phase="validate")
+    return employees, options
+
+def check_sync_time_limit(options):
+    """
+    Refuse a solve too long to wait for on a web worker
+
+    Raises:
+        ValueError: if the time limit is above ROTA_SYNC_MAX_SOLVE_SECONDS
+    """
+    limit = settings.ROTA_SYNC_MAX_SOLVE_SECONDS
+    if options['solver_options']['max_time_in_seconds'] > limit:
+        raise ValueError(f"Solves longer than {limit:g}s must go through the job API (/api/rota-jobs/)")
+
+def queue_error_response(error):
+    """Map a job queue error to a 429 (busy) or 503 (unavailable) response"""
+    if isinstance(error, QueueFullError):
+        return Response({"error": str(error)}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={"Retry-After": "5"})
+    return Response({"error": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def save_rota(result, job_id):
+    """
+    Job finish hook: save a successful result's rota and add its rota_id
+
+    Runs once per job as it completes. Cached results already carry the
+    rota_id of the solve that produced them, so they are not saved again.
+    """
+    if result['status'] in ['optimal', 'feasible'] and 'rota_id' not in result:
+        return {**result, "rota_id": Rota.save_result(result, job_id=job_id).id}
+    return result
+
+def submit_rota(employees, options):
+    """Queue a parsed rota request, as one job per team in "by_team" mode"""
+    queue = get_job_queue()
+    options = dict(options)
+    if options.pop('mode', 'single') == 'by_team':
+        return queue.submit_coordinated(solve_by_team, employees, finish=save_rota, **options)
+    return queue.submit(employees, finish=save_rota, **options)
+
+def describe_job(job):
+    """Describe a job, with the id of its saved rota once finished"""
+    data = get_job_queue().describe(job)
+    result = data.get('result')
+    if result and 'rota_id' in result:
+        data['rota_id'] = result['rota_id']
+    return data
 
 class GenerateRotaView(APIView):
     def post(self, request):
-        """Generate rota using OR-Tools solver"""
+        """Generate rota using OR-Tools solver, waiting for the result"""
         try:
-            print(f"✅ Incoming rota POST with {len(request.data)} employees")
-            
             # Validate input data
-            if not request.data or not isinstance(request.data, list):
-                return Response({"error": "Invalid employee data provided"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                employees, options = parse_rota_request(request.data)
+                check_sync_time_limit(options)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check minimum requirements
-            supervisors = [emp for emp in request.data if emp.get('is_supervisor', False)]
-            if len(supervisors) < 1:
-                return Response({
-                    "error": "At least 1 supervisor is required to generate a valid rota"
-                }, status=status.HTTP_400_BAD_REQUEST)
+            telemetry.log_event("rota_request", employees=len(employees),
+                                profile=options['solver_options']['profile'], days=options['horizon']['days'])
             
-            if len(request.data) < 2:
+            # Generate the rota through the shared solver queue
+            try:
+                job = submit_rota(employees, options)
+                result = get_job_queue().result(job, timeout=settings.ROTA_SYNC_TIMEOUT_SECONDS)
+            except (QueueFullError, QueueUnavailableError) as e:
+                return queue_error_response(e)
+            except FutureTimeoutError:
+                # The job carries on; its result can still be collected
                 return Response({
-                    "error": "At least 2 employees are required to generate a rota (each shift needs 2 people)"
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Generate the rota using OR-Tools
-            result = solve_rota(request.data)
-            
-            print(f"✅ Rota generation completed with status: {result['status']}")
+                    "status": "error",
+                    "error": "Rota generation timed out",
+                    "message": "The solver took too long. Its result will be available from the job API.",
+                    "job_id": job['id'],
+                    "status_url": f"/api/rota-jobs/{job['id']}/",
+                }, status=status.HTTP_504_GATEWAY_TIMEOUT)
             
             if result['status'] in ['optimal', 'feasible']:
-                print("✅ Valid solution found!")
                 return Response(result)
             else:
-                print(f"❌ No solution found: {result['message']}")
                 return Response(result, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
                 
         except Exception as e:
-            error_traceback = traceback.format_exc()
-            print(f"❌ Crash Traceback:\n{error_traceback}")
+            logger.exception("Rota generation crashed")
             
             return Response({
                 "status": "error",
                 "error": f"Server error during rota generation: {str(e)}",
                 "message": "An unexpected error occurred. Please check your employee configuration and try again."
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class RotaJobListView(APIView):
+    def post(self, request):
+        """Submit a rota solve and return its job id without waiting"""
+        try:
+            employees, options = parse_rota_request(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = submit_rota(employees, options)
+        except (QueueFullError, QueueUnavailableError) as e:
+            return queue_error_response(e)
+
+        telemetry.log_event("rota_job_queued", job_id=job['id'], employees=len(employees))
+        data = describe_job(job)
+        data["status_url"] = f"/api/rota-jobs/{job['id']}/"
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+class RotaJobDetailView(APIView):
+    MAX_WAIT_SECONDS = 30
+
+    def get(self, request, job_id):
+        """
+        Get job status, and the result once finished
+
+        Pass ?wait=<seconds> to long-poll until the job finishes (max 30s).
+        """
+        queue = get_job_queue()
+        job = queue.get(job_id)
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return Response({"error": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        if wait > 0:
+            queue.wait(job, timeout=min(wait, self.MAX_WAIT_SECONDS))
+
+        return Response(describe_job(job))
+
+class RotaStreamView(APIView):
+    def post(self, request):
+        """
+        Generate a rota, streaming the search's progress as Server-Sent Events
+
+        Takes a normal rota request in single mode, and solves it as a job
+        on the shared solver queue. The response is an event stream:
+        "started" with the stream_id (the job's id), "solution" with the
+        objective and bound of each improving rota (and a preview table at
+        most every ROTA_STREAM_PREVIEW_SECONDS), then "result" with the same
+        body /api/generate-rota/ returns, or "error". After
+        ROTA_SYNC_TIMEOUT_SECONDS the stream ends with an "error" giving the
+        job's status_url instead. Stopping the stream (see
+        RotaStreamStopView) ends the search with the best rota so far.
+        """
+        try:
+            employees, options = parse_rota_request(request.data)
+            check_sync_time_limit(options)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if options.pop('mode', 'single') != 'single':
+            return Response({"error": "Only single mode rotas can be streamed"}, status=status.HTTP_400_BAD_REQUEST)
+        if options.pop('profile', False):
+            return Response({"error": "Streamed rotas cannot be profiled"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            stream = start_stream(get_job_queue(), employees, options, save_rota,
+                                  settings.ROTA_STREAM_PREVIEW_SECONDS, settings.ROTA_SYNC_TIMEOUT_SECONDS)
+        except (QueueFullError, QueueUnavailableError) as e:
+            return queue_error_response(e)
+        telemetry.log_event("rota_stream", stream_id=stream.id, employees=len(employees),
+                            profile=options['solver_options']['profile'], days=options['horizon']['days'])
+
+        heartbeat = settings.ROTA_STREAM_HEARTBEAT_SECONDS
+        if isinstance(request._request, ASGIRequest):
+            chunks = stream.aevents(heartbeat)
+        else:
+            chunks = stream.events(heartbeat)
+        response = StreamingHttpResponse(chunks, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx-style proxies from holding events back
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+class RotaStreamStopView(APIView):
+    def post(self, request, stream_id):
+        """Stop a streamed solve; its stream then ends with the best rota found so far"""
+        queue = get_job_queue()
+        job = queue.get(stream_id)
+        if job is None or not queue.stop(job):
+            return Response({"error": "Stream not found or already finished"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"stream_id": stream_id, "stopping": True}, status=status.HTTP_202_ACCEPTED)
+
+class RotaScenarioView(APIView):
+    def post(self, request):
+        """
+        Solve what-if variants of one staff list in parallel
+
+        The body is a normal rota request plus "scenarios", a list of deltas
+        (see scenarios.apply_scenario). The base request is parsed and
+        validated once. Results stream back as newline-delimited JSON, one
+        summary per scenario in the order they finish.
+        """
+        data = request.data
+        if not isinstance(data, dict) or not isinstance(data.get('scenarios'), list) or not data['scenarios']:
+            return Response({"error": "scenarios must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(data['scenarios']) > settings.ROTA_MAX_SCENARIOS:
+            return Response({"error": f"At most {settings.ROTA_MAX_SCENARIOS} scenarios can be solved in one batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            base, options = parse_rota_request({k: v for k, v in data.items() if k != 'scenarios'})
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if options.pop('mode', 'single') != 'single':
+            return Response({"error": "Scenarios can only be solved in single mode"}, status=status.HTTP_400_BAD_REQUEST)
+
+        prepared = []
+        for i, scenario in enumerate(data['scenarios']):
+            try:
+                employees = apply_scenario(base, scenario)
+                error = validate_rota_request(employees)
+                if error:
+                    raise ValueError(error)
+            except ValueError as e:
+                return Response({"error": f"Scenario {i}: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+            prepared.append((scenario.get('name') or f"Scenario {i + 1}", employees))
+
+        telemetry.log_event("rota_scenarios", scenarios=len(prepared), employees=len(base))
+        lines = (json.dumps(line) + "\n" for line in run_scenarios(get_job_queue(), prepared, options))
+        if isinstance(request._request, ASGIRequest):
+            # Send each summary as its scenario finishes, not all at the end
+            lines = iterate_async(lines)
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+class ShiftTemplateView(APIView):
+    def get(self, request):
+        """List the compiled shift templates available to rota requests"""
+        try:
+            templates = get_template_store(settings.ROTA_SHIFT_TEMPLATES_PATH).all()
+        except (OSError, ValueError) as e:
+            return Response({"error": f"Invalid shift templates: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            "default": settings.ROTA_DEFAULT_SHIFT_TEMPLATE,
+            "templates": templates,
+        })
+
+class RotaCacheView(APIView):
+    def get(self, request):
+        """Report result cache hit/miss counters"""
+        cache = get_result_cache()
+        if cache is None:
+            return Response({"backend": "none"})
+        return Response(cache.stats())
+
+    def delete(self, request):
+        """Forget every cached rota result"""
+        cache = get_result_cache()
+        if cache is not None:
+            cache.clear()
+        return Response({"status": "cleared"})
+
+class MetricsPermission(BasePermission):
+    """
+    Let scrapers with ROTA_METRICS_TOKEN, or staff users, read /metrics
+
+    The endpoint does not exist (404) unless ROTA_METRICS_ENABLED is set.
+    """
+
+    def has_permission(self, request, view):
+        if not settings.ROTA_METRICS_ENABLED:
+            raise NotFound()
+        token = settings.ROTA_METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+class MetricsView(APIView):
+    permission_classes = [MetricsPermission]
+
+    def get(self, request):
+        """Solve, queue and cache metrics in the Prometheus text format"""
+        return HttpResponse(telemetry.REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+class HealthView(APIView):
+    def get(self, request):
+        """
+        Readiness of the rota solver workers
+
+        503 while they are still warming up or cannot be reached, so a load
+        balancer can hold traffic until the first solve will be quick. A
+        pool that is not prewarmed ("cold") still counts as ready.
+        """
+        health = get_job_queue().health()
+        ready = health["status"] in ("ready", "cold")
+        return Response(health, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+class RotaListView(APIView):
+    def get(self, request):
+        """
+        List saved rotas, newest first, one page at a time
+
+        ?week=<ISO date> keeps rotas with shifts in the Monday-to-Sunday
+        week containing that date, and ?employee=<name> rotas where that
+        employee works. When either filter is given, each rota lists its
+        matching assignments. Filtering happens in the database, so only
+        one page of rotas is ever loaded.
+        """
+        assignments = RotaAssignment.objects.all()
+        filtered = False
+        week = request.query_params.get('week')
+        if week:
+            try:
+                monday = date.fromisoformat(week)
+            except ValueError:
+                return Response({"error": "week must be an ISO date (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+            monday -= timedelta(days=monday.weekday())
+            assignments = assignments.filter(date__gte=monday, date__lt=monday + timedelta(days=7))
+            filtered = True
+        employee = request.query_params.get('employee')
+        if employee:
+            assignments = assignments.filter(employee_name=employee)
+            filtered = True
+
+        rotas = Rota.objects.defer('result')
+        if filtered:
+            rotas = rotas.filter(id__in=assignments.values('rota_id'))
+
+        paginator = RotaPagination()
+        page = paginator.paginate_queryset(rotas, request, view=self)
+        data = [rota.summary() for rota in page]
+        if filtered:
+            by_rota = {}
+            for a in assignments.filter(rota_id__in=[rota.id for rota in page]):
+                by_rota.setdefault(a.rota_id, []).append(a.to_dict())
+            for item in data:
+                item['assignments'] = by_rota.get(item['id'], [])
+        return paginator.get_paginated_response(data)
+
+class RotaExportView(APIView):
+    # Longest date range one export may cover
+    MAX_RANGE_DAYS = 366
+
+    def get(self, request, fmt, rota_id=None):
+        """
+        Export saved rotas as CSV, XLSX or an employee's iCalendar feed
+
+        /rotas/<id>/export/<fmt>/ exports one rota. /rotas/export/<fmt>/
+        exports the shifts of accepted rotas between ?start= and ?end= (ISO
+        dates, inclusive); ?accepted=false adds every other saved rota,
+        such as drafts and what-ifs, so a shift may then appear once per
+        rota. ?employee=<name> keeps one employee's shifts and is required
+        for "ics", which also needs dated rotas (solved with a horizon
+        start_date). Rows come from the stored assignments and are
+        streamed, so large exports are never built in memory.
+        """
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        employee = request.query_params.get('employee')
+        if fmt == 'ics' and not employee:
+            return Response({"error": "Calendar feeds are per employee; pass ?employee=<name>"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if rota_id is not None:
+            rota = Rota.objects.defer('result').filter(id=rota_id).first()
+            if rota is None:
+                return Response({"error": "Rota not found"}, status=status.HTTP_404_NOT_FOUND)
+            if fmt == 'ics' and rota.start_date is None:
+                return Response({"error": "Calendar export needs a dated horizon; this rota has no start_date. "
+                                          "Solve it with horizon.start_date to export it as a calendar."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            assignments = RotaAssignment.objects.filter(rota_id=rota_id).order_by('day', 'shift', 'employee_name')
+            filename = f"rota-{rota_id}"
+        else:
+            try:
+                start = date.fromisoformat(request.query_params.get('start', ''))
+                end = date.fromisoformat(request.query_params.get('end', ''))
+            except ValueError:
+                return Response({"error": "start and end must be ISO dates (YYYY-MM-DD)"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if not 0 <= (end - start).days < self.MAX_RANGE_DAYS:
+                return Response({"error": f"end must be on or after start and at most {self.MAX_RANGE_DAYS} days later"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            assignments = RotaAssignment.objects.filter(date__gte=start, date__lte=end)
+            if request.query_params.get('accepted') != 'false':
+                assignments = assignments.filter(rota__accepted_at__isnull=False)
+            assignments = assignments.order_by('date', 'shift', 'employee_name', 'rota_id')
+            filename = f"rotas-{start}-to-{end}"
+        if employee:
+            assignments = assignments.filter(employee_name=employee)
+            filename += f"-{slugify(employee)}"
+
+        rows = export_rows(assignments, settings.ROTA_SHIFT_TEMPLATES_PATH)
+        if fmt == 'csv':
+            chunks = stream_csv(rows)
+        elif fmt == 'xlsx':
+            chunks = stream_xlsx(rows)
+        else:
+            chunks = stream_ics(rows, f"{employee} rota")
+        if isinstance(request._request, ASGIRequest):
+            chunks = iterate_async(chunks)
+
+        content_type, download = EXPORT_FORMATS[fmt]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'{"attachment" if download else "inline"}; filename="{filename}.{fmt}"'
+        return response
+
+class RotaDetailView(APIView):
+    def get(self, request, rota_id):
+        """Get a saved rota with its full solve result"""
+        rota = Rota.objects.filter(id=rota_id).first()
+        if rota is None:
+            return Response({"error": "Rota not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({**rota.summary(), "result": rota.result})
+
+class RotaAcceptView(APIView):
+    def post(self, request, rota_id):
+        """
+        Accept a saved rota, adding its shifts to the employees' fairness history
+
+        A rota can only be accepted once; a second attempt gets a 409.
+        """
+        rota = Rota.objects.defer('result').filter(id=rota_id).first()
+        if rota is None:
+            return Response({"error": "Rota not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            employees = rota.accept(settings.ROTA_HISTORY_DECAY)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        telemetry.log_event("rota_accepted", rota_id=rota.id, employees=employees)
+        return Response({**rota.summary(), "employees": employees})
+
+class EmployeeHistoryView(APIView):
+    def get(self, request):
+        """Every employee's decayed evening, weekend and hours totals from accepted rotas"""
+        return Response([history.to_dict() for history in EmployeeHistory.objects.all()])
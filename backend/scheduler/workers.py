@@ -0,0 +1,429 @@
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+
+# Nothing here imports OR-Tools at module level: the web tier imports this
+# module, and only solver worker processes should pay for that import.
+
+logger = logging.getLogger(__name__)
+
+# Functions run_solve may call, by name, and the modules they live in
+SOLVE_FUNCTIONS = {
+    "solve_rota": "rota_solver",
+    "profile_solve_rota": "rota_solver",
+    "allocate_floaters": "master_model",
+}
+
+# Seconds this worker process spent warming up, once it has
+_warm_up_seconds = None
+
+# The worker channel carries pickles, so it stays on this machine: a Unix
+# socket, or one of these hosts, and a shared key at least this long
+LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+MIN_AUTHKEY_BYTES = 16
+
+
+def warm_up():
+    """
+    Import OR-Tools and run a tiny solve, so a worker's first real solve starts warm
+
+    Runs as the process pool's initializer, once in every worker process.
+
+    Returns:
+        Seconds the warm-up took
+    """
+    global _warm_up_seconds
+    started = time.perf_counter()
+    from .rota_solver import solve_rota
+    from .shift_templates import compile_template
+    from .solver_options import resolve_solver_options
+
+    template = compile_template("warm-up", {"days": {"default": [
+        {"name": "Shift", "start": "09:00", "end": "17:00", "min_staff": 1, "max_staff": 1},
+    ]}}, 1)
+    employees = [{"name": f"Warm-up {i}", "is_supervisor": False, "max_shifts": 5} for i in range(2)]
+    solve_rota(employees, resolve_solver_options({"profile": "fast", "num_workers": 1}), template=template)
+    _warm_up_seconds = time.perf_counter() - started
+    return _warm_up_seconds
+
+
+def worker_status():
+    """This worker process's id and how long it took to warm up"""
+    return {"pid": os.getpid(), "warm_up_seconds": _warm_up_seconds}
+
+
+class ProgressChannel:
+    """
+    Carries a streamed solve's progress from its worker back to the web process
+
+    The worker puts ("solution", progress) on `events` for every improving
+    rota (see rota_solver.SolveMonitor); setting `stopping` ends its search
+    early with the best rota so far. A pool's progress_channel() makes them
+    from a multiprocessing manager, so the channel can be sent to a worker
+    process with the solve.
+    """
+
+    # Seconds between the worker's checks for a stop request
+    STOP_POLL_SECONDS = 0.2
+
+    def __init__(self, events, stopping, preview_interval=1.0):
+        self.events = events
+        self.stopping = stopping
+        self.preview_interval = preview_interval
+
+    def put(self, event, data):
+        self.events.put((event, data))
+
+    def stop(self):
+        self.stopping.set()
+
+    @contextmanager
+    def monitor(self):
+        """A SolveMonitor reporting to this channel until the solve returns, for the worker"""
+        from .rota_solver import SolveMonitor
+
+        monitor = SolveMonitor(lambda progress: self.put("solution", progress), self.preview_interval)
+        finished = threading.Event()
+
+        def watch():
+            while not finished.is_set():
+                if self.stopping.wait(self.STOP_POLL_SECONDS):
+                    monitor.stop()
+                    return
+
+        watcher = threading.Thread(target=watch, name="rota-progress-stop", daemon=True)
+        watcher.start()
+        try:
+            yield monitor
+        finally:
+            finished.set()
+            watcher.join()
+
+
+def run_solve(name, *args, progress=None, **kwargs):
+    """
+    Call one of SOLVE_FUNCTIONS in a solver worker
+
+    With a ProgressChannel as progress, the solve reports to it and can be
+    stopped through it.
+    """
+    if name not in SOLVE_FUNCTIONS:
+        raise ValueError(f"Unknown solve function '{name}'")
+    function = getattr(importlib.import_module(f".{SOLVE_FUNCTIONS[name]}", __package__), name)
+
+    if progress is None:
+        return function(*args, **kwargs)
+    with progress.monitor() as monitor:
+        return function(*args, monitor=monitor, **kwargs)
+
+
+def parse_address(address):
+    """
+    A "host:port" address as a (host, port) tuple; anything else is a Unix socket path
+
+    Raises:
+        ValueError: for a host outside LOOPBACK_HOSTS
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        host = host.strip("[]")
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"Solver workers only listen locally: use a Unix socket path or one of "
+                             f"{', '.join(LOOPBACK_HOSTS)}, not '{host}'")
+        return host, int(port)
+    return address
+
+
+def check_authkey(authkey):
+    """
+    Refuse a missing or short key for the worker channel
+
+    Raises:
+        ValueError: if authkey is shorter than MIN_AUTHKEY_BYTES
+    """
+    if len(authkey or b"") < MIN_AUTHKEY_BYTES:
+        raise ValueError(f"The solver worker channel needs a secret key of at least {MIN_AUTHKEY_BYTES} bytes "
+                         "(ROTA_SOLVER_WORKER_AUTHKEY)")
+
+
+class WarmPool:
+    """
+    Process pool whose workers import OR-Tools and run a warm-up solve as they start
+
+    Workers are otherwise started one per solve as load grows, each paying
+    for its imports during a user's request. start() launches all of them
+    at once, so they warm up before the first request arrives.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        # spawn keeps workers independent of the web process's threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up,
+        )
+        self._warm = []
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start every worker now; health() reports when they are warm"""
+        if not self._warm:
+            # Each task holds a worker until it has warmed up, so the pool
+            # has to start a new process for every one of them
+            self._warm = [self._executor.submit(worker_status) for _ in range(self.max_workers)]
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def progress_channel(self, preview_interval=1.0):
+        """A ProgressChannel that can be sent to this pool's workers with a solve"""
+        with self._lock:
+            if self._manager is None:
+                # One manager process serves every stream's queue and stop flag
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            manager = self._manager
+        return ProgressChannel(manager.Queue(), manager.Event(), preview_interval)
+
+    def health(self):
+        """
+        Readiness of the pool
+
+        Returns:
+            {"status", "workers", "warm", "warm_up_seconds"}, where status
+            is "cold" (not started), "warming", "ready" or "unavailable"
+            (a worker failed to start)
+        """
+        finished = [f for f in self._warm if f.done()]
+        failed = any(f.cancelled() or f.exception() is not None for f in finished)
+        warm = [f.result() for f in finished if not f.cancelled() and f.exception() is None]
+        if failed:
+            status = "unavailable"
+        elif not self._warm:
+            status = "cold"
+        elif len(warm) < len(self._warm):
+            status = "warming"
+        else:
+            status = "ready"
+        return {
+            "status": status,
+            "workers": self.max_workers,
+            "warm": len(warm),
+            "warm_up_seconds": [round(w["warm_up_seconds"], 3) for w in warm],
+        }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+class RemoteSolverPool:
+    """
+    Hands solves to a `manage.py runsolverworkers` process over a local socket
+
+    Both ends authenticate with the same authkey (see check_authkey), and
+    the address must be local (see parse_address).
+
+    Has a process pool's submit(), so SolveJobQueue can use either one. Each
+    solve opens its own connection and waits for the reply on a thread; the
+    queue's limits bound how many are open at once. A streamed solve's
+    progress comes back over its connection, and stop requests go out the
+    same way. Workers that cannot be reached fail the solve with
+    BrokenProcessPool, as a crashed local pool does, so the queue reports
+    them the same way.
+    """
+
+    def __init__(self, address, authkey, timeout=5.0):
+        check_authkey(authkey)
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.timeout = timeout
+
+    def _request(self, message, timeout=None):
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(message)
+            if timeout is not None and not conn.poll(timeout):
+                raise TimeoutError(f"No reply from the solver workers within {timeout:g}s")
+            return conn.recv()
+
+    def _stream(self, args, kwargs, progress):
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(("stream", args, kwargs, progress.preview_interval))
+            stop_sent = False
+            while True:
+                if not stop_sent and progress.stopping.is_set():
+                    conn.send(("stop",))
+                    stop_sent = True
+                if not conn.poll(ProgressChannel.STOP_POLL_SECONDS):
+                    continue
+                message = conn.recv()
+                if message[0] != "solution":
+                    return message
+                progress.put(*message)
+
+    def start(self):
+        """The workers are started and warmed by their own process"""
+
+    def progress_channel(self, preview_interval=1.0):
+        """A ProgressChannel for submit(); the connection carries it to the workers"""
+        return ProgressChannel(queue.Queue(), threading.Event(), preview_interval)
+
+    def submit(self, fn, *args, progress=None, **kwargs):
+        if fn is not run_solve:
+            raise ValueError("Only run_solve can be sent to the solver workers")
+        future = Future()
+
+        def call():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                if progress is None:
+                    outcome, value = self._request(("solve", args, kwargs))
+                else:
+                    outcome, value = self._stream(args, kwargs, progress)
+            except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+                future.set_exception(BrokenProcessPool(f"Solver workers at {self.address} are unreachable: {e}"))
+                return
+            if outcome == "ok":
+                future.set_result(value)
+            elif outcome == "broken":
+                future.set_exception(BrokenProcessPool(value))
+            else:
+                future.set_exception(RuntimeError(value))
+
+        threading.Thread(target=call, name="rota-remote-solve", daemon=True).start()
+        return future
+
+    def health(self):
+        """The workers' own health(), or "unavailable" if they cannot be reached"""
+        try:
+            _, health = self._request(("health",), timeout=self.timeout)
+        except (OSError, EOFError, TimeoutError, multiprocessing.AuthenticationError) as e:
+            return {"status": "unavailable", "error": str(e)}
+        return health
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class SolverWorkerServer:
+    """
+    Serves solves from a warm process pool to RemoteSolverPool clients
+
+    Every connection carries one request: ("solve", args, kwargs) for
+    run_solve, answered with ("ok", result), ("error", message) or
+    ("broken", message) when a worker crashed, or ("health",), answered
+    with ("ok", WarmPool.health()). ("stream", args, kwargs,
+    preview_interval) is a solve that also sends ("solution", progress)
+    messages before its answer, and stops early if the client sends
+    ("stop",). A crashed pool is replaced and warmed again straight away.
+    """
+
+    def __init__(self, address, authkey, max_workers):
+        check_authkey(authkey)
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = WarmPool(self.max_workers)
+                self._pool.start()
+            return self._pool
+
+    def _replace_pool(self, broken):
+        with self._lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False)
+                self._pool = None
+        self._get_pool()
+
+    def _relay(self, conn, channel, future):
+        """Send a streamed solve's progress to the client until the solve finishes"""
+        while True:
+            finished = future.done()
+            try:
+                if conn.poll(0) and conn.recv() == ("stop",):
+                    channel.stop()
+                conn.send(channel.events.get(timeout=0 if finished else ProgressChannel.STOP_POLL_SECONDS))
+            except queue.Empty:
+                if finished:
+                    return
+            except (EOFError, OSError):
+                # The web process went away; nobody is waiting for this rota
+                channel.stop()
+                return
+
+    def _reply(self, message, conn):
+        kind = message[0] if isinstance(message, tuple) and message else None
+        if kind == "health":
+            return "ok", {**self._get_pool().health(), "pid": os.getpid()}
+        if kind not in ("solve", "stream"):
+            return "error", f"Unknown request {kind!r}"
+        pool = self._get_pool()
+        try:
+            if kind == "solve":
+                _, args, kwargs = message
+                return "ok", pool.submit(run_solve, *args, **kwargs).result()
+            _, args, kwargs, preview_interval = message
+            channel = pool.progress_channel(preview_interval)
+            future = pool.submit(run_solve, *args, progress=channel, **kwargs)
+            self._relay(conn, channel, future)
+            return "ok", future.result()
+        except BrokenProcessPool as e:
+            logger.error("Solver worker crashed; starting a new pool")
+            self._replace_pool(pool)
+            return "broken", f"The rota solver process crashed: {e}"
+        except Exception as e:
+            logger.exception("Rota solve failed in a solver worker")
+            return "error", repr(e)
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            reply = self._reply(message, conn)
+            try:
+                conn.send(reply)
+            except OSError:
+                # The web process gave up waiting
+                pass
+
+    def serve_forever(self, ready=None):
+        """
+        Warm the pool, then accept connections until interrupted
+
+        Args:
+            ready: Optional callable given the pool's health once every
+                worker is warm
+        """
+        pool = self._get_pool()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            if ready:
+                while pool.health()["status"] == "warming":
+                    time.sleep(0.1)
+                ready(pool.health())
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, multiprocessing.AuthenticationError) as e:
+                    logger.warning("Rejected solver worker connection: %s", e)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name="rota-worker-conn", daemon=True).start()
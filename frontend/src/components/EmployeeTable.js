@@ -12,6 +12,10 @@ const EmployeeTable = () => {
     const [selectedEmployee, setSelectedEmployee] = useState(null);
     const [rotaResult, setRotaResult] = useState(null);
     const [generating, setGenerating] = useState(false);
+    // Id of the streamed solve in progress, used to stop it early
+    const [streamId, setStreamId] = useState(null);
+    // ETag of the employee list we last loaded or saved, sent back as If-Match
+    const [configEtag, setConfigEtag] = useState(null);
 
     const days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
 
@@ -29,6 +33,7 @@ const EmployeeTable = () => {
                     max_shifts: parseInt(emp.max_shifts) || 3
                 }));
                 setEmployees(processedEmployees);
+                setConfigEtag(res.headers.etag || null);
                 setLoading(false);
             })
             .catch((err) => {
@@ -37,6 +42,18 @@ const EmployeeTable = () => {
             });
     };
 
+    const saveEmployees = (updated) =>
+        axios
+            .post(`${API_BASE_URL}/employees/`, updated, {
+                headers: configEtag ? { "If-Match": configEtag } : {}
+            })
+            .then((res) => {
+                setConfigEtag(res.headers.etag || null);
+                return res;
+            });
+
+    const isEditConflict = (err) => err.response && err.response.status === 412;
+
     const handleSave = (newEmp) => {
         const updated = [...employees];
         
@@ -49,15 +66,20 @@ const EmployeeTable = () => {
 
         setEmployees(updated);
 
-        axios
-            .post(`${API_BASE_URL}/employees/`, updated)
+        saveEmployees(updated)
             .then(() => {
                 console.log("Employee saved successfully!");
                 setShowModal(false);
             })
             .catch((err) => {
                 console.error("Save failed", err);
-                alert("Failed to save employee. Please try again.");
+                if (isEditConflict(err)) {
+                    alert("Someone else has changed the employee list. It has been reloaded; please make your change again.");
+                    setShowModal(false);
+                    fetchEmployees();
+                } else {
+                    alert("Failed to save employee. Please try again.");
+                }
             });
     };
 
@@ -69,46 +91,96 @@ const EmployeeTable = () => {
         const updated = employees.filter((emp) => emp !== empToDelete);
         setEmployees(updated);
 
-        axios
-            .post(`${API_BASE_URL}/employees/`, updated)
+        saveEmployees(updated)
             .then(() => console.log("Employee deleted successfully!"))
             .catch((err) => {
                 console.error("Delete failed", err);
-                alert("Failed to delete employee. Please try again.");
+                alert(isEditConflict(err)
+                    ? "Someone else has changed the employee list. It has been reloaded; please try again."
+                    : "Failed to delete employee. Please try again.");
                 // Revert the state if deletion failed
                 fetchEmployees();
             });
     };
 
-    const handleGenerateRota = () => {
+    // Apply one Server-Sent Events block from the rota stream
+    const handleStreamEvent = (block) => {
+        let event = "message";
+        let data = "";
+        block.split("\n").forEach((line) => {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+        });
+        if (!data) return; // keep-alive comment
+
+        const payload = JSON.parse(data);
+        if (event === "started") {
+            setStreamId(payload.stream_id);
+        } else if (event === "solution") {
+            // Show the best rota so far; previews are not sent for every solution
+            setRotaResult((previous) => ({
+                ...(previous || {}),
+                ...(payload.preview || {}),
+                status: "searching",
+                progress: payload
+            }));
+        } else if (event === "result") {
+            console.log("✅ Rota received from server:", payload);
+            setRotaResult(payload);
+        } else if (event === "error") {
+            setRotaResult({ status: "error", message: payload.message || payload.error });
+        }
+    };
+
+    const handleGenerateRota = async () => {
         setGenerating(true);
         setRotaResult(null);
-        
-        axios
-            .post(`${API_BASE_URL}/generate-rota/`, employees)
-            .then((res) => {
-                console.log("✅ Rota received from server:", res.data);
-                setRotaResult(res.data);
-            })
-            .catch((err) => {
-                console.error("❌ Failed to generate rota:", err);
-                
-                // Handle different error responses
-                if (err.response && err.response.data) {
-                    setRotaResult({
-                        status: "error",
-                        message: err.response.data.message || err.response.data.error || "Failed to generate rota"
-                    });
-                } else {
-                    setRotaResult({
-                        status: "error",
-                        message: "Network error: Could not connect to server"
-                    });
+
+        try {
+            const res = await fetch(`${API_BASE_URL}/rota-streams/`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify(employees)
+            });
+            if (!res.ok) {
+                const data = await res.json().catch(() => ({}));
+                setRotaResult({
+                    status: "error",
+                    message: data.message || data.error || "Failed to generate rota"
+                });
+                return;
+            }
+
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let end;
+                while ((end = buffer.indexOf("\n\n")) !== -1) {
+                    handleStreamEvent(buffer.slice(0, end));
+                    buffer = buffer.slice(end + 2);
                 }
-            })
-            .finally(() => {
-                setGenerating(false);
+            }
+        } catch (err) {
+            console.error("❌ Failed to generate rota:", err);
+            setRotaResult({
+                status: "error",
+                message: "Network error: Could not connect to server"
             });
+        } finally {
+            setGenerating(false);
+            setStreamId(null);
+        }
+    };
+
+    const handleStopRota = () => {
+        if (!streamId) return;
+        axios
+            .post(`${API_BASE_URL}/rota-streams/${streamId}/stop/`)
+            .catch((err) => console.error("Failed to stop rota generation", err));
     };
 
     const getConstraintsSummary = (emp) => {
@@ -248,6 +320,8 @@ const EmployeeTable = () => {
             <RotaOutput 
                 rota={rotaResult} 
                 onGenerateRota={handleGenerateRota}
+                onStopRota={handleStopRota}
+                canStop={Boolean(streamId)}
                 generating={generating}
             />
 
@@ -1,8 +1,15 @@
 import React, { useState } from "react";
 
-const RotaOutput = ({ rota, onGenerateRota, generating }) => {
+const RotaOutput = ({ rota, onGenerateRota, onStopRota, canStop, generating }) => {
   const [copyStatus, setCopyStatus] = useState('');
 
+  // Ends a streamed search early, keeping the best rota found so far
+  const stopButton = generating && canStop && (
+    <button className="btn btn-outline-danger" onClick={onStopRota}>
+      Stop
+    </button>
+  );
+
   // Function to convert rota data to TSV format
   const convertToTSV = (rotaData) => {
     if (!rotaData || !rotaData.table || !rotaData.headers) {
@@ -55,20 +62,23 @@ const RotaOutput = ({ rota, onGenerateRota, generating }) => {
       <div className="mt-4">
         <div className="d-flex justify-content-between align-items-center mb-3">
           <h3>Weekly Rota</h3>
-          <button 
-            className="btn btn-success" 
-            onClick={onGenerateRota}
-            disabled={generating}
-          >
-            {generating ? (
-              <>
-                <span className="spinner-border spinner-border-sm me-2" role="status"></span>
-                Generating...
-              </>
-            ) : (
-              'Generate Rota'
-            )}
-          </button>
+          <div className="d-flex gap-2">
+            {stopButton}
+            <button 
+              className="btn btn-success" 
+              onClick={onGenerateRota}
+              disabled={generating}
+            >
+              {generating ? (
+                <>
+                  <span className="spinner-border spinner-border-sm me-2" role="status"></span>
+                  Generating...
+                </>
+              ) : (
+                'Generate Rota'
+              )}
+            </button>
+          </div>
         </div>
         <p className="text-muted">Click "Generate Rota" to create a weekly schedule</p>
       </div>
@@ -167,6 +177,7 @@ const RotaOutput = ({ rota, onGenerateRota, generating }) => {
               </>
             )}
           </button>
+          {stopButton}
           <button 
             className="btn btn-success" 
             onClick={onGenerateRota}
@@ -184,9 +195,21 @@ const RotaOutput = ({ rota, onGenerateRota, generating }) => {
         </div>
       </div>
 
-      <div className="alert alert-success">
-        <h5>Rota Generated!</h5>
-      </div>
+      {rota.status === "searching" ? (
+        <div className="alert alert-info">
+          <h5>Searching for a better rota...</h5>
+          <p className="mb-0">
+            Best so far after {rota.progress.wall_time.toFixed(1)}s: score {rota.progress.objective}
+            {" "}(the best possible is at least {rota.progress.best_bound}).
+            Stop at any time to keep it.
+          </p>
+        </div>
+      ) : (
+        <div className="alert alert-success">
+          <h5>Rota Generated!</h5>
+          {rota.stopped && <p className="mb-0">The search was stopped early, so this is the best rota found by then.</p>}
+        </div>
+      )}
       
       {/* Main rota table */}
       <div className="table-responsive">